@@ -0,0 +1,74 @@
+"""Micro-benchmark: streaming article extraction vs. the old full BeautifulSoup parse.
+
+    python -m benchmarks.bench_extract [--pages N] [--paragraphs N]
+
+Builds a synthetic heavy news page (inline scripts, navigation, cookie banner, footer and a
+long article body) and times both extractors on it. Both keep the same text budget; the
+streaming extractor is also timed without one, to compare a full parse with a full parse.
+"""
+from bs4 import BeautifulSoup
+from src.social_media_blog.extract import extract_from_chunks, ARTICLE_TEXT_BUDGET
+import argparse
+import statistics
+import time
+import tracemalloc
+
+
+def build_page(paragraphs: int) -> bytes:
+    script = "<script>" + "var x = {'a': 1};" * 5000 + "</script>"
+    nav = "<nav><ul>" + "".join(f"<li><a href='/s{i}'>Section {i}</a></li>" for i in range(300)) + "</ul></nav>"
+    banner = "<div class='cookie-banner'><p>We use cookies to improve your experience.</p></div>"
+    body = "".join(
+        f"<p>Paragraph {i}: markets moved as analysts weighed <b>new data</b> on inflation, jobs and growth "
+        f"across several regions, with commentary from economists and officials.</p>"
+        f"<div class='ad-slot promo'><p>Advertisement {i}</p></div>"
+        for i in range(paragraphs)
+    )
+    footer = "<footer>" + "<p>Footer link</p>" * 200 + "</footer>"
+    html = f"<html><head>{script}<style>body{{}}</style></head><body>{nav}{banner}<article>{body}</article>{footer}</body></html>"
+    return html.encode("utf-8")
+
+
+def soup_extract(raw: bytes, budget: int) -> str:
+    # The old path parsed the whole page before it could trim the text
+    soup = BeautifulSoup(raw.decode("utf-8"), "html.parser")
+    paragraphs = [p.get_text() for p in soup.find_all("p")]
+    return "\n".join(paragraphs[:-1])[:budget]
+
+
+def stream_extract(raw: bytes, budget: int) -> str:
+    return extract_from_chunks((raw[i:i + 16384] for i in range(0, len(raw), 16384)), text_budget=budget)
+
+
+def measure(fn, raw: bytes, budget: int, runs: int):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = fn(raw, budget)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(raw, budget)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10, help="Timed runs per extractor")
+    parser.add_argument("--paragraphs", type=int, default=2000, help="Article paragraphs in the synthetic page")
+    parser.add_argument("--budget", type=int, default=ARTICLE_TEXT_BUDGET, help="Characters of text kept")
+    args = parser.parse_args()
+
+    raw = build_page(args.paragraphs)
+    print(f"Synthetic page: {len(raw) / 1024:.0f} KiB, text budget {args.budget} chars")
+    print(f"{'extractor':<22}{'median ms':>12}{'peak MiB':>12}{'chars out':>12}")
+    for name, fn, budget in (("beautifulsoup", soup_extract, args.budget),
+                             ("streaming", stream_extract, args.budget),
+                             ("streaming, no budget", stream_extract, len(raw))):
+        median, peak, chars = measure(fn, raw, budget, args.pages)
+        print(f"{name:<22}{median * 1000:>12.1f}{peak / 2 ** 20:>12.1f}{chars:>12}")
+
+
+if __name__ == "__main__":
+    main()
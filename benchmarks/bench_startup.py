@@ -0,0 +1,75 @@
+"""Startup benchmark: cold import time of the app, broken down per module.
+
+    python -m benchmarks.bench_startup [--module M] [--runs N] [--top N]
+
+Imports the module in fresh interpreters with ``-X importtime``. Reports the median wall time,
+the cumulative import time of each project module, and the heaviest third-party packages.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_PREFIX = "src.social_media_blog"
+
+
+def import_once(module: str):
+    """Import `module` in a fresh interpreter; return (wall seconds, {module: cumulative us})."""
+    # Placeholder credentials so module-level config reads succeed without a .env
+    env = {"GROQ_MODEL": "benchmark", "GROQ_API_KEY": "benchmark", "GOOGLE_API_KEY": "benchmark",
+           **os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        name = name.strip()
+        cumulative[name] = max(cumulative.get(name, 0), int(cumulative_us))
+    return wall, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=f"{PROJECT_PREFIX}.app", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=10, help="Third-party packages to list")
+    args = parser.parse_args()
+
+    walls, runs = [], []
+    for _ in range(args.runs):
+        wall, cumulative = import_once(args.module)
+        walls.append(wall)
+        runs.append(cumulative)
+
+    def median_us(name):
+        return statistics.median(run.get(name, 0) for run in runs)
+
+    print(f"import {args.module}: median {statistics.median(walls) * 1000:.0f} ms wall "
+          f"over {args.runs} runs (min {min(walls) * 1000:.0f} ms)\n")
+
+    project = sorted({name for run in runs for name in run if name.startswith(PROJECT_PREFIX)},
+                     key=median_us, reverse=True)
+    print(f"{'project module':<44}{'cumulative ms':>14}")
+    for name in project:
+        print(f"{name:<44}{median_us(name) / 1000:>14.1f}")
+
+    # Top-level third-party packages, counted once each
+    packages = sorted({name for run in runs for name in run
+                       if "." not in name and not name.startswith("src") and not name.startswith("_")},
+                      key=median_us, reverse=True)[:args.top]
+    print(f"\n{'third-party package':<44}{'cumulative ms':>14}")
+    for name in packages:
+        print(f"{name:<44}{median_us(name) / 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Deterministic local stand-ins for Groq, Gemini, Cohere, Pinecone and DuckDuckGo.
+
+Every fake sleeps for a configurable latency and returns text of a configurable size, derived
+from a hash of its input so runs are repeatable. ``install_fakes`` wires them into the app;
+call it before anything imports ``src.social_media_blog.app``.
+"""
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+from typing import List
+import numpy as np
+import tempfile
+import asyncio
+import hashlib
+import random
+import json
+import time
+import os
+import re
+
+WORDS = ("content platform insight growth audience data model research trend strategy market "
+         "signal reader story network system design launch review metric team product user").split()
+
+
+def fake_text(seed: str, words: int) -> str:
+    rng = random.Random(hashlib.sha1(seed.encode("utf-8")).hexdigest())
+    sentences, sentence = [], []
+    for _ in range(words):
+        sentence.append(rng.choice(WORDS))
+        if len(sentence) >= 12:
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            sentence = []
+    if sentence:
+        sentences.append(" ".join(sentence).capitalize() + ".")
+    return " ".join(sentences)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers after `latency` seconds; streaming adds `token_latency` per token."""
+
+    latency: float = 0.3
+    tokens: int = 60
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "routing expert" in prompt:
+            query = prompt.rsplit("User:", 1)[-1].lower()
+            return "crewai" if re.search(r"\b(blog|article|post|write)\b", query) else "langchain"
+        return fake_text(prompt, self.tokens)
+
+    def _result(self, text: str) -> ChatResult:
+        usage = {"input_tokens": 200, "output_tokens": len(text.split()), "total_tokens": 200 + len(text.split())}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(self._reply(messages))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(self._reply(messages))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for word in self._reply(messages).split():
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, latency: float = 0.05, dimension: int = 1024):
+        self.latency = latency
+        self.dimension = dimension
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._vector(text)
+
+    def stats(self) -> dict:
+        return {}
+
+
+class FakeRetriever(BaseRetriever):
+    latency: float = 0.08
+    k: int = 4
+    doc_words: int = 150
+
+    def _docs(self, query: str):
+        return [Document(page_content=fake_text(f"{query}:{i}", self.doc_words), metadata={"source": f"fake-{i}.pdf"})
+                for i in range(self.k)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        time.sleep(self.latency)
+        return self._docs(query)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager):
+        await asyncio.sleep(self.latency)
+        return self._docs(query)
+
+
+def make_fake_crew_llm(latency: float = 1.0, tokens: int = 400):
+    """CrewAI LLM that has research agents call web_search_tool once, then answer."""
+    from crewai.llms.base_llm import BaseLLM
+
+    class FakeCrewLLM(BaseLLM):
+        def call(self, messages, tools=None, callbacks=None, available_functions=None,
+                 from_task=None, from_agent=None):
+            time.sleep(latency)
+            transcript = messages if isinstance(messages, str) else "\n".join(str(m.get("content", "")) for m in messages)
+            task_name = getattr(from_task, "name", "") or ""
+            role = getattr(from_agent, "role", "") or ""
+            topic = role.rsplit(" Research Analyst", 1)[0].strip() or "the topic"
+            if task_name.startswith("research") and "Observation:" not in transcript:
+                return ("Thought: I need current sources first.\nAction: web_search_tool\n"
+                        f"Action Input: {json.dumps({'query': topic})}")
+            body = fake_text(transcript[-2000:], tokens)
+            if task_name == "summarizing_task":
+                body = json.dumps({"title": f"On {topic}", "blog_post": body,
+                                   "meta_description": body[:155], "blog_preview": body[:240]})
+            return f"Thought: I now know the final answer\nFinal Answer: {body}"
+
+        def supports_function_calling(self) -> bool:
+            return False
+
+    return FakeCrewLLM(model="fake/crew")
+
+
+def install_fakes(chat_latency: float = 0.3, chat_tokens: int = 60, token_latency: float = 0.0,
+                  embed_latency: float = 0.05, retriever_latency: float = 0.08, crew_latency: float = 1.0,
+                  crew_tokens: int = 400, search_latency: float = 0.3, page_latency: float = 0.2,
+                  page_words: int = 800):
+    """Point every external client at a fake and return the app module.
+
+    Caches that persist to disk are redirected to a temporary directory, so a run never
+    reads or pollutes the real ones.
+    """
+    scratch = tempfile.mkdtemp(prefix="mindtype-bench-")
+    os.environ["WEB_CACHE_PATH"] = os.path.join(scratch, "web_cache.sqlite")
+    os.environ["RATE_LIMIT_PATH"] = os.path.join(scratch, "rate_limit.sqlite")
+    os.environ["EMBEDDING_CACHE_DIR"] = ""
+    os.environ["SEMANTIC_CACHE_PATH"] = ""
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    for name in ("GROQ_MODEL", "GROQ_API_KEY", "GOOGLE_API_KEY"):
+        os.environ.setdefault(name, "fake")
+
+    from src.social_media_blog import db_handler
+
+    embeddings = FakeEmbeddings(embed_latency)
+    retriever = FakeRetriever(latency=retriever_latency)
+    # Replaced before the modules that do `from .db_handler import ...` are imported
+    db_handler.get_embeddings = lambda: embeddings
+    db_handler.get_knowledge_base = lambda: retriever
+
+    from src.social_media_blog import app, crew, web_fetch
+    from src.social_media_blog.rate_limit import RateLimiter, SQLiteBucketStore
+
+    chat_model = FakeChatModel(latency=chat_latency, tokens=chat_tokens, token_latency=token_latency)
+    app.get_general_chat_llm = lambda: chat_model
+    app.query_router._get_llm = lambda: chat_model
+    crew_llm = make_fake_crew_llm(crew_latency, crew_tokens)
+    crew.get_llm = lambda: crew_llm
+    # One client drives all the load, so the per-IP limiter the lifespan builds must stay out of the way
+    app.RateLimiter = lambda: RateLimiter(SQLiteBucketStore(os.environ["RATE_LIMIT_PATH"]), capacity=1e12,
+                                          refill_per_minute=1e12)
+
+    def search_web(query: str, max_results: int = 5):
+        time.sleep(search_latency)
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+        return [{"title": f"{query} ({i})", "href": f"https://source{i}.example/{slug}", "body": ""}
+                for i in range(max_results)]
+
+    def download_article(url: str, deadline: float, etag=None, last_modified=None):
+        time.sleep(min(page_latency, max(0.0, deadline - time.monotonic())))
+        return "\n".join(fake_text(f"{url}:{p}", 80) for p in range(max(1, page_words // 80))), None, None
+
+    web_fetch.search_web = search_web
+    web_fetch.download_article = download_article
+    return app
@@ -0,0 +1,211 @@
+"""Offline load test: drive POST /chat with a mix of chat and blog traffic against fake backends.
+
+    python -m benchmarks.loadtest [--requests N] [--concurrency C] [--blog-ratio R] [--topics N]
+                                  [--save PATH] [--compare BASELINE.json]
+
+Runs the app in-process (lifespan included) over an ASGI transport, with every LLM, the
+embeddings, the knowledge base and web search replaced by the fakes in ``benchmarks.fakes``,
+so results depend only on the app itself. Reports throughput, p50/p95/p99 latency per route
+and event-loop lag, and saves them as JSON in benchmarks/results/ for later comparison.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.fakes import install_fakes
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+CHAT_QUERIES = ["What does Mindtype do?", "Who founded Mindtype?", "How do I contact support?",
+                "What topics do you cover?", "Is there a newsletter?", "How long are your posts?",
+                "Can I suggest a topic?", "What is your editorial process?"]
+BLOG_SUBJECTS = ["AI in healthcare", "remote work culture", "renewable energy storage", "urban farming",
+                 "quantum computing basics", "personal finance for students", "open source funding",
+                 "ocean plastic cleanup", "edge computing", "sleep and productivity", "electric aviation",
+                 "data privacy laws"]
+TONES = ["professional", "casual", "informative", "engaging"]
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(latencies) -> dict:
+    return {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+            "mean": statistics.fmean(latencies) if latencies else 0.0, "max": max(latencies, default=0.0)}
+
+
+def build_workload(total: int, blog_ratio: float, topics: int, seed: int):
+    """Requests in send order. Blog topics follow a Zipf-like skew, as real traffic repeats popular topics."""
+    rng = random.Random(seed)
+    subjects = [BLOG_SUBJECTS[i % len(BLOG_SUBJECTS)] + (f" part {i // len(BLOG_SUBJECTS)}" if i >= len(BLOG_SUBJECTS) else "")
+                for i in range(topics)]
+    weights = [1 / (rank + 1) for rank in range(topics)]
+    workload = []
+    for _ in range(total):
+        if rng.random() < blog_ratio:
+            subject = rng.choices(subjects, weights)[0]
+            workload.append(("crewai", {"topic": f"Write a blog post about {subject}", "tone": rng.choice(TONES)}))
+        else:
+            workload.append(("langchain", {"topic": rng.choice(CHAT_QUERIES)}))
+    return workload
+
+
+async def monitor_loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    """How late a short sleep wakes up; anything blocking the event loop shows up here."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started - interval))
+
+
+async def run_load(app_module, workload, concurrency: int, timeout: float) -> dict:
+    import httpx
+
+    app = app_module.app
+    pending = list(enumerate(workload))
+    records = []
+    lag_samples, stop = [], asyncio.Event()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+
+            async def worker():
+                while pending:
+                    _, (expected, payload) = pending.pop(0)
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post("/chat", json=payload)
+                        status = response.status_code
+                        ok = status == 200 and response.json().get("status", "success") == "success"
+                    except Exception as error:
+                        status, ok = type(error).__name__, False
+                    records.append({"route": expected, "status": status, "ok": ok,
+                                    "seconds": time.perf_counter() - started})
+
+            lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await lag_task
+            stats = app_module.component_stats(type("Probe", (), {"app": app})())
+
+    routes = {}
+    for route in sorted({record["route"] for record in records}):
+        subset = [record for record in records if record["route"] == route]
+        routes[route] = {"requests": len(subset), "errors": sum(not record["ok"] for record in subset),
+                         "throughput_rps": len(subset) / elapsed,
+                         "latency_seconds": summarize([record["seconds"] for record in subset])}
+    statuses = {}
+    for record in records:
+        statuses[str(record["status"])] = statuses.get(str(record["status"]), 0) + 1
+    return {
+        "elapsed_seconds": elapsed,
+        "requests": len(records),
+        "errors": sum(not record["ok"] for record in records),
+        "throughput_rps": len(records) / elapsed,
+        "latency_seconds": summarize([record["seconds"] for record in records]),
+        "routes": routes,
+        "statuses": statuses,
+        "loop_lag_seconds": {"p50": percentile(lag_samples, 50), "p99": percentile(lag_samples, 99),
+                             "max": max(lag_samples, default=0.0), "samples": len(lag_samples)},
+        "components": stats,
+    }
+
+
+def git_commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def print_report(report: dict):
+    results = report["results"]
+    print(f"{results['requests']} requests in {results['elapsed_seconds']:.1f}s "
+          f"({results['throughput_rps']:.2f} req/s), {results['errors']} errors, statuses {results['statuses']}")
+    print(f"{'route':<12}{'n':>6}{'err':>6}{'req/s':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'mean s':>9}")
+    for route, data in [("all", results)] + list(results["routes"].items()):
+        latency = data["latency_seconds"]
+        print(f"{route:<12}{data['requests']:>6}{data['errors']:>6}{data['throughput_rps']:>8.2f}"
+              f"{latency['p50']:>9.3f}{latency['p95']:>9.3f}{latency['p99']:>9.3f}{latency['mean']:>9.3f}")
+    lag = results["loop_lag_seconds"]
+    print(f"event loop lag: p50 {lag['p50'] * 1000:.1f} ms, p99 {lag['p99'] * 1000:.1f} ms, "
+          f"max {lag['max'] * 1000:.1f} ms")
+
+
+def print_comparison(report: dict, baseline: dict):
+    """Relative change of the headline numbers; negative latency and positive throughput are better."""
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nvs {baseline.get('commit', '?')} ({baseline.get('label') or 'baseline'}):")
+    pairs = [("all", report["results"], baseline["results"])]
+    pairs += [(route, data, baseline["results"]["routes"].get(route)) for route, data in report["results"]["routes"].items()]
+    for route, new, old in pairs:
+        if not old:
+            continue
+        new_latency, old_latency = new["latency_seconds"], old["latency_seconds"]
+        print(f"{route:<12}req/s {change(new['throughput_rps'], old['throughput_rps']):>8}  "
+              + "  ".join(f"{q} {change(new_latency[q], old_latency[q]):>8}" for q in ("p50", "p95", "p99")))
+    new_lag, old_lag = report["results"]["loop_lag_seconds"], baseline["results"]["loop_lag_seconds"]
+    print(f"{'loop lag':<12}p99 {change(new_lag['p99'], old_lag['p99'])}  max {change(new_lag['max'], old_lag['max'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once")
+    parser.add_argument("--blog-ratio", type=float, default=0.2, help="Share of requests that generate a blog")
+    parser.add_argument("--topics", type=int, default=20, help="Distinct blog topics")
+    parser.add_argument("--seed", type=int, default=7, help="Workload seed")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-request client timeout in seconds")
+    parser.add_argument("--chat-latency", type=float, default=0.3, help="Fake chat/router LLM latency (s)")
+    parser.add_argument("--crew-latency", type=float, default=0.5, help="Fake crew LLM latency per call (s)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Fake embedding latency (s)")
+    parser.add_argument("--retriever-latency", type=float, default=0.08, help="Fake knowledge base latency (s)")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Fake web search latency (s)")
+    parser.add_argument("--page-latency", type=float, default=0.2, help="Fake page download latency (s)")
+    parser.add_argument("--label", default="", help="Free-form note stored with the results")
+    parser.add_argument("--save", help="Results file (default benchmarks/results/loadtest-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to print deltas against")
+    args = parser.parse_args()
+
+    app_module = install_fakes(chat_latency=args.chat_latency, embed_latency=args.embed_latency,
+                               retriever_latency=args.retriever_latency, crew_latency=args.crew_latency,
+                               search_latency=args.search_latency, page_latency=args.page_latency)
+    workload = build_workload(args.requests, args.blog_ratio, args.topics, args.seed)
+    results = asyncio.run(run_load(app_module, workload, args.concurrency, args.timeout))
+
+    config = {name: value for name, value in vars(args).items() if name not in ("save", "compare", "label")}
+    report = {"commit": git_commit(), "label": args.label, "created_at": time.time(),
+              "python": sys.version.split()[0], "config": config, "results": results}
+    print_report(report)
+
+    path = args.save or os.path.join(RESULTS_DIR, f"loadtest-{report['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as handle:
+        json.dump(report, handle, indent=2, default=str)
+    print(f"\nSaved {path}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        if baseline.get("config") != config:
+            print("Warning: baseline was run with a different configuration")
+        print_comparison(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,72 @@
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from .chat_models import *
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 from contextlib import asynccontextmanager
-from langchain.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from .db_handler import logger
-from typing import Union
-from .crew import SocialMediaBlog,llm, knowledge_base
-import os
+from .db_handler import logger, get_embeddings, get_knowledge_base, embedding_model
+from functools import lru_cache
+from typing import Optional, Union
+from .concurrency import run_in_crew_executor, shutdown_executors
+from .bulkhead import BulkheadFull, bulkheads, route_bulkhead
+from .output_repair import stats as output_repair_stats
+from .crew_pool import CrewPool, CrewPoolTimeout
+from .blog_cache import BlogResultCache
+from .stage_cache import stage_cache
+from .pipeline import error_blog_response
+from .jobs import BlogJobManager
+from .router import QueryRouter
+from .semantic_cache import SemanticCache
+from .web_fetch import web_cache
+from .context_packing import pack_context, token_encoding, CHAT_CONTEXT_TOKENS
+from .rate_limit import RateLimiter
+from .metrics import render as render_metrics, span
+from .speculation import Speculator, SPECULATIVE_CACHE_LOOKUP
+from .llm_gateway import hedged_chat_model, gateway_stats, CHAT_HEDGE_MODELS
+import asyncio
+import hmac
 import json
+import os
+import queue
 
 load_dotenv()
 
+# Guards the monitoring and admin endpoints; while unset they are switched off
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["5/minute"])
+speculator = Speculator()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize crew instance on startup"""
+    """Connect the clients and build the crew pool on startup"""
     try:
-        app.state.crew_instance = SocialMediaBlog().crew()
-        logger.info("Crew initialized successfully")
+        # Nothing below runs at import time; warm it here so the first request doesn't pay for it
+        get_knowledge_base()
+        get_general_chat_llm()
+        token_encoding()
+        # Opens the SQLite file (or Redis connection) the buckets live in
+        app.state.rate_limiter = RateLimiter()
+        app.state.crew_pool = CrewPool().start()
+        logger.info("Crew pool initialized successfully")
+        app.state.blog_jobs = BlogJobManager(app.state.crew_pool, blog_cache)
+        app.state.blog_jobs.start()
     except Exception as e:
         logger.error(f"Failed to initialize crew: {e}")
         raise
     yield
+    # Both wait for running generations, so keep the loop free for the requests awaiting them
+    await asyncio.to_thread(app.state.blog_jobs.stop)
+    await asyncio.to_thread(shutdown_executors)
+    await asyncio.to_thread(semantic_cache.flush)
 
 
 app = FastAPI(title="AI Blog Post Generator", 
               lifespan=lifespan, 
               description="Chatbot backend for Mindtype, a social blog comapny",
               version="1.1")
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
 origins = [
    "https://mindtypex.netlify.app"
 ]
@@ -53,48 +79,22 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-def get_langchain_llm():
-    if os.getenv("GOOGLE_API_KEY"):
-        logger.info("Using ChatGoogleGenerativeAI for LangChain components.")
-        return ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GOOGLE_API_KEY"), temperature=0.5)
-    else:
-        logger.error("No valid API key found for Gemini.")
-        raise ValueError("GOOGLE_API_KEY not found.")
-    
-general_chat_llm = ChatGroq(
-    model=os.getenv("GROQ_MODEL"),
-    api_key=os.getenv("GROQ_API_KEY"),
-    temperature=0.7
-)
+@lru_cache(maxsize=1)
+def get_general_chat_llm():
+    """Groq for routing and chat, hedged to the CHAT_HEDGE_MODELS alternates when it is slow or down."""
+    return hedged_chat_model("chat", [f"groq:{os.getenv('GROQ_MODEL')}"] + CHAT_HEDGE_MODELS, temperature=0.7)
 
 
-langchain_llm = get_langchain_llm()
+query_router = QueryRouter(get_general_chat_llm)
+semantic_cache = SemanticCache(get_embeddings, model=embedding_model)
+blog_cache = BlogResultCache()
 
 async def route_query(user_request: str) -> str:
-    """Route queries intelligently between CrewAI (health) or LangChain (general chat)."""
-    router_prompt = ChatPromptTemplate.from_template(
-        """
-        You are a routing expert. Decide whether to route the user query to 
-        'crewai' (for content generation) or 'langchain' (for general chat).
-        Beforemaking the decision, thoroughly analyze the user's input. If they directly mention to generate a blog, in whatever way, then you know definitely the route is crewai. If the user's input is unclear, ask it is definitely langchain. General queries for example, what mindtype does and what type of content they generate, that is a langchain query. Intelligently analyze the user's request to determine clearly and without a doubt, what route is to be taken.
-        Respond with one word only: crewai or langchain.
-        
-        User: "{query}"
-        Response:
-        """
-    )
-    router_chain = router_prompt | general_chat_llm| StrOutputParser()
+    """Route queries between CrewAI (content generation) or LangChain (general chat)."""
+    with span("route_query"):
+        return await query_router.route(user_request)
 
-
-    try:
-        decision = await router_chain.ainvoke({"query": user_request})
-        return decision.strip().lower()
-    except Exception as e:
-        logger.exception("Router LLM failed. Proceeding with langchain")
-        return "langchain"
-
-def assistant(user_query: str):
-    chat_prompt_template = ChatPromptTemplate.from_template(
+chat_prompt_template = ChatPromptTemplate.from_template(
     """
 You are the official general support AI Chatbot for **Mindtype**.
 Mindtype is a company founded by **DirectEd scholars** after working on a project, and we focus on high-quality **blog posts and content**.
@@ -133,42 +133,168 @@ If a user's question or input is unclear, handle it intelligently by either aski
     """
 )
 
+async def retrieve_context(user_query: str) -> str:
     try:
-        docs = knowledge_base.invoke(user_query)
-        context = "\n".join([doc.page_content for doc in docs]).strip() if docs else ""
+        with span("retriever", caller="assistant"):
+            docs = await get_knowledge_base().ainvoke(user_query)
+        if not docs:
+            return ""
+        return pack_context(user_query, [("", doc.page_content) for doc in docs], CHAT_CONTEXT_TOKENS, "assistant")
     except Exception as e:
         logger.exception(f"Retriever failed")
-        context = ""
+        return ""
 
-    chain = chat_prompt_template | general_chat_llm| StrOutputParser()
+async def assistant(user_query: str, speculation=None):
+    context = await take(speculation, "context", lambda: retrieve_context(user_query))
+    chain = chat_prompt_template | get_general_chat_llm() | StrOutputParser()
 
-    return chain.invoke({
+    return await chain.ainvoke({
         "user_query": user_query,
         "context": context })
 
+async def assistant_stream(user_query: str, speculation=None):
+    """Same as assistant(), but yields the reply token by token."""
+    context = await take(speculation, "context", lambda: retrieve_context(user_query))
+    chain = chat_prompt_template | get_general_chat_llm() | StrOutputParser()
+
+    async for chunk in chain.astream({
+        "user_query": user_query,
+        "context": context }):
+        yield chunk
+
 @app.get("/")
 async def root():
     return {"message": "Loaded successfully! Visit /docs"}
 
 
+async def take(speculation, name: str, make):
+    return await (speculation.take(name, make) if speculation is not None else make())
+
+
+def speculate_chat(user_query: str):
+    """Start the langchain route's retrieval, and its cache embedding, while the router decides."""
+    work = {"context": lambda: retrieve_context(user_query)}
+    if SPECULATIVE_CACHE_LOOKUP:
+        work["vector"] = lambda: semantic_cache.embed(user_query)
+    return speculator.start(**work)
+
+
+async def cached_assistant(user_query: str, speculation=None):
+    """assistant() behind the semantic cache."""
+    cached = semantic_cache.get_exact(user_query)
+    if cached is None:
+        vector = await take(speculation, "vector", lambda: semantic_cache.embed(user_query))
+        cached = semantic_cache.get(user_query, vector)
+    if cached is not None:
+        if speculation is not None:
+            speculation.close()
+        return cached
+    response_text = await assistant(user_query, speculation)
+    semantic_cache.put(user_query, vector, response_text)
+    return response_text
+
+async def cached_assistant_stream(user_query: str, speculation=None):
+    cached = semantic_cache.get_exact(user_query)
+    if cached is None:
+        vector = await take(speculation, "vector", lambda: semantic_cache.embed(user_query))
+        cached = semantic_cache.get(user_query, vector)
+    if cached is not None:
+        if speculation is not None:
+            speculation.close()
+        yield cached
+        return
+    chunks = []
+    async for chunk in assistant_stream(user_query, speculation):
+        chunks.append(chunk)
+        yield chunk
+    semantic_cache.put(user_query, vector, "".join(chunks))
+
+def component_stats(request: Request) -> dict:
+    embeddings = get_embeddings()
+    return {
+        "crew_pool": request.app.state.crew_pool.stats(),
+        "router": query_router.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "blog_cache": blog_cache.stats(),
+        "stage_cache": stage_cache.stats(),
+        "rate_limit": request.app.state.rate_limiter.stats(),
+        "speculation": speculator.stats(),
+        "llm_gateway": gateway_stats(),
+        "bulkheads": {route: bulkhead.stats() for route, bulkhead in bulkheads.items()},
+        "output_repair": output_repair_stats(),
+        "embeddings": embeddings.stats() if embeddings is not None else None,
+        "web_cache": web_cache.stats() if web_cache is not None else None,
+    }
+
+
+def require_admin(request: Request):
+    """Let the request through only with ADMIN_API_KEY in X-Admin-Key or as a bearer token."""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled. Set ADMIN_API_KEY to enable them.")
+    authorization = request.headers.get("authorization", "")
+    supplied = request.headers.get("x-admin-key") or (authorization[7:] if authorization.lower().startswith("bearer ") else "")
+    if not hmac.compare_digest(supplied.strip().encode("utf-8"), ADMIN_API_KEY.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="A valid admin key is required.",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.get("/stats")
+async def stats(request: Request):
+    require_admin(request)
+    return component_stats(request)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint: stage, LLM and crew task latencies, token counts and cache stats."""
+    require_admin(request)
+    return PlainTextResponse(render_metrics(component_stats(request)), media_type="text/plain; version=0.0.4")
+
+
+def over_capacity(error: BulkheadFull) -> HTTPException:
+    detail = "All blog writers are busy" if error.route == "crewai" else "The assistant is very busy"
+    return HTTPException(status_code=503, detail=f"{detail}. Please try again in {error.retry_after}s.",
+                         headers={"Retry-After": str(error.retry_after)})
+
+
+async def generate_blog_post(request: Request, body: BlogRequest):
+    async with route_bulkhead("crewai").slot():
+        return await run_in_crew_executor(request.app.state.crew_pool.run, body.topic, body.tone,
+                                          research_mode=body.research_mode)
+
+
+@app.delete("/stages/research")
+async def invalidate_research(request: Request, topic: Optional[str] = None):
+    """Forget memoized research for one topic, or for all topics, so the next blog researches afresh."""
+    # Authenticated before it is charged, so anonymous callers can't drain an admin's bucket
+    require_admin(request)
+    await request.app.state.rate_limiter.check(request, "admin")
+    inputs = {"topic": topic} if topic else {}
+    return {"invalidated": stage_cache.invalidate("research_task", **inputs)}
+
+
 @app.post("/chat", response_model=Union[BlogResponse, ChatResponse])
-@limiter.limit("5/minute")
 async def generate_blog(request: Request, body: BlogRequest):
-    route_decision = await route_query(user_request=body.topic)
+    # Charged for the cheapest route before any routing or retrieval work, and topped up once the route is known
+    await request.app.state.rate_limiter.check(request, "langchain")
+    # Most requests are chat, so its retrieval runs alongside routing and is dropped for blogs
+    speculation = speculate_chat(body.topic)
+    try:
+        route_decision = await route_query(user_request=body.topic)
+        speculation.decided(keep=route_decision == "langchain")
+        await request.app.state.rate_limiter.check(request, route_decision, paid_for="langchain")
+    except BaseException:
+        speculation.close()
+        raise
     
     # Initialize a default error response for robust fallback
-    error_response = BlogResponse(
-        status="error",
-        title="Blog Generation Failed",
-        content="Blog generation failed due to an unexpected error. Please try again later.",
-        meta_description="Error in processing the request.",
-        blog_preview=""
-    )
+    error_response = error_blog_response()
 
     try:
         if route_decision == "langchain":
             logger.info("Routing conversation to Langchain...")
-            response_text = assistant(body.topic)
+            async with route_bulkhead("langchain").slot():
+                response_text = await cached_assistant(body.topic, speculation)
             if response_text:
                 logger.info("Chatbot returned an answer!")
                 return ChatResponse(response=response_text)
@@ -178,74 +304,148 @@ async def generate_blog(request: Request, body: BlogRequest):
                 
         elif route_decision == "crewai":
             logger.info("Routing conversation to Crewai")
-            crew_instance = request.app.state.crew_instance
-            
-            try:
-                # 1. Execute CrewAI pipeline
-                response = crew_instance.kickoff(inputs={'topic': body.topic, "tone": body.tone})
-                raw_output = response.raw
-                logger.info("CREW Pipeline completed successfully")
-
-                # --- START: Robust JSON Wrangle Logic (The fix!) ---
-                cleaned_output = raw_output.strip()
-                logger.debug(f"Raw output size: {len(raw_output)}. Cleaned output size: {len(cleaned_output)}")
-                
-                # Check for and remove common markdown code fences (```json ... ```)
-                if cleaned_output.startswith("```"):
-                    logger.debug("Attempting to clean markdown fences.")
-                    try:
-                        # Split after the first line (e.g., ```json) and before the last line (e.g., ```)
-                        # This handles multiple lines of output
-                        cleaned_output = cleaned_output.split('\n', 1)[1].rsplit('\n', 1)[0].strip()
-                    except IndexError:
-                        pass
-                
-                # 2. Basic validation check after cleaning
-                if not cleaned_output or not (cleaned_output.startswith('{') and cleaned_output.endswith('}')):
-                    logger.error(f"CrewAI output is empty or not a valid JSON structure after cleaning: {repr(cleaned_output[:50])}...")
-                    error_response.content = "CrewAI output was not valid JSON. Check agent prompts."
-                    error_response.meta_description = "Invalid JSON structure."
-                    return error_response
-
-                # 3. Attempt JSON loading on the cleaned string
-                try: 
-                    result = json.loads(cleaned_output)
-                    
-                    # 4. Extract fields from the resulting dictionary
-                    title = result.get("title", "Untitled")
-                    content = result.get("blog_post", "")
-                    meta_description = result.get("meta_description", "")
-                    blog_preview = result.get("blog_preview", "")
-                    
-                    return BlogResponse(
-                        status="success",
-                        title=title,
-                        content=content,
-                        meta_description=meta_description,
-                        blog_preview=blog_preview
-                    )
-                except json.JSONDecodeError as e:
-                    logger.exception(f"JSON Decode Error after cleaning. Problematic output: {repr(cleaned_output)}")
-                    error_response.content = "Failed to parse final output as JSON. Check agent output structure."
-                    error_response.meta_description = "JSON decoding failed."
-                    return error_response
-                # --- END: Robust JSON Wrangle Logic ---
-
-            except Exception as e:
-                logger.exception("Crew pipeline failed during execution.")
-                error_response.content = "Blog generation failed. An internal CrewAI error occurred."
-                error_response.meta_description = "CrewAI execution error."
-                return error_response
+            return await blog_cache.arun(body.topic, body.tone, lambda: generate_blog_post(request, body),
+                                         body.research_mode)
 
         else:
             # Handle invalid route decision
             error_response.content = "Invalid route or unsupported query type."
             error_response.meta_description = "Routing decision failed."
             return error_response
-            
+
+    except BulkheadFull as e:
+        logger.warning(f"Shedding a {e.route} request: {e}")
+        raise over_capacity(e)
+    except CrewPoolTimeout:
+        logger.warning("No crew became free in time")
+        raise HTTPException(status_code=503, detail="All blog writers are busy. Please try again shortly.")
     except Exception as e:
         logger.exception("Top-level exception in generate_blog")
         return error_response
+    finally:
+        speculation.close()
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_crew_events(request: Request, body: BlogRequest):
+    """Run the crew and yield an SSE event as each task finishes, then the blog itself.
+
+    Cached blogs, and blogs another request is already generating, skip straight to the result.
+    """
+    key, shared, leader = blog_cache.join(body.topic, body.tone, body.research_mode)
+    if not leader:
+        yield sse_event("result", (await asyncio.shield(asyncio.wrap_future(shared))).model_dump())
+        return
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def on_task_complete(output, task_names):
+        loop.call_soon_threadsafe(events.put_nowait, {"task": output.name, "status": "done"})
+
+    kickoff = None
+    try:
+        release = await route_bulkhead("crewai").acquire()
+        try:
+            kickoff = asyncio.ensure_future(run_in_crew_executor(
+                request.app.state.crew_pool.run, body.topic, body.tone, stage_listener=on_task_complete,
+                research_mode=body.research_mode))
+        except BaseException:
+            release()
+            raise
+        # The route slot is held until the kickoff has really finished and its crew is back in the
+        # pool, even when the client disconnects and this generator is cancelled first
+        kickoff.add_done_callback(lambda done: release())
+        kickoff.add_done_callback(lambda done: blog_cache.settle(key, shared, done))
+        while not kickoff.done() or not events.empty():
+            next_event = asyncio.ensure_future(events.get())
+            try:
+                done, _ = await asyncio.wait({next_event, kickoff}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not next_event.done():
+                    next_event.cancel()
+            if next_event in done:
+                yield sse_event("stage", next_event.result())
+        yield sse_event("result", kickoff.result().model_dump())
+    finally:
+        # Shed or cancelled while queueing for the slot: release the topic so followers don't wait forever
+        if kickoff is None:
+            blog_cache.abandon(key, shared)
+
+
+async def stream_chat_events(request: Request, body: BlogRequest, route_decision: str, speculation=None):
+    yield sse_event("start", {"status": "routing"})
+    yield sse_event("route", {"route": route_decision})
+
+    try:
+        if route_decision == "langchain":
+            async with route_bulkhead("langchain").slot():
+                async for token in cached_assistant_stream(body.topic, speculation):
+                    yield sse_event("token", {"text": token})
+        elif route_decision == "crewai":
+            async for event in stream_crew_events(request, body):
+                yield event
+        else:
+            yield sse_event("error", {"detail": "Invalid route or unsupported query type."})
+    except BulkheadFull as e:
+        yield sse_event("error", {"detail": over_capacity(e).detail, "retry_after": e.retry_after})
+    except CrewPoolTimeout:
+        yield sse_event("error", {"detail": "All blog writers are busy. Please try again shortly."})
+    except Exception:
+        logger.exception("Streaming chat failed")
+        yield sse_event("error", {"detail": "Generation failed due to an unexpected error."})
+    finally:
+        if speculation is not None:
+            speculation.close()
+    yield sse_event("done", {})
+
+
+@app.post("/chat/stream")
+async def stream_chat(request: Request, body: BlogRequest):
+    """Server-sent events variant of /chat: chat tokens or crew stage progress as they happen."""
+    # Routed before the stream opens so an over-limit caller gets a plain 429, or 503 when the route is full
+    await request.app.state.rate_limiter.check(request, "langchain")
+    speculation = speculate_chat(body.topic)
+    try:
+        route_decision = await route_query(user_request=body.topic)
+        speculation.decided(keep=route_decision == "langchain")
+        await request.app.state.rate_limiter.check(request, route_decision, paid_for="langchain")
+        if route_decision in bulkheads:
+            bulkheads[route_decision].reject_if_full()
+    except BulkheadFull as e:
+        speculation.close()
+        raise over_capacity(e)
+    except BaseException:
+        speculation.close()
+        raise
+    return StreamingResponse(
+        stream_chat_events(request, body, route_decision, speculation),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/blogs", response_model=BlogJobStatus, status_code=202)
+async def submit_blog_job(request: Request, body: BlogRequest):
+    """Queue a blog generation and return its job id straight away."""
+    await request.app.state.rate_limiter.check(request, "crewai")
+    try:
+        job = request.app.state.blog_jobs.submit(body.topic, body.tone, body.research_mode)
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Blog generation queue is full. Please try again later.")
+    return job.status()
+
+
+@app.get("/blogs/{job_id}", response_model=BlogJobStatus)
+async def get_blog_job(request: Request, job_id: str):
+    await request.app.state.rate_limiter.check(request, "poll")
+    job = request.app.state.blog_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job.status()
 
 if __name__ == "__main__":
     import uvicorn
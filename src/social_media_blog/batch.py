@@ -0,0 +1,178 @@
+"""Batch blog generation from a JSONL file, for pre-generating content offline.
+
+Run with ``python -m src.social_media_blog.batch topics.jsonl -o blogs.jsonl``. Each input line is
+``{"topic": ..., "tone": ..., "research_mode": ..., "id": ...}`` (only topic is required). Items run
+on a pool of crews, and every finished item is appended to the output file right away, with the
+``BlogOutput`` the crew produced. The output doubles as the checkpoint: rerunning the same command
+skips items that already succeeded. Ctrl-C cancels the items that haven't started and waits for the
+running ones; a second Ctrl-C abandons those too.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pydantic import ValidationError
+from dotenv import load_dotenv
+from .db_handler import logger
+from .chat_models import BlogOutput, BlogRequest
+from .crew_pool import CrewPool
+from .router import normalize_query
+import statistics
+import threading
+import argparse
+import hashlib
+import json
+import time
+import os
+
+load_dotenv()
+
+
+def item_id(record: dict, request: BlogRequest) -> str:
+    """The record's own id, or a hash of what it asks for, so duplicates and reruns line up."""
+    if record.get("id") is not None:
+        return str(record["id"])
+    mode = request.research_mode.value if request.research_mode else ""
+    key = f"{normalize_query(request.topic)}\0{request.tone.value}\0{mode}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def read_items(path: str):
+    """Parse the input file into (id, BlogRequest) pairs, skipping invalid lines and duplicates."""
+    items, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                request = BlogRequest(**record)
+            except (json.JSONDecodeError, TypeError, ValidationError) as e:
+                logger.warning(f"{path}:{line_no}: skipping invalid record: {e}")
+                continue
+            key = item_id(record, request)
+            if key not in seen:
+                seen.add(key)
+                items.append((key, request))
+    return items
+
+
+def completed_ids(output_path: str) -> set:
+    """Ids that already have a successful result in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if isinstance(record, dict) and record.get("status") == "success" and record.get("id") is not None:
+                done.add(str(record["id"]))
+    return done
+
+
+def run_batch(input_path: str, output_path: str, workers: int = 2, retries: int = 1, limit: int = None) -> dict:
+    items = read_items(input_path)
+    done = completed_ids(output_path)
+    pending = [(key, request) for key, request in items if key not in done]
+    if limit is not None:
+        pending = pending[:limit]
+    summary = {"items": len(items), "skipped": sum(key in done for key, _ in items),
+               "attempted": len(pending), "succeeded": 0, "failed": 0, "retried": 0}
+    if not pending:
+        logger.info("Nothing to generate; every item already has a result")
+        return summary
+
+    logger.info(f"Generating {len(pending)} blogs with {workers} workers ({summary['skipped']} already done)")
+    pool = CrewPool(size=workers).start()
+    write_lock = threading.Lock()
+    stopping = threading.Event()
+    durations = []
+    started = time.perf_counter()
+
+    def generate(key: str, request: BlogRequest):
+        item_started = time.perf_counter()
+        for attempt in range(retries + 1):
+            if stopping.is_set():
+                return "cancelled"
+            result = pool.run(request.topic, request.tone, wait_forever=True, research_mode=request.research_mode)
+            if result.status == "success":
+                break
+            if attempt < retries:
+                logger.warning(f"Item {key} failed; retrying ({attempt + 1}/{retries})")
+                with write_lock:
+                    summary["retried"] += 1
+        seconds = time.perf_counter() - item_started
+        record = {"id": key, "topic": request.topic, "tone": request.tone.value,
+                  "research_mode": request.research_mode.value if request.research_mode else None,
+                  "status": result.status, "seconds": round(seconds, 3), "finished_at": time.time()}
+        if result.status == "success":
+            record["blog"] = BlogOutput(title=result.title, blog_post=result.content,
+                                        meta_description=result.meta_description,
+                                        blog_preview=result.blog_preview).model_dump()
+        else:
+            record["error"] = result.content
+        with write_lock:
+            with open(output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            durations.append(seconds)
+            summary["succeeded" if result.status == "success" else "failed"] += 1
+        return result.status
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+    futures = {}
+    try:
+        futures = {executor.submit(generate, key, request): key for key, request in pending}
+        for finished, future in enumerate(as_completed(futures), 1):
+            try:
+                status = future.result()
+            except Exception:
+                logger.exception(f"Item {futures[future]} crashed")
+                summary["failed"] += 1
+                status = "error"
+            logger.info(f"[{finished}/{len(pending)}] {futures[future]}: {status}")
+    except KeyboardInterrupt:
+        summary["interrupted"] = True
+        stopping.set()
+        summary["cancelled"] = sum(future.cancel() for future in futures)
+        running = sum(not future.done() for future in futures)
+        logger.warning(f"Interrupted; cancelled {summary['cancelled']} items. Waiting for the {running} running "
+                       "ones (Ctrl-C again to abandon them). Finished items are skipped on the next run")
+        try:
+            executor.shutdown(wait=True, cancel_futures=True)
+        except KeyboardInterrupt:
+            summary["abandoned"] = sum(not future.done() for future in futures)
+            logger.warning(f"Abandoned {summary['abandoned']} running items")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    finished = summary["succeeded"] + summary["failed"]
+    summary.update({
+        "elapsed_seconds": round(elapsed, 2),
+        "blogs_per_minute": round(summary["succeeded"] / elapsed * 60, 2) if elapsed else 0.0,
+        "failure_rate": round(summary["failed"] / finished, 4) if finished else 0.0,
+        "item_seconds_p50": round(statistics.median(durations), 2) if durations else 0.0,
+        "item_seconds_max": round(max(durations), 2) if durations else 0.0,
+    })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate blogs for every topic in a JSONL file.")
+    parser.add_argument("input", help="JSONL file of {\"topic\", \"tone\", \"research_mode\", \"id\"} records")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to; also the checkpoint")
+    parser.add_argument("--workers", type=int, default=2, help="Crews generating at once")
+    parser.add_argument("--retries", type=int, default=1, help="Extra attempts for an item that fails")
+    parser.add_argument("--limit", type=int, default=None, help="Generate at most this many pending items")
+    args = parser.parse_args()
+    summary = run_batch(args.input, args.output, args.workers, args.retries, args.limit)
+    print(json.dumps(summary, indent=2), flush=True)
+    if summary.get("abandoned"):
+        # The abandoned kickoffs can't be interrupted, and the interpreter would wait for their threads
+        os._exit(130)
+
+
+if __name__ == "__main__":
+    main()
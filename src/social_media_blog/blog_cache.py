@@ -0,0 +1,124 @@
+from concurrent.futures import Future
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .db_handler import logger
+from .router import normalize_query
+import threading
+import asyncio
+import time
+import os
+
+load_dotenv()
+
+BLOG_CACHE_TTL = float(os.getenv("BLOG_CACHE_TTL", "3600"))
+BLOG_CACHE_SIZE = int(os.getenv("BLOG_CACHE_SIZE", "256"))
+
+
+class BlogResultCache:
+    """Finished blogs keyed by normalized topic, tone and research mode, with single-flight generation.
+
+    The first caller for a key becomes the leader and runs the crew; anyone asking for the
+    same key meanwhile waits on the leader's future instead of starting another kickoff.
+    Only successful blogs are kept, for `ttl` seconds and at most `max_entries` of them.
+    Works from both the event loop and worker threads.
+    """
+
+    def __init__(self, ttl: float = BLOG_CACHE_TTL, max_entries: int = BLOG_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (BlogResponse, created_at)
+        self._in_flight = {}  # key -> Future
+        self.counters = {"hits": 0, "coalesced": 0, "misses": 0}
+
+    @staticmethod
+    def key(topic: str, tone, research_mode=None) -> str:
+        return f"{getattr(tone, 'value', tone)}:{getattr(research_mode, 'value', research_mode) or ''}:" \
+               f"{normalize_query(topic)}"
+
+    def join(self, topic: str, tone, research_mode=None):
+        """Return (key, future, leader).
+
+        The leader must run the crew and call settle(), or abandon() if it stops before it has
+        an outcome; otherwise everyone joining the key later waits forever.
+        """
+        key = self.key(topic, tone, research_mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                future = Future()
+                future.set_result(entry[0])
+                return key, future, False
+            if key in self._in_flight:
+                self.counters["coalesced"] += 1
+                logger.info(f"Joining the blog generation already running for '{key}'")
+                return key, self._in_flight[key], False
+            self.counters["misses"] += 1
+            future = Future()
+            self._in_flight[key] = future
+            return key, future, True
+
+    def settle(self, key: str, future: Future, done):
+        """Publish the outcome of `done` (a finished asyncio or concurrent future) to everyone waiting."""
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            if not done.cancelled() and done.exception() is None:
+                result = done.result()
+                if result.status == "success" and self.ttl > 0:
+                    self._entries[key] = (result, time.time())
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        if future.done():
+            return
+        if done.cancelled():
+            future.set_exception(RuntimeError("Blog generation was cancelled"))
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+
+    def abandon(self, key: str, future: Future):
+        """Settle a leader's future as cancelled when it gave up before producing an outcome."""
+        outcome = Future()
+        outcome.cancel()
+        self.settle(key, future, outcome)
+
+    def run(self, topic: str, tone, fn, research_mode=None):
+        """Blocking get-or-generate; `fn()` produces the BlogResponse."""
+        key, future, leader = self.join(topic, tone, research_mode)
+        if leader:
+            outcome = Future()
+            try:
+                outcome.set_result(fn())
+            except Exception as e:
+                outcome.set_exception(e)
+            finally:
+                # Also reached on KeyboardInterrupt and the like, which leave `outcome` pending
+                if not outcome.done():
+                    outcome.cancel()
+                self.settle(key, future, outcome)
+        return future.result()
+
+    async def arun(self, topic: str, tone, fn, research_mode=None):
+        """Async get-or-generate; `fn()` returns an awaitable BlogResponse.
+
+        The generation runs as its own task, so a leader that disconnects does not cancel
+        it for the callers waiting on the same key.
+        """
+        key, future, leader = self.join(topic, tone, research_mode)
+        if leader:
+            try:
+                task = asyncio.ensure_future(fn())
+            except BaseException:
+                self.abandon(key, future)
+                raise
+            task.add_done_callback(lambda done: self.settle(key, future, done))
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "in_flight": len(self._in_flight)}
@@ -0,0 +1,143 @@
+from dotenv import load_dotenv
+from .crew_pool import CREW_POOL_SIZE, CREW_POOL_TIMEOUT
+from .metrics import QUEUE_SECONDS
+from contextlib import asynccontextmanager
+import asyncio
+import math
+import time
+import os
+
+load_dotenv()
+
+# Per route: requests running at once, requests allowed to wait, and how long they may wait
+ROUTE_LIMITS = {
+    "langchain": int(os.getenv("LANGCHAIN_MAX_CONCURRENCY", "32")),
+    "crewai": int(os.getenv("CREWAI_MAX_CONCURRENCY", str(CREW_POOL_SIZE))),
+}
+ROUTE_QUEUES = {
+    "langchain": int(os.getenv("LANGCHAIN_MAX_QUEUE", "64")),
+    "crewai": int(os.getenv("CREWAI_MAX_QUEUE", str(CREW_POOL_SIZE * 4))),
+}
+ROUTE_QUEUE_TIMEOUTS = {
+    "langchain": float(os.getenv("LANGCHAIN_QUEUE_TIMEOUT", "10")),
+    "crewai": float(os.getenv("CREWAI_QUEUE_TIMEOUT", str(CREW_POOL_TIMEOUT))),
+}
+
+
+class BulkheadFull(Exception):
+    """The route's queue is full, or a request waited in it too long."""
+
+    def __init__(self, route: str, retry_after: int):
+        super().__init__(f"The {route} route is at capacity")
+        self.route = route
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Concurrency limit for one route with a bounded waiting queue.
+
+    At most `limit` requests hold a slot; up to `max_queue` more wait for one, each for at
+    most `queue_timeout` seconds. Anything beyond that is turned away at once, so a burst on
+    one route can't pile up work that starves the others.
+    """
+
+    def __init__(self, route: str, limit: int, max_queue: int, queue_timeout: float):
+        self.route = route
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.queued = 0
+        self.counters = {"admitted": 0, "rejected": 0, "timed_out": 0}
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self._hold_seconds = None  # moving average of how long a slot is held
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a new request: the queue ahead of it, drained `limit` at a time."""
+        hold = self._hold_seconds or 1.0
+        return max(1, math.ceil(hold * (self.queued + 1) / self.limit))
+
+    def full(self) -> bool:
+        return self.active >= self.limit and self.queued >= self.max_queue
+
+    def reject_if_full(self):
+        """Shed the request now, before any work is done for it, if it could not even queue."""
+        if self.full():
+            self.counters["rejected"] += 1
+            raise BulkheadFull(self.route, self.retry_after())
+
+    async def _acquire(self) -> bool:
+        """Wait up to `queue_timeout` for a slot. False on timeout; a cancelled wait never keeps a slot."""
+        # Not asyncio.wait_for: on 3.11 it can swallow a cancel that lands as the semaphore is acquired
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            done, _ = await asyncio.wait({acquire}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if not acquire.cancel() and not acquire.cancelled():
+                self._semaphore.release()
+            raise
+        if not done:
+            acquire.cancel()
+            return False
+        return True
+
+    async def acquire(self):
+        """Wait for a slot and return a callable that gives it back (calling it again is a no-op).
+
+        For work that must keep its slot after the caller has gone, e.g. a kickoff whose client
+        disconnected; otherwise use slot().
+        """
+        self.reject_if_full()
+        started = time.perf_counter()
+        self.queued += 1
+        try:
+            if not await self._acquire():
+                self.counters["timed_out"] += 1
+                raise BulkheadFull(self.route, self.retry_after())
+        finally:
+            self.queued -= 1
+            waited = time.perf_counter() - started
+            QUEUE_SECONDS.observe(waited, route=self.route)
+        self.counters["admitted"] += 1
+        self.queue_seconds_total += waited
+        self.queue_seconds_max = max(self.queue_seconds_max, waited)
+        self.active += 1
+        held_from = time.perf_counter()
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            self.active -= 1
+            self._semaphore.release()
+            held = time.perf_counter() - held_from
+            self._hold_seconds = held if self._hold_seconds is None else 0.8 * self._hold_seconds + 0.2 * held
+
+        return release
+
+    @asynccontextmanager
+    async def slot(self):
+        release = await self.acquire()
+        try:
+            yield
+        finally:
+            release()
+
+    def stats(self) -> dict:
+        admitted = self.counters["admitted"]
+        return {**self.counters, "limit": self.limit, "max_queue": self.max_queue, "active": self.active,
+                "queued": self.queued, "queue_seconds_total": round(self.queue_seconds_total, 3),
+                "queue_seconds_max": round(self.queue_seconds_max, 3),
+                "queue_seconds_avg": round(self.queue_seconds_total / admitted, 3) if admitted else 0.0}
+
+
+bulkheads = {route: Bulkhead(route, ROUTE_LIMITS[route], ROUTE_QUEUES[route], ROUTE_QUEUE_TIMEOUTS[route])
+             for route in ROUTE_LIMITS}
+
+
+def route_bulkhead(route: str) -> Bulkhead:
+    return bulkheads[route]
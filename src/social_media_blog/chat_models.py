@@ -9,9 +9,15 @@ class ToneEnum(str, Enum):
     informative = "informative"
     engaging = "engaging"
 
+class ResearchModeEnum(str, Enum):
+    single = "single"
+    fanout = "fanout"
+
 class BlogRequest(BaseModel):
     topic: str = Field(..., min_length=1, max_length=500, description="The topic for the blog post")
     tone: ToneEnum = Field(default=ToneEnum.informative, description="The tone of the blog post")
+    research_mode: Optional[ResearchModeEnum] = Field(
+        default=None, description="single: one research agent; fanout: research sub-questions in parallel. Defaults to RESEARCH_MODE")
 
 class BlogOutput(BaseModel): # This is what comes from summarizing Task
     """Output model for the blog generation crew"""
@@ -30,3 +36,18 @@ class BlogResponse(BaseModel):
 
 class ChatResponse(BaseModel):
     response: str
+
+
+class JobStateEnum(str, Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class BlogJobStatus(BaseModel):
+    job_id: str = Field(..., description="Identifier to poll the job with")
+    status: JobStateEnum = Field(..., description="Lifecycle state of the job")
+    stage: Optional[str] = Field(default=None, description="Crew task currently running, if any")
+    result: Optional[BlogResponse] = Field(default=None, description="Final blog once the job has finished")
+    created_at: float = Field(..., description="Unix timestamp of submission")
+    updated_at: float = Field(..., description="Unix timestamp of the last state change")
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from dotenv import load_dotenv
+from .crew_pool import CREW_POOL_SIZE
+from .db_handler import logger
+import asyncio
+import os
+
+load_dotenv()
+
+# Crew kickoffs are long, blocking calls. They run on their own small pool so they never
+# take over the event loop or the default executor that the rest of the app relies on.
+# Each kickoff borrows a crew from the CrewPool, so the pool size is the real parallelism.
+# The extra threads wait inside CrewPool.checkout, where the acquire timeout applies.
+CREW_MAX_WORKERS = int(os.getenv("CREW_MAX_WORKERS", str(CREW_POOL_SIZE * 2)))
+# How long shutdown waits for kickoffs that are already running
+CREW_SHUTDOWN_TIMEOUT = float(os.getenv("CREW_SHUTDOWN_TIMEOUT", "60"))
+
+crew_executor = ThreadPoolExecutor(max_workers=CREW_MAX_WORKERS, thread_name_prefix="crew")
+_in_flight = set()
+
+
+async def run_in_crew_executor(fn, *args, **kwargs):
+    """Run a blocking crew call on the dedicated crew executor."""
+    future = crew_executor.submit(partial(fn, *args, **kwargs))
+    _in_flight.add(future)
+    future.add_done_callback(_in_flight.discard)
+    return await asyncio.wrap_future(future)
+
+
+def shutdown_executors(timeout: float = CREW_SHUTDOWN_TIMEOUT):
+    """Drain the crew executor: kickoffs that never started are cancelled, so whoever awaits
+    them gets a CancelledError, and running ones get up to `timeout` seconds to finish.
+    """
+    crew_executor.shutdown(wait=False, cancel_futures=True)
+    running = [future for future in list(_in_flight) if not future.done()]
+    if not running:
+        return
+    logger.info(f"Waiting up to {timeout:g}s for {len(running)} running crew kickoffs")
+    _, unfinished = wait(running, timeout)
+    if unfinished:
+        logger.warning(f"Shutting down with {len(unfinished)} crew kickoffs still running")
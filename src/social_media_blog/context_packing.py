@@ -0,0 +1,139 @@
+from collections import Counter
+from dotenv import load_dotenv
+from functools import lru_cache
+from .db_handler import logger
+import hashlib
+import math
+import os
+import re
+
+load_dotenv()
+
+WEB_CONTEXT_TOKENS = int(os.getenv("WEB_CONTEXT_TOKENS", "3000"))
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "1500"))
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "800"))
+PASSAGE_CHARS = 600
+MMR_LAMBDA = 0.7
+DUPLICATE_JACCARD = 0.8
+
+@lru_cache(maxsize=1)
+def token_encoding():
+    """The tokenizer behind count_tokens. The app loads it at start-up, since tiktoken may have to
+    download the BPE file; if that fails, token counts fall back to a characters/4 estimate."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        logger.warning("tiktoken is unavailable; estimating token counts from characters")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = token_encoding()
+    if encoding is None:
+        # Rough but serviceable for English prose
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _words(text: str):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_CHARS):
+    """Split on line breaks, then merge neighbouring lines into passages of up to max_chars."""
+    passages, current = [], ""
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+        if current and len(current) + len(line) + 1 > max_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _shingles(words, size: int = 3):
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _tfidf_vectors(texts):
+    counts = [Counter(_words(text)) for text in texts]
+    doc_freq = Counter(word for c in counts for word in c)
+    n = len(texts)
+    vectors = []
+    for c in counts:
+        vec = {w: (1 + math.log(k)) * math.log(1 + n / doc_freq[w]) for w, k in c.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vectors.append({w: v / norm for w, v in vec.items()})
+    return vectors
+
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(w, 0.0) for w, v in a.items())
+
+
+def pack_context(query: str, sources, token_budget: int, label: str = "context") -> str:
+    """Pack the passages most relevant to `query` into `token_budget` tokens.
+
+    `sources` is a list of (header, text) pairs; the header (e.g. an article title and link)
+    is kept above its passages. Passages are deduplicated, chosen by maximal marginal
+    relevance, and emitted in their original order.
+    """
+    passages = []  # (source index, position, text)
+    for s, (_, text) in enumerate(sources):
+        passages.extend((s, p, passage) for p, passage in enumerate(split_passages(text)))
+    original_tokens = sum(count_tokens(header) + count_tokens(text) for header, text in sources)
+    if not passages:
+        return ""
+
+    # 1. Drop exact and near-duplicate passages (word 3-gram Jaccard)
+    unique, seen_hashes, seen_shingles = [], set(), []
+    for item in passages:
+        words = _words(item[2])
+        digest = hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()
+        if digest in seen_hashes:
+            continue
+        shingles = _shingles(words)
+        if any(len(shingles & other) / len(shingles | other) >= DUPLICATE_JACCARD for other in seen_shingles):
+            continue
+        seen_hashes.add(digest)
+        seen_shingles.append(shingles)
+        unique.append(item)
+
+    # 2. Rank with MMR, 3. greedily fill the budget
+    vectors = _tfidf_vectors([query] + [text for _, _, text in unique])
+    query_vec, passage_vecs = vectors[0], vectors[1:]
+    relevance = [_cosine(query_vec, vec) for vec in passage_vecs]
+    header_tokens = {s: count_tokens(sources[s][0]) for s in range(len(sources))}
+    chosen, chosen_sources, used = [], set(), 0
+    candidates = set(range(len(unique)))
+    redundancy = [0.0] * len(unique)  # max similarity to anything already chosen
+    while candidates:
+        best = max(candidates, key=lambda i: MMR_LAMBDA * relevance[i] - (1 - MMR_LAMBDA) * redundancy[i])
+        candidates.discard(best)
+        s = unique[best][0]
+        cost = count_tokens(unique[best][2]) + (0 if s in chosen_sources else header_tokens[s])
+        if used + cost > token_budget:
+            continue
+        chosen.append(best)
+        chosen_sources.add(s)
+        used += cost
+        for i in candidates:
+            redundancy[i] = max(redundancy[i], _cosine(passage_vecs[i], passage_vecs[best]))
+
+    # 4. Reassemble in reading order, grouped under each source's header
+    blocks = []
+    for s in sorted(chosen_sources):
+        header = sources[s][0]
+        body = "\n".join(unique[i][2] for i in sorted(chosen, key=lambda i: unique[i][1]) if unique[i][0] == s)
+        blocks.append(f"{header}\n\n{body}" if header else body)
+    packed = "\n\n---\n\n".join(blocks)
+
+    logger.info(f"Context packing ({label}): {original_tokens} -> {used} tokens "
+                f"({original_tokens - used} saved, {len(passages) - len(unique)} duplicates dropped)")
+    return packed
@@ -1,37 +1,46 @@
-from crewai import Agent, Crew, Process, Task, LLM
+from crewai import Agent, Crew, Process, Task, TaskOutput
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from crewai.tools import tool
+from crewai.utilities.formatter import aggregate_raw_outputs_from_task_outputs
 from typing import List
 from dotenv import load_dotenv
-from ddgs import DDGS
-from bs4 import BeautifulSoup
-from crewai.tools import tool
-from dotenv import load_dotenv
-import pandas as pd
+from functools import lru_cache
 from pathlib import Path
 from .db_handler import logger, get_knowledge_base
-from .chat_models import BlogOutput
+from .chat_models import BlogOutput, ResearchModeEnum
+from .web_fetch import cached_search, fetch_articles
+from .context_packing import pack_context, WEB_CONTEXT_TOKENS, RAG_CONTEXT_TOKENS
+from .stage_cache import stage_cache, config_fingerprint
+from .metrics import instrument_crewai, span
+from .llm_gateway import hedged_crew_llm, CREW_HEDGE_MODELS
 import os
-import requests
 
 
 load_dotenv()
-knowledge_base = get_knowledge_base()
+instrument_crewai()
+
+RESEARCH_MODE = ResearchModeEnum(os.getenv("RESEARCH_MODE", "single"))
+# Sub-questions researched side by side in fanout mode; RESEARCH_FANOUT picks how many
+RESEARCH_ANGLES = [
+    "the current state of {topic}: key facts, definitions and the latest statistics",
+    "recent developments, news and emerging trends in {topic}",
+    "real-world applications, case studies and notable examples of {topic}",
+    "challenges, risks, criticism and expert opinions about {topic}",
+]
+RESEARCH_FANOUT = max(1, min(len(RESEARCH_ANGLES), int(os.getenv("RESEARCH_FANOUT", "3"))))
+# Task names of the fanout research branches, which together make up the research stage
+RESEARCH_BRANCHES = [f"research_task_{i}" for i in range(1, RESEARCH_FANOUT + 1)]
 
+@lru_cache(maxsize=1)
 def get_llm():
+    """Shared Gemini LLM for every agent, hedged to CREW_HEDGE_MODELS; created when the first crew is built."""
     try:
-        return LLM(
-            model="gemini/gemini-2.5-pro",
-            api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.5
-        )
+        return hedged_crew_llm("crew", ["gemini/gemini-2.5-pro"] + CREW_HEDGE_MODELS, temperature=0.5)
     except Exception as e:
         logger.error(f"Failed to connect to Gemini... : {e}")
         raise ValueError(f"Failed to connect to Gemini")
 
-llm = get_llm()
-
 @tool
 def web_search_tool(query: str) -> str:
     """A tool to search the web for current information."""
@@ -40,40 +49,23 @@ def web_search_tool(query: str) -> str:
         logger.info(f"Web Search Tool: searching for: {query}")
         results_txt = ""
 
-        with DDGS() as ddgs:
-            results = [r for r in ddgs.text(query=query, max_results=max_results)]
+        results = cached_search(query, max_results)
         
         if not results:
             return "No results found for your query"
         
         logger.info(f"Web search Tool: Retrieved {len(results)} search results.")
-        articles = []
-
-        for i, result in enumerate(results, 1):
-            title = result.get("title", "No title")
-            link = result.get("href", None)
-            snippet = result.get("body", "")
-            if not link:
-                continue
-
-            logger.info(f"Fetching article {i}: {title} ({link})")
-
-            try:
-                response = requests.get(link, timeout=8)
-                soup = BeautifulSoup(response.text, "html.parser")
-
-                paragraphs = [p.get_text() for p in soup.find_all("p")]
-                article_text = "\n".join(paragraphs[:-1])
-
-                articles.append(f"### {title}\n🔗 {link}\n\n{article_text}\n")
-            except Exception as e:
-                logger.warning(f"Skipping {link}: {e}")
-                continue
+        articles = fetch_articles(results)
 
         if not articles:
             return "No readable articles found from the search results."
         
-        results_text = "\n\n---\n\n".join(articles)
+        results_text = pack_context(
+            query,
+            [(f"### {article['title']}\n🔗 {article['link']}", article["text"]) for article in articles],
+            WEB_CONTEXT_TOKENS,
+            "web_search_tool"
+        )
         logger.info("Web Search Tool: Successfully extracted article content.")
         return results_text
 
@@ -87,8 +79,10 @@ def rag_tool(query: str) -> str:
     """A tool to retrieve relevant context from the Pinecone knowledge base."""
     try:
         logger.info(f"RAG Tool: Searching for documents related to the topic: '{query}'...")
-        retrieved_docs = knowledge_base.get_relevant_documents(query)
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        with span("retriever", caller="rag_tool"):
+            retrieved_docs = get_knowledge_base().get_relevant_documents(query)
+        context = pack_context(query, [("", doc.page_content) for doc in retrieved_docs],
+                               RAG_CONTEXT_TOKENS, "rag_tool")
         
         if not context:
             logger.warning("RAG Tool: No relevant information found.")
@@ -124,6 +118,21 @@ class SocialMediaBlog():
 
         self.agents: List[BaseAgent] = []
         self.tasks: List[Task] = []
+        # Set per run to receive each finished TaskOutput. CrewAI binds task callbacks on the
+        # first kickoff only, so the crew always points at _on_task_complete which forwards here.
+        self.stage_listener = None
+        self._resume_crew = None
+        self._fanout_crew = None
+        # Taken before CrewBase swaps agent names in the configs for live Agent objects
+        self.research_fingerprint = config_fingerprint(self.tasks_config.get("research_task"),
+                                                       self.agents_config.get("research_agent"))
+
+    def _on_task_complete(self, output):
+        if self.stage_listener is not None:
+            try:
+                self.stage_listener(output)
+            except Exception:
+                logger.exception("Stage listener failed")
 
     @agent
     def research_agent(self) -> Agent:
@@ -131,7 +140,7 @@ class SocialMediaBlog():
             config=self.agents_config["research_agent"],
             tools=[web_search_tool],
             verbose=True,
-            llm=llm
+            llm=get_llm()
         )
 
     @agent
@@ -139,7 +148,7 @@ class SocialMediaBlog():
         return Agent(
             config=self.agents_config["writing_agent"],
             verbose=True,
-            llm=llm
+            llm=get_llm()
         )
 
     @agent
@@ -147,7 +156,7 @@ class SocialMediaBlog():
         return Agent(
             config=self.agents_config["summarizing_agent"],
             verbose=True,
-            llm=llm
+            llm=get_llm()
         )
 
     @task
@@ -183,5 +192,123 @@ class SocialMediaBlog():
             tasks=self.tasks,
             process=Process.sequential,
             verbose=True,
-            llm=llm
-        )
\ No newline at end of file
+            llm=get_llm(),
+            task_callback=self._on_task_complete
+        )
+
+    def resume_crew(self) -> Crew:
+        """Writing and summarizing only; they read the research from research_task's output."""
+        if self._resume_crew is None:
+            research = self.research_task()
+            writing = Task(
+                config=self.tasks_config["writing_task"],
+                agent=self.writing_agent(),
+                context=[research],
+                name="writing_task"
+            )
+            summarizing = Task(
+                config=self.tasks_config["summarizing_task"],
+                agent=self.summarizing_agent(),
+                output_pydantic_model=BlogOutput,
+                context=[research, writing],
+                name="summarizing_task"
+            )
+            self._resume_crew = Crew(
+                agents=[self.writing_agent(), self.summarizing_agent()],
+                tasks=[writing, summarizing],
+                process=Process.sequential,
+                verbose=True,
+                llm=get_llm(),
+                task_callback=self._on_task_complete
+            )
+        return self._resume_crew
+
+    def fanout_crew(self) -> Crew:
+        """Research RESEARCH_FANOUT sub-questions concurrently, then write from the merged findings."""
+        if self._fanout_crew is None:
+            research_config = self.tasks_config["research_task"]
+            research_tasks = []
+            for name, angle in zip(RESEARCH_BRANCHES, RESEARCH_ANGLES):
+                # Each branch gets its own agent: an Agent is not safe to run two tasks at once
+                researcher = Agent(
+                    config=self.agents_config["research_agent"],
+                    tools=[web_search_tool],
+                    verbose=True,
+                    llm=get_llm()
+                )
+                research_tasks.append(Task(
+                    description=f"{research_config['description']}\n**Focus only on:** {angle}.",
+                    expected_output=f"{research_config['expected_output']} Limited to {angle}.",
+                    agent=researcher,
+                    async_execution=True,
+                    context=[],
+                    name=name
+                ))
+            writing = Task(
+                config=self.tasks_config["writing_task"],
+                agent=self.writing_agent(),
+                context=research_tasks,
+                name="writing_task"
+            )
+            summarizing = Task(
+                config=self.tasks_config["summarizing_task"],
+                agent=self.summarizing_agent(),
+                output_pydantic_model=BlogOutput,
+                context=research_tasks + [writing],
+                name="summarizing_task"
+            )
+            self._fanout_crew = Crew(
+                agents=[task.agent for task in research_tasks] + [self.writing_agent(), self.summarizing_agent()],
+                tasks=research_tasks + [writing, summarizing],
+                process=Process.sequential,
+                verbose=True,
+                llm=get_llm(),
+                task_callback=self._on_task_complete
+            )
+        return self._fanout_crew
+
+    def resummarize(self, writing: str, inputs: dict) -> str:
+        """Run the summarizing step again as a single LLM call over the finished writing output."""
+        config = self.tasks_config["summarizing_task"]
+        prompt = f"{config['description']}\n\nExpected output:\n{config['expected_output']}"
+        for name, value in inputs.items():
+            prompt = prompt.replace(f"{{{name}}}", str(getattr(value, "value", value)))
+        messages = [
+            {"role": "system", "content": "You turn finished blog reports into the exact JSON object requested."},
+            {"role": "user", "content": f"{prompt}\n\nReport from the WritingAgent:\n{writing}\n\n"
+                                        "Your previous answer could not be parsed. Reply with the JSON object only."},
+        ]
+        return get_llm().call(messages)
+
+    def built_crews(self) -> List[Crew]:
+        return [c for c in (self.crew(), self._resume_crew, self._fanout_crew) if c is not None]
+
+    def kickoff(self, inputs: dict, research_mode: ResearchModeEnum = None):
+        """Kick off the blog crew, resuming after research when this topic's report is memoized.
+
+        Research depends only on the topic, so one report serves every tone until it expires.
+        The report is shared between research modes. In fanout mode the merged sub-question
+        findings are what gets memoized.
+        """
+        research = stage_cache.get("research_task", self.research_fingerprint, topic=inputs["topic"])
+        if research is not None:
+            logger.info(f"Reusing memoized research for '{inputs['topic']}'")
+            research_task = self.research_task()
+            research_task.output = TaskOutput(
+                description=research_task.description,
+                name=research_task.name,
+                raw=research,
+                agent=research_task.agent.role
+            )
+            self._on_task_complete(research_task.output)
+            return self.resume_crew().kickoff(inputs=inputs)
+
+        if (research_mode or RESEARCH_MODE) == ResearchModeEnum.fanout:
+            logger.info(f"Researching '{inputs['topic']}' as {RESEARCH_FANOUT} parallel sub-questions")
+            response = self.fanout_crew().kickoff(inputs=inputs)
+            research = aggregate_raw_outputs_from_task_outputs(response.tasks_output[:RESEARCH_FANOUT])
+        else:
+            response = self.crew().kickoff(inputs=inputs)
+            research = response.tasks_output[0].raw
+        stage_cache.put("research_task", self.research_fingerprint, research, topic=inputs["topic"])
+        return response
\ No newline at end of file
@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from .db_handler import logger
+from .pipeline import run_blog_crew
+import threading
+import queue
+import time
+import os
+
+load_dotenv()
+
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "2"))
+CREW_POOL_TIMEOUT = float(os.getenv("CREW_POOL_TIMEOUT", "60"))
+
+
+class CrewPoolTimeout(Exception):
+    """No crew became free within the acquire timeout."""
+
+
+class PooledCrew:
+    def __init__(self):
+        # Imported here so importing the pool does not build the crew module's clients
+        from .crew import SocialMediaBlog, RESEARCH_BRANCHES
+
+        self.blog = SocialMediaBlog()
+        self.crew = self.blog.crew()
+        self.blog.resume_crew()
+        self.task_names = [task.name for task in self.crew.tasks]
+        self.research_branches = list(RESEARCH_BRANCHES)
+        self.uses = 0
+
+    def reset(self):
+        """Drop everything the last kickoff left behind on the agents and tasks."""
+        self.blog.stage_listener = None
+        for crew in self.blog.built_crews():
+            for task in crew.tasks:
+                task.output = None
+                task.used_tools = 0
+                task.retry_count = 0
+            for agent in crew.agents:
+                agent.tools_results = []
+            if crew.memory:
+                crew.reset_memories("all")
+
+
+class CrewPool:
+    """Fixed set of crews built at startup and lent out one kickoff at a time.
+
+    A crew carries per-run state on its agents and tasks, so two kickoffs must never share
+    one. Callers wait up to `acquire_timeout` seconds for a free crew; crews are reset
+    before they go back, and rebuilt if the reset fails.
+    """
+
+    def __init__(self, size: int = CREW_POOL_SIZE, acquire_timeout: float = CREW_POOL_TIMEOUT):
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.task_names = []
+        self.research_branches = []
+        self.counters = {"checkouts": 0, "timeouts": 0, "rebuilds": 0, "wait_seconds_total": 0.0,
+                         "wait_seconds_max": 0.0}
+
+    def start(self):
+        started = time.perf_counter()
+        for _ in range(self.size):
+            member = PooledCrew()
+            self.task_names = member.task_names
+            self.research_branches = member.research_branches
+            self._idle.put(member)
+        logger.info(f"Built {self.size} crews in {time.perf_counter() - started:.2f}s")
+        return self
+
+    @contextmanager
+    def checkout(self, wait_forever: bool = False):
+        """Lend out a crew. Raises CrewPoolTimeout if none frees up within the acquire timeout."""
+        started = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            member = self._idle.get(timeout=None if wait_forever else self.acquire_timeout)
+        except queue.Empty:
+            with self._lock:
+                self.counters["timeouts"] += 1
+            raise CrewPoolTimeout(f"No crew available within {self.acquire_timeout}s")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        waited = time.monotonic() - started
+        with self._lock:
+            self.counters["checkouts"] += 1
+            self.counters["wait_seconds_total"] += waited
+            self.counters["wait_seconds_max"] = max(self.counters["wait_seconds_max"], waited)
+        try:
+            member.uses += 1
+            yield member
+        finally:
+            self._give_back(member)
+
+    def _give_back(self, member: PooledCrew):
+        try:
+            member.reset()
+        except Exception:
+            logger.exception("Failed to reset a pooled crew; building a fresh one")
+            try:
+                member = PooledCrew()
+            except Exception:
+                # Keep the old one rather than shrink the pool
+                logger.exception("Failed to rebuild a pooled crew")
+            else:
+                with self._lock:
+                    self.counters["rebuilds"] += 1
+        self._idle.put(member)
+
+    def run(self, topic: str, tone, stage_listener=None, wait_forever: bool = False, research_mode=None):
+        """Kick off a pooled crew and return its BlogResponse. Blocking; run it off the event loop.
+
+        `stage_listener(output, task_names)` is called as each task finishes.
+        """
+        with self.checkout(wait_forever) as member:
+            if stage_listener is not None:
+                member.blog.stage_listener = lambda output: stage_listener(output, member.task_names)
+            return run_blog_crew(member.blog, topic, tone, research_mode=research_mode)
+
+    def stats(self) -> dict:
+        with self._lock:
+            checkouts = self.counters["checkouts"]
+            return {
+                "size": self.size,
+                "idle": self._idle.qsize(),
+                "in_use": self.size - self._idle.qsize(),
+                "waiting": self._waiting,
+                **self.counters,
+                "wait_seconds_avg": self.counters["wait_seconds_total"] / checkouts if checkouts else 0.0,
+            }
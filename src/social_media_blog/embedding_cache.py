@@ -0,0 +1,321 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+from .db_handler import logger
+from typing import List
+import numpy as np
+import threading
+import fcntl
+import hashlib
+import json
+import os
+import re
+
+load_dotenv()
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+# Vectors kept on disk per model (about 4 KB each at 1024 dimensions); 0 keeps them all
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "100000"))
+
+
+class DiskVectorStore:
+    """Append-only float32 matrix on disk plus a key file mapping keys to rows.
+
+    Rows are read through a memory map, so looking up a vector never loads the whole file.
+    Appends take an exclusive file lock, so several worker processes can share a directory;
+    each process reads only the keys appended since it last looked. Once there are more than
+    `max_rows` rows, the newest three quarters are copied into a new generation of files and
+    the rest are dropped. Readers notice a new generation on their next lookup, and files are
+    only opened under a shared lock, so the old generation can be removed under the exclusive
+    one; maps made before that keep working until they are replaced.
+    """
+
+    def __init__(self, directory: str, max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        self.directory = directory
+        self.max_rows = max_rows
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock_path = os.path.join(directory, ".lock")
+        self._state_lock = threading.Lock()  # rows, count and map swap together during a compaction
+        self.dim = None
+        self.generation = 0
+        self._meta_inode = None
+        self._vectors_path, self._keys_path = self._paths(0)
+        self.rows = {}
+        self.count = 0
+        self._keys_offset = 0
+        self._map = None
+        with self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+
+    def _paths(self, generation: int):
+        suffix = f".{generation}" if generation else ""
+        return (os.path.join(self.directory, f"vectors{suffix}.f32"),
+                os.path.join(self.directory, f"keys{suffix}.txt"))
+
+    @contextmanager
+    def _file_lock(self, mode):
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, mode)
+            yield
+
+    def _write_meta(self, generation: int):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "generation": generation}, f)
+        os.replace(tmp_path, self._meta_path)
+        self._meta_inode = os.stat(self._meta_path).st_ino
+
+    def _generation_changed(self) -> bool:
+        # meta.json is only ever replaced, never rewritten in place, so a new inode means a new generation
+        try:
+            return os.stat(self._meta_path).st_ino != self._meta_inode
+        except FileNotFoundError:
+            return False
+
+    def _refresh(self):
+        """Catch up with rows other processes appended, or a compaction, since we last looked."""
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+            self._meta_inode = os.fstat(f.fileno()).st_ino
+        self.dim = meta["dim"]
+        generation = meta.get("generation", 0)
+        if generation != self.generation:
+            with self._state_lock:
+                self.generation = generation
+                self._vectors_path, self._keys_path = self._paths(generation)
+                self.rows, self.count, self._keys_offset, self._map = {}, 0, 0, None
+        if not os.path.exists(self._keys_path) or not os.path.exists(self._vectors_path):
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            tail = f.read()
+        if not tail:
+            return
+        # A crash mid-append can leave keys and rows out of step; trust only keys with a full row
+        # behind them. The last piece of the split is empty or a torn line.
+        complete = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        with self._state_lock:
+            for line in tail.split(b"\n")[:-1]:
+                if self.count >= complete:
+                    break
+                self.rows[line.decode()] = self.count
+                self.count += 1
+                self._keys_offset += len(line) + 1
+            self._remap()
+
+    def _remap(self):
+        self._map = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                              shape=(self.count, self.dim)) if self.count else None
+
+    def get(self, key: str):
+        if self._generation_changed():
+            with self._file_lock(fcntl.LOCK_SH):
+                self._refresh()
+        with self._state_lock:
+            row = self.rows.get(key)
+            if row is None:
+                return None
+            if self._map is not None and row < self._map.shape[0]:
+                return self._map[row].tolist()
+        # Rows this process appended since the last map. Reopen the file under the shared lock,
+        # so a compaction elsewhere can't remove it in between.
+        with self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+            with self._state_lock:
+                row = self.rows.get(key)
+                if row is None:
+                    return None
+                if self._map is None or row >= self._map.shape[0]:
+                    self._remap()
+                return self._map[row].tolist()
+
+    def put_many(self, items):
+        with self._file_lock(fcntl.LOCK_EX):
+            # Another process may have appended or compacted since we last looked
+            self._refresh()
+            items = list({key: vector for key, vector in items if key not in self.rows}.items())
+            if not items:
+                return
+            if self.dim is None:
+                self.dim = len(items[0][1])
+                self._write_meta(self.generation)
+            matrix = np.asarray([vector for _, vector in items], dtype=np.float32)
+            start = self.count
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+                # Overwrite any torn row left behind by a crash before appending
+                f.seek(start * 4 * self.dim)
+                f.write(matrix.tobytes())
+                f.truncate()
+            new_keys = "".join(f"{key}\n" for key, _ in items).encode("utf-8")
+            with open(self._keys_path, "r+b" if os.path.exists(self._keys_path) else "wb") as f:
+                # Likewise for keys that never got their row
+                f.seek(self._keys_offset)
+                f.write(new_keys)
+                f.truncate()
+            with self._state_lock:
+                for offset, (key, _) in enumerate(items):
+                    self.rows[key] = start + offset
+                self.count = start + len(items)
+                self._keys_offset += len(new_keys)
+            if self.max_rows and self.count > self.max_rows:
+                self._compact()
+
+    def _compact(self):
+        """Keep the newest rows in a new generation of files. Called with the file lock held."""
+        keep = max(1, self.max_rows * 3 // 4)
+        newest = sorted(self.rows.items(), key=lambda item: item[1])[-keep:]
+        generation = self.generation + 1
+        vectors_path, keys_path = self._paths(generation)
+        source = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        rows = [row for _, row in newest]
+        with open(vectors_path, "wb") as f:
+            for i in range(0, len(rows), 4096):
+                f.write(source[rows[i:i + 4096]].tobytes())
+        keys = "".join(f"{key}\n" for key, _ in newest).encode("utf-8")
+        with open(keys_path, "wb") as f:
+            f.write(keys)
+        # meta.json names the live generation, so replacing it is what commits the compaction
+        self._write_meta(generation)
+        old_paths = (self._vectors_path, self._keys_path)
+        with self._state_lock:
+            self.generation = generation
+            self._vectors_path, self._keys_path = vectors_path, keys_path
+            self.rows = {key: row for row, (key, _) in enumerate(newest)}
+            self.count = len(newest)
+            self._keys_offset = len(keys)
+            self._remap()
+        # Readers only open files under the shared lock and check meta.json first, so with the
+        # exclusive lock held nobody can map these again; existing maps keep the data alive
+        for path in old_paths:
+            os.remove(path)
+        logger.info(f"Compacted the embedding cache in {self.directory} to its newest {self.count} rows")
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends texts it has never seen to the underlying model.
+
+    Vectors are keyed by model name, embedding kind (query or document) and a hash of the
+    text, kept in an in-memory LRU and, if a directory is configured, on disk.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR,
+                 memory_size: int = EMBEDDING_CACHE_SIZE):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._disk = None
+        if cache_dir:
+            try:
+                self._disk = DiskVectorStore(os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)))
+            except Exception:
+                logger.exception("Failed to open the embedding cache directory; continuing in memory only")
+        # Disk writes run here, one at a time, so neither the event loop nor the caller waits on them
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-cache") if self._disk else None
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                elif self._disk is not None:
+                    vector = self._disk.get(key)
+                    if vector is not None:
+                        self._remember(key, vector)
+                if vector is not None:
+                    found[key] = vector
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _store(self, items):
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+        if self._writer is not None:
+            self._writer.submit(self._persist, items)
+
+    def _persist(self, items):
+        try:
+            self._disk.put_many(items)
+        except Exception:
+            logger.exception("Failed to persist embeddings")
+
+    def flush(self):
+        """Wait until every embedding handed to the cache so far is on disk."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def _split(self, kind: str, texts: List[str]):
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        return keys, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._split("document", texts)
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self._store(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._split("query", [text])
+        if missing:
+            vector = self.underlying.embed_query(text)
+            self._store([(keys[0], vector)])
+            return vector
+        return found[keys[0]]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._split("document", texts)
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self._store(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._split("query", [text])
+        if missing:
+            vector = await self.underlying.aembed_query(text)
+            self._store([(keys[0], vector)])
+            return vector
+        return found[keys[0]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk.rows) if self._disk is not None else 0,
+            }
@@ -0,0 +1,131 @@
+from html.parser import HTMLParser
+from dotenv import load_dotenv
+import codecs
+import os
+import re
+
+load_dotenv()
+
+WEB_FETCH_MAX_BYTES = int(os.getenv("WEB_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+ARTICLE_TEXT_BUDGET = int(os.getenv("ARTICLE_TEXT_BUDGET", "8000"))
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside",
+             "form", "iframe", "button", "select", "dialog"}
+# Matched against whole words of class and id values ("cookie-banner", "share_bar"), never
+# substrings, so "shareholders" or "commentary" are kept
+BOILERPLATE = re.compile(r"(cookie|consent|gdpr|banner|newsletter|subscribe|subscription|promo|promoted|ad|advert|"
+                         r"advertisement|sponsor|sponsored|share|sharing|social|related|recommend|recommended|"
+                         r"recommendation|comment|breadcrumb|menu|navbar|footer|sidebar|popup|modal)s?",
+                         re.IGNORECASE)
+CLASS_WORDS = re.compile(r"[\s_-]+")
+CONTAINER_TAGS = {"html", "body", "main", "article"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class ArticleExtractor(HTMLParser):
+    """Incremental parser that keeps paragraph text and drops boilerplate.
+
+    Feed it chunks as they arrive; `done` turns true once `text_budget` characters have
+    been collected, so the caller can stop downloading.
+    """
+
+    def __init__(self, text_budget: int = ARTICLE_TEXT_BUDGET):
+        super().__init__(convert_charrefs=True)
+        self.text_budget = text_budget
+        self.paragraphs = []
+        self.length = 0
+        self.done = False
+        self._skip_tag = None
+        self._skip_depth = 0
+        self._in_paragraph = False
+        self._buffer = []
+
+    def _is_boilerplate(self, tag, attrs) -> bool:
+        if tag in SKIP_TAGS:
+            return True
+        if tag in CONTAINER_TAGS:
+            # Page-level wrappers often carry classes like "has-sidebar"; never drop them wholesale
+            return False
+        for name, value in attrs:
+            if value and (name in ("class", "id") and any(BOILERPLATE.fullmatch(word) for word in CLASS_WORDS.split(value))
+                          or name == "role" and value in ("navigation", "banner", "contentinfo", "dialog")
+                          or name == "aria-hidden" and value == "true"):
+                return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done or tag in VOID_TAGS:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if self._is_boilerplate(tag, attrs):
+            self._skip_tag, self._skip_depth = tag, 1
+            return
+        if tag == "p":
+            self._flush()
+            self._in_paragraph = True
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag == "p":
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_paragraph and self._skip_tag is None and not self.done:
+            self._buffer.append(data)
+
+    def _flush(self):
+        if self._in_paragraph:
+            text = " ".join("".join(self._buffer).split())
+            if text:
+                remaining = self.text_budget - self.length
+                self.paragraphs.append(text[:remaining])
+                self.length += min(len(text), remaining) + 1
+                if self.length >= self.text_budget:
+                    self.done = True
+        self._in_paragraph = False
+        self._buffer = []
+
+    def text(self) -> str:
+        self._flush()
+        return "\n".join(self.paragraphs)
+
+
+def is_html(content_type: str) -> bool:
+    return not content_type or "html" in content_type.lower()
+
+
+def extract_from_chunks(chunks, encoding: str = "utf-8", max_bytes: int = WEB_FETCH_MAX_BYTES,
+                        text_budget: int = ARTICLE_TEXT_BUDGET) -> str:
+    """Extract article text from an iterable of byte chunks, stopping at the byte cap or text budget."""
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    extractor = ArticleExtractor(text_budget)
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done or received >= max_bytes:
+            break
+    return extractor.text()
+
+
+def extract_from_response(response, max_bytes: int = WEB_FETCH_MAX_BYTES,
+                          text_budget: int = ARTICLE_TEXT_BUDGET) -> str:
+    """Extract article text from a streamed requests response. Raises ValueError for non-HTML bodies."""
+    content_type = response.headers.get("Content-Type", "")
+    if not is_html(content_type):
+        raise ValueError(f"unsupported content type {content_type!r}")
+    # requests falls back to ISO-8859-1 when no charset is declared; most pages are UTF-8
+    encoding = response.encoding if "charset" in content_type.lower() else "utf-8"
+    try:
+        encoding = codecs.lookup(encoding or "utf-8").name
+    except LookupError:
+        encoding = "utf-8"
+    return extract_from_chunks(response.iter_content(chunk_size=16384), encoding, max_bytes, text_budget)
@@ -0,0 +1,275 @@
+"""Incremental ingestion of the content/ PDFs into the knowledge base.
+
+Run with ``python -m src.social_media_blog.ingest``. Files whose SHA-256 matches the manifest
+from the previous run are skipped outright; inside a changed file only chunks with new text
+are embedded, and chunks that disappeared are deleted from the index. Chunk ids are derived
+from the source path and chunk text, so re-runs upsert in place.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from dotenv import load_dotenv
+from pathlib import Path
+from .db_handler import logger, get_embeddings, embedding_model, index_name, vector_backend
+import numpy as np
+import argparse
+import hashlib
+import json
+import time
+import os
+
+load_dotenv()
+
+main_directory = Path(__file__).resolve().parent.parent.parent
+CONTENT_DIR = main_directory / "content"
+MANIFEST_PATH = main_directory / "db" / "ingest_manifest.json"
+
+
+def file_fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    return hashlib.sha1(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def parse_pdf(path: str, chunk_size: int, chunk_overlap: int):
+    """Load and split one PDF. Runs in a worker process."""
+    pages = PyPDFLoader(path).load()
+    for page in pages:
+        # The exported PDFs put a line break between most words; collapse it before splitting
+        page.page_content = " ".join(page.page_content.split())
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = splitter.split_documents(pages)
+    return len(pages), [(chunk.page_content, chunk.metadata.get("page")) for chunk in chunks]
+
+
+class PineconeSink:
+    def __init__(self, dimension: int = None):
+        """Open the index, creating it at `dimension` if given. Without one, a missing index is left alone."""
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        self.index = None
+        if index_name not in pc.list_indexes().names():
+            if dimension is None:
+                logger.info(f"Pinecone index '{index_name}' does not exist; nothing to delete")
+                return
+            logger.info(f"Pinecone index '{index_name}' does not exist. Creating new index...")
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region='us-east-1')
+            )
+            while not pc.describe_index(index_name).status['ready']:
+                time.sleep(0.5)
+        self.index = pc.Index(index_name)
+
+    def upsert(self, ids, vectors, texts, metadatas):
+        # "text" is the key PineconeVectorStore reads page_content from
+        self.index.upsert(
+            vectors=[{"id": i, "values": v.tolist(), "metadata": {**m, "text": t}}
+                     for i, v, t, m in zip(ids, vectors, texts, metadatas)],
+            batch_size=200
+        )
+
+    def delete(self, ids):
+        if self.index is None:
+            return
+        for start in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[start:start + 1000])
+
+    def close(self):
+        pass
+
+
+class LocalSink:
+    """Collects the embedded batches and writes them to the local index in one upsert."""
+
+    def __init__(self, embeddings, directory: str = None):
+        from .vector_store import LocalVectorStore
+
+        # Nothing searches this copy of the index, so don't cluster it; the server builds its own IVF
+        kwargs = {"directory": directory} if directory else {}
+        self.store = LocalVectorStore(embeddings, ann_min=0, **kwargs)
+        self._batches = []
+
+    def upsert(self, ids, vectors, texts, metadatas):
+        self._batches.append((ids, vectors, texts, metadatas))
+
+    def _flush(self):
+        if not self._batches:
+            return
+        ids, vectors, texts, metadatas = zip(*self._batches)
+        self._batches = []
+        self.store.add_vectors(np.concatenate(vectors),
+                               [text for batch in texts for text in batch],
+                               [metadata for batch in metadatas for metadata in batch],
+                               [cid for batch in ids for cid in batch])
+
+    def delete(self, ids):
+        self._flush()
+        self.store.delete(ids)
+
+    def close(self):
+        self._flush()
+        self.store.save()
+
+
+def load_manifest(settings: dict, force: bool = False):
+    """Return (manifest, orphaned chunk ids).
+
+    When the settings changed or `force` is set, the previous manifest is discarded, and the
+    chunk ids it recorded in the same index are returned so they can be deleted rather than
+    left behind next to the re-ingested chunks.
+    """
+    if not MANIFEST_PATH.exists():
+        return {"settings": settings, "files": {}}, []
+    with open(MANIFEST_PATH) as f:
+        manifest = json.load(f)
+    old_settings = manifest.get("settings") or {}
+    if old_settings == settings and not force:
+        return manifest, []
+    if not force:
+        logger.info("Ingestion settings changed since the last run; re-ingesting everything")
+    orphaned = [cid for entry in manifest.get("files", {}).values() for cid in entry.get("chunk_ids", [])]
+    same_index = all(old_settings.get(name) == settings[name] for name in ("backend", "index"))
+    if orphaned and not same_index:
+        logger.warning(f"{len(orphaned)} chunks from the previous run stay in the {old_settings.get('backend')} "
+                       f"index '{old_settings.get('index')}'; delete them there if they are no longer needed")
+        orphaned = []
+    return {"settings": settings, "files": {}}, orphaned
+
+
+def save_manifest(manifest: dict):
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def ingest(content_dir: Path = CONTENT_DIR, backend: str = vector_backend, chunk_size: int = 1000,
+           chunk_overlap: int = 150, workers: int = None, batch_size: int = 96, embed_workers: int = 4,
+           force: bool = False) -> dict:
+    started = time.perf_counter()
+    settings = {"backend": backend, "index": index_name if backend == "pinecone" else "local",
+                "embedding_model": embedding_model, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+    manifest, orphaned = load_manifest(settings, force)
+    previous = manifest["files"]
+
+    pdfs = sorted(content_dir.glob("*.pdf"))
+    fingerprints = {pdf.relative_to(content_dir).as_posix(): file_fingerprint(pdf) for pdf in pdfs}
+    changed = [source for source, digest in fingerprints.items()
+               if previous.get(source, {}).get("sha256") != digest]
+    removed = [source for source in previous if source not in fingerprints]
+    logger.info(f"Found {len(pdfs)} PDFs: {len(changed)} new or changed, {len(removed)} removed")
+
+    stats = {"files": len(pdfs), "changed_files": len(changed), "pages": 0, "chunks": 0,
+             "embedded_chunks": 0, "deleted_chunks": 0}
+    if not changed and not removed and not orphaned:
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Knowledge base is up to date")
+        return stats
+
+    # 1. Parse and split the changed PDFs in parallel
+    parse_started = time.perf_counter()
+    new_files, pending = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(parse_pdf, str(content_dir / source), chunk_size, chunk_overlap): source
+                   for source in changed}
+        for future in as_completed(futures):
+            source = futures[future]
+            page_count, chunks = future.result()
+            stats["pages"] += page_count
+            old_ids = set(previous.get(source, {}).get("chunk_ids", []))
+            ids, seen = [], set()
+            for text, page in chunks:
+                cid = chunk_id(source, text)
+                if cid in pending or cid in seen:
+                    continue
+                ids.append(cid)
+                seen.add(cid)
+                if cid not in old_ids:
+                    pending[cid] = (text, {"source": source, "page": page})
+            new_files[source] = {"sha256": fingerprints[source], "chunk_ids": ids}
+            stats["chunks"] += len(ids)
+    parse_seconds = time.perf_counter() - parse_started
+    logger.info(f"Parsed {stats['pages']} pages into {stats['chunks']} chunks in {parse_seconds:.2f}s "
+                f"({stats['pages'] / parse_seconds:.1f} pages/s)")
+
+    # 2. Embed only the chunks whose text is new, in parallel batches
+    embeddings = get_embeddings()
+    if embeddings is None:
+        raise RuntimeError("Embedding model is unavailable. Check COHERE_API_KEY.")
+    embed_started = time.perf_counter()
+    pending_ids = list(pending)
+    batches = [pending_ids[i:i + batch_size] for i in range(0, len(pending_ids), batch_size)]
+    sink = None
+    with ThreadPoolExecutor(max_workers=embed_workers) as pool:
+        futures = {pool.submit(embeddings.embed_documents, [pending[cid][0] for cid in batch]): batch
+                   for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            vectors = np.asarray(future.result(), dtype=np.float32)
+            if sink is None:
+                sink = PineconeSink(vectors.shape[1]) if backend == "pinecone" else LocalSink(embeddings)
+            sink.upsert(batch, vectors, [pending[cid][0] for cid in batch], [pending[cid][1] for cid in batch])
+            stats["embedded_chunks"] += len(batch)
+    embed_seconds = time.perf_counter() - embed_started
+    if pending_ids:
+        logger.info(f"Embedded and upserted {len(pending_ids)} chunks in {embed_seconds:.2f}s "
+                    f"({len(pending_ids) / embed_seconds:.1f} chunks/s)")
+
+    # 3. Drop chunks that no longer exist in changed or removed files, or in a discarded manifest
+    stale = []
+    for source in changed + removed:
+        keep = set(new_files.get(source, {}).get("chunk_ids", []))
+        stale.extend(cid for cid in previous.get(source, {}).get("chunk_ids", []) if cid not in keep)
+    if orphaned:
+        keep = {cid for entry in new_files.values() for cid in entry["chunk_ids"]}
+        stale.extend(cid for cid in orphaned if cid not in keep)
+    if stale:
+        if sink is None:
+            # Nothing was embedded, so there is no dimension to create an index with; only open one
+            sink = PineconeSink() if backend == "pinecone" else LocalSink(embeddings)
+        sink.delete(stale)
+        stats["deleted_chunks"] = len(stale)
+    if sink is not None:
+        sink.close()
+
+    for source in removed:
+        previous.pop(source, None)
+    previous.update(new_files)
+    save_manifest(manifest)
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["pages_per_second"] = round(stats["pages"] / elapsed, 2)
+    stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 2)
+    logger.info(f"Ingestion finished: {json.dumps(stats)}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest the content/ PDFs into the knowledge base.")
+    parser.add_argument("--content-dir", type=Path, default=CONTENT_DIR)
+    parser.add_argument("--backend", choices=["pinecone", "local"], default=vector_backend)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--workers", type=int, default=None, help="PDF parsing processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=96, help="Texts per embedding request")
+    parser.add_argument("--embed-workers", type=int, default=4, help="Concurrent embedding requests")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-ingest everything")
+    args = parser.parse_args()
+    print(json.dumps(ingest(args.content_dir, args.backend, args.chunk_size, args.chunk_overlap, args.workers,
+                            args.batch_size, args.embed_workers, args.force), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .chat_models import BlogJobStatus, JobStateEnum
+from .db_handler import logger
+from .pipeline import error_blog_response
+import threading
+import queue
+import time
+import uuid
+import os
+
+load_dotenv()
+
+BLOG_WORKERS = int(os.getenv("BLOG_WORKERS", "2"))
+BLOG_QUEUE_SIZE = int(os.getenv("BLOG_QUEUE_SIZE", "50"))
+BLOG_JOB_TTL = float(os.getenv("BLOG_JOB_TTL", "3600"))
+BLOG_JOB_MAX_FINISHED = int(os.getenv("BLOG_JOB_MAX_FINISHED", "500"))
+BLOG_SHUTDOWN_TIMEOUT = float(os.getenv("BLOG_SHUTDOWN_TIMEOUT", "60"))
+SHUTDOWN_MESSAGE = "The server shut down before this blog was generated. Please submit it again."
+
+
+class BlogJob:
+    def __init__(self, topic: str, tone, research_mode=None):
+        self.job_id = uuid.uuid4().hex
+        self.topic = topic
+        self.tone = tone
+        self.research_mode = research_mode
+        self.state = JobStateEnum.queued
+        self.stage = None
+        self.result = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.updated_at = time.time()
+
+    def status(self) -> BlogJobStatus:
+        return BlogJobStatus(
+            job_id=self.job_id,
+            status=self.state,
+            stage=self.stage,
+            result=self.result,
+            created_at=self.created_at,
+            updated_at=self.updated_at
+        )
+
+
+class BlogJobManager:
+    """Queue of blog generations drained by worker threads.
+
+    Workers borrow a crew from the shared CrewPool for each job, so kickoffs never share
+    agent state. With a BlogResultCache, cached or in-flight blogs are reused. Finished jobs are kept for BLOG_JOB_TTL seconds (and at most
+    BLOG_JOB_MAX_FINISHED of them).
+    """
+
+    def __init__(self, pool, cache=None, workers: int = BLOG_WORKERS, queue_size: int = BLOG_QUEUE_SIZE,
+                 ttl: float = BLOG_JOB_TTL, max_finished: int = BLOG_JOB_MAX_FINISHED):
+        self.pool = pool
+        self.cache = cache
+        self.workers = workers
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"blog-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} blog workers")
+
+    def stop(self, timeout: float = BLOG_SHUTDOWN_TIMEOUT):
+        """Stop the workers. Queued jobs fail straight away; running ones get up to `timeout`
+        seconds to finish and are marked failed if they don't, so no poller waits forever.
+        """
+        self._stopping.set()
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._finish(job, JobStateEnum.failed, error_blog_response(SHUTDOWN_MESSAGE))
+            self._queue.task_done()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.state == JobStateEnum.running]
+        for job in running:
+            logger.warning(f"Blog job {job.job_id} was still running at shutdown")
+            self._finish(job, JobStateEnum.failed, error_blog_response(SHUTDOWN_MESSAGE))
+
+    def submit(self, topic: str, tone, research_mode=None) -> BlogJob:
+        """Queue a job. Raises queue.Full when the backlog is at capacity."""
+        job = BlogJob(topic, tone, research_mode)
+        with self._lock:
+            self._evict_expired()
+            self._jobs[job.job_id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            raise
+        logger.info(f"Queued blog job {job.job_id}")
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def _finish(self, job: BlogJob, state: JobStateEnum, result):
+        job.update(state=state, stage=None, result=result)
+        with self._lock:
+            self._finished[job.job_id] = job.updated_at
+            while len(self._finished) > self.max_finished:
+                old_id, _ = self._finished.popitem(last=False)
+                self._jobs.pop(old_id, None)
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > cutoff:
+                break
+            self._finished.popitem(last=False)
+            self._jobs.pop(job_id, None)
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                branches, finished_branches = set(self.pool.research_branches), set()
+
+                def on_task_complete(output, task_names, job=job):
+                    name = output.name
+                    if name in branches:
+                        # Fanout research branches run side by side; research is over when the last one is
+                        finished_branches.add(name)
+                        if finished_branches != branches:
+                            return
+                        name = "research_task"
+                    done = task_names.index(name) + 1 if name in task_names else 0
+                    job.update(stage=task_names[done] if done < len(task_names) else None)
+
+                task_names = self.pool.task_names
+                job.update(state=JobStateEnum.running, stage=task_names[0] if task_names else None)
+
+                # Jobs are already queued, so wait for a crew however long it takes
+                def generate(job=job, on_task_complete=on_task_complete):
+                    return self.pool.run(job.topic, job.tone, stage_listener=on_task_complete, wait_forever=True,
+                                         research_mode=job.research_mode)
+
+                if self.cache is None:
+                    result = generate()
+                else:
+                    result = self.cache.run(job.topic, job.tone, generate, job.research_mode)
+                state = JobStateEnum.completed if result.status == "success" else JobStateEnum.failed
+                self._finish(job, state, result)
+                logger.info(f"Blog job {job.job_id} finished with status {state.value}")
+            except Exception:
+                logger.exception(f"Blog job {job.job_id} failed")
+                self._finish(job, JobStateEnum.failed, error_blog_response())
+            finally:
+                self._queue.task_done()
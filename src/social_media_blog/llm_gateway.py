@@ -0,0 +1,381 @@
+"""Hedged, deadline-bounded LLM calls with a circuit breaker per provider.
+
+A call goes to the first provider whose breaker lets it through. If no answer has come back
+within that provider's recent latency percentile, the same request is also sent to the next
+provider, and whichever answers first wins. A failed call moves on to the next provider
+straight away. Every call has an overall deadline.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict, deque
+from functools import partial
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+from dotenv import load_dotenv
+from typing import Any
+from .db_handler import logger
+from .metrics import LLMMetricsHandler
+import threading
+import asyncio
+import copy
+import math
+import time
+import os
+
+load_dotenv()
+
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "30"))
+CREW_LLM_DEADLINE = float(os.getenv("CREW_LLM_DEADLINE", "180"))
+# Agent calls run far longer than chat ones, so by default they are only hedged once there are samples
+CREW_HEDGE_DELAY = float(os.getenv("CREW_HEDGE_DELAY")) if os.getenv("CREW_HEDGE_DELAY") else None
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+# Alternates, tried in order after the primary model
+CHAT_HEDGE_MODELS = [m.strip() for m in os.getenv("CHAT_HEDGE_MODELS", "gemini:gemini-2.5-flash").split(",") if m.strip()]
+CREW_HEDGE_MODELS = [m.strip() for m in os.getenv("CREW_HEDGE_MODELS", "gemini/gemini-2.5-flash").split(",") if m.strip()]
+
+# Blocking (CrewAI) calls run here, so a losing request can finish in the background
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_THREADS", "32")), thread_name_prefix="llm-hedge")
+HEDGERS = {}
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _hedge_loop() -> asyncio.AbstractEventLoop:
+    """Event loop that Hedger.call() schedules on, started on first use and shared by every hedger."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-hedge-loop", daemon=True).start()
+        return _loop
+
+
+def _discard_result(discard, task: asyncio.Task):
+    if not task.cancelled() and task.exception() is None:
+        discard(task.result())
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+class NoProviderAvailable(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failures` failures in a row, then lets one trial call through every `reset_after` seconds."""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, reset_after: float = LLM_BREAKER_RESET):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or (self._opened_at is None and self._consecutive >= self.failures):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+            self._trial = False
+
+
+class Provider:
+    """One model behind the gateway, with its breaker and a window of recent latencies."""
+
+    def __init__(self, name: str, model, breaker: CircuitBreaker = None, window: int = 200):
+        self.name = name
+        self.model = model
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))  # call kind -> seconds
+        self.counters = Counter({"calls": 0, "errors": 0})
+
+    def hedge_delay(self, kind: str, default: float = LLM_HEDGE_DELAY):
+        """Seconds to wait for this provider before hedging: its recent latency percentile.
+
+        Until there are enough samples, `default`; None means don't hedge yet.
+        """
+        samples = sorted(self._latencies[kind])
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return default
+        index = min(len(samples) - 1, math.ceil(LLM_HEDGE_PERCENTILE / 100 * len(samples)) - 1)
+        return max(LLM_HEDGE_MIN_DELAY, samples[index])
+
+    def record(self, kind: str, seconds: float, outcome: str):
+        if outcome == "cancelled":
+            return  # lost a hedge race: its time is how long the winner took, not this provider
+        self._latencies[kind].append(seconds)
+        self.counters["calls"] += 1
+        if outcome == "ok":
+            self.breaker.success()
+        else:
+            self.counters["errors"] += 1
+            self.breaker.failure()
+
+    def stats(self, default_delay: float = LLM_HEDGE_DELAY) -> dict:
+        delays = {kind: self.hedge_delay(kind, default_delay) for kind in list(self._latencies)}
+        return {**self.counters, "breaker": self.breaker.state, "breaker_opened": self.breaker.opened,
+                **{f"hedge_delay_{kind}": round(delay, 3) if delay is not None else None
+                   for kind, delay in delays.items()}}
+
+
+class Hedger:
+    """Hedging, failover and deadline policy over an ordered list of providers."""
+
+    def __init__(self, name: str, providers, deadline: float = LLM_DEADLINE, default_delay: float = LLM_HEDGE_DELAY):
+        self.name = name
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.default_delay = default_delay  # hedge delay until a provider has enough samples; None waits for them
+        self._lock = threading.Lock()
+        self.counters = Counter({"calls": 0, "hedged": 0, "alternate_wins": 0, "failovers": 0,
+                                 "deadline_exceeded": 0, "no_provider": 0})
+        HEDGERS[name] = self
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    async def _timed(self, provider: Provider, invoke, kind: str):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await invoke(provider)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            provider.record(kind, time.perf_counter() - started, outcome)
+
+    async def acall(self, invoke, kind: str = "call", discard=None):
+        """Await `invoke(provider)` under the hedging policy and return the first successful result.
+
+        `discard(result)` is called with every other result that still arrives, e.g. to close it.
+        """
+        self._count("calls")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        remaining = iter(self.providers)
+        running = {}  # task -> provider
+        hedge_at = None
+        last_error = None
+
+        def launch() -> bool:
+            nonlocal hedge_at
+            for provider in remaining:
+                if provider.breaker.allow():
+                    running[asyncio.ensure_future(self._timed(provider, invoke, kind))] = provider
+                    delay = provider.hedge_delay(kind, self.default_delay)
+                    hedge_at = loop.time() + delay if delay is not None else None
+                    return True
+            hedge_at = None
+            return False
+
+        if not launch():
+            self._count("no_provider")
+            raise NoProviderAvailable(f"Every provider behind {self.name} has an open circuit breaker")
+        try:
+            while running:
+                now = loop.time()
+                if now >= deadline:
+                    self._count("deadline_exceeded")
+                    raise LLMDeadlineExceeded(f"{self.name} got no answer within {self.deadline:g}s")
+                wake = min(deadline, hedge_at) if hedge_at is not None else deadline
+                done, _ = await asyncio.wait(running, timeout=max(0.0, wake - now),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if hedge_at is not None and loop.time() >= hedge_at and launch():
+                        self._count("hedged")
+                    continue
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        if provider is not self.providers[0]:
+                            self._count("alternate_wins")
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"{self.name}: {provider.name} failed: {last_error!r}")
+                    if launch():
+                        self._count("failovers")
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
+                if discard is not None:
+                    # A task that finished in the same wake-up as the winner still holds its result
+                    task.add_done_callback(partial(_discard_result, discard))
+
+    def call(self, invoke, kind: str = "call"):
+        """Blocking variant of acall() for a blocking `invoke(provider)`.
+
+        Scheduled on the shared hedge loop; losing requests keep their thread until they return.
+        """
+        loop = _hedge_loop()
+        coroutine = self.acall(lambda provider: loop.run_in_executor(_executor, invoke, provider), kind)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, "providers": {provider.name: provider.stats(self.default_delay) for provider in self.providers}}
+
+
+def gateway_stats() -> dict:
+    return {name: hedger.stats() for name, hedger in HEDGERS.items()}
+
+
+class HedgedChatModel(BaseChatModel):
+    """LangChain chat model that sends each call through a Hedger.
+
+    Streaming calls are hedged on the first token; once a provider has started streaming,
+    the rest of its reply is passed through as it comes.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    hedger: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-chat"
+
+    def _result(self, message) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self._result(self.hedger.call(lambda p: p.model.invoke(messages, stop=stop, **kwargs)))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self._result(await self.hedger.acall(lambda p: p.model.ainvoke(messages, stop=stop, **kwargs)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async def first_token(provider):
+            stream = provider.model.astream(messages, stop=stop, **kwargs)
+            try:
+                return stream, await stream.__anext__()
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        # Streams that lose the race are closed, so their connections go back to the pool
+        stream, first = await self.hedger.acall(first_token, kind="first_token",
+                                                discard=lambda result: asyncio.ensure_future(result[0].aclose()))
+        try:
+            yield ChatGenerationChunk(message=first)
+            async for chunk in stream:
+                yield ChatGenerationChunk(message=chunk)
+        finally:
+            await stream.aclose()
+
+
+def build_chat_model(spec: str, temperature: float):
+    """LangChain chat model for a "provider:model" spec, e.g. "groq:llama-3.1-8b-instant"."""
+    provider, _, model = spec.partition(":")
+    callbacks = [LLMMetricsHandler(provider)]
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+
+        return ChatGroq(model=model, api_key=os.getenv("GROQ_API_KEY"), temperature=temperature,
+                        timeout=LLM_DEADLINE, callbacks=callbacks)
+    if provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(model=model, google_api_key=os.getenv("GOOGLE_API_KEY"),
+                                      temperature=temperature, timeout=LLM_DEADLINE, callbacks=callbacks)
+    raise ValueError(f"Unknown chat model provider in {spec!r}; expected groq:<model> or gemini:<model>")
+
+
+def hedged_chat_model(name: str, specs, temperature: float) -> HedgedChatModel:
+    providers = []
+    for spec in specs:
+        try:
+            providers.append(Provider(spec, build_chat_model(spec, temperature)))
+        except Exception as e:
+            if not providers:
+                raise
+            logger.warning(f"Skipping alternate chat model {spec}: {e}")
+    return HedgedChatModel(hedger=Hedger(name, providers, LLM_DEADLINE))
+
+
+def hedged_crew_llm(name: str, models, temperature: float):
+    """CrewAI LLM that hedges across LiteLLM model names such as "gemini/gemini-2.5-pro"."""
+    from crewai import LLM
+    from crewai.llms.base_llm import BaseLLM
+
+    api_keys = {"gemini": os.getenv("GOOGLE_API_KEY"), "groq": os.getenv("GROQ_API_KEY")}
+
+    class HedgedCrewLLM(BaseLLM):
+        def __init__(self, hedger: Hedger):
+            primary = hedger.providers[0].model
+            super().__init__(model=primary.model, temperature=temperature)
+            self.hedger = hedger
+            self._copies = {}  # (provider name, stop words) -> provider model carrying those stop words
+            self._copies_lock = threading.Lock()
+
+        def _model(self, provider: Provider, stop: tuple):
+            # The agent executor sets its ReAct stop words on the LLM it was given. The provider
+            # models are shared by every agent, so each set of stop words gets its own copy.
+            key = (provider.name, stop)
+            with self._copies_lock:
+                model = self._copies.get(key)
+                if model is None:
+                    model = copy.copy(provider.model)
+                    model.stop = list(stop)
+                    self._copies[key] = model
+                return model
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None,
+                 from_task=None, from_agent=None):
+            stop = tuple(self.stop or ())
+
+            def invoke(provider):
+                model = self._model(provider, stop)
+                return model.call(messages, tools, callbacks, available_functions, from_task, from_agent)
+
+            return self.hedger.call(invoke)
+
+        def supports_function_calling(self) -> bool:
+            return all(provider.model.supports_function_calling() for provider in self.hedger.providers)
+
+        def supports_stop_words(self) -> bool:
+            return all(provider.model.supports_stop_words() for provider in self.hedger.providers)
+
+        def get_context_window_size(self) -> int:
+            return min(provider.model.get_context_window_size() for provider in self.hedger.providers)
+
+    providers = [Provider(model, LLM(model=model, api_key=api_keys.get(model.split("/", 1)[0]),
+                                     temperature=temperature, timeout=CREW_LLM_DEADLINE))
+                 for model in models]
+    return HedgedCrewLLM(Hedger(name, providers, CREW_LLM_DEADLINE, CREW_HEDGE_DELAY))
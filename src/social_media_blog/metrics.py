@@ -0,0 +1,297 @@
+"""Latency histograms, counters and optional OpenTelemetry spans.
+
+Everything is recorded in-process and rendered in the Prometheus text format by ``GET /metrics``.
+With several uvicorn workers each one reports its own series; scrape them per worker or sum
+them in Prometheus. Spans are also exported over OTLP when OTEL_EXPORTER_OTLP_ENDPOINT is set
+and the OpenTelemetry SDK is installed.
+"""
+from contextlib import contextmanager
+from collections import defaultdict
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from .db_handler import logger
+import threading
+import bisect
+import time
+import os
+
+load_dotenv()
+
+OTEL_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "mindtype-api")
+
+# Seconds; the long tail covers multi-minute crew runs
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(names, values, **extra) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra.items())]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le=bound)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("mindtype_stage_duration_seconds",
+                          "Wall time of one request stage (route_query, retriever, page_fetch, ...)",
+                          ("stage", "outcome"))
+LLM_SECONDS = Histogram("mindtype_llm_call_duration_seconds", "Wall time of one LLM call",
+                        ("source", "model", "outcome"))
+CREW_TASK_SECONDS = Histogram("mindtype_crew_task_duration_seconds", "Wall time of one crew task",
+                              ("task", "outcome"))
+LLM_TOKENS = Counter("mindtype_llm_tokens_total", "LLM tokens used", ("source", "kind"))
+SPECULATION_SECONDS = Histogram("mindtype_speculation_seconds",
+                                "Time speculative work ran before routing finished (saved) or before it was "
+                                "dropped (wasted)", ("work", "outcome"))
+QUEUE_SECONDS = Histogram("mindtype_queue_wait_seconds", "Time a request waited for a slot in its route's bulkhead",
+                          ("route",))
+REGISTRY = [STAGE_SECONDS, LLM_SECONDS, CREW_TASK_SECONDS, LLM_TOKENS, SPECULATION_SECONDS, QUEUE_SECONDS]
+
+
+def _build_tracer():
+    if not OTEL_ENDPOINT:
+        return None
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but the OpenTelemetry SDK is not installed")
+        return None
+    # A private provider, so CrewAI's own telemetry setup cannot clash with ours
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    logger.info(f"Exporting traces to {OTEL_ENDPOINT}")
+    return provider.get_tracer("mindtype")
+
+
+tracer = _build_tracer()
+
+
+def _export_span(name: str, started: float, ended: float, attributes: dict, error: bool = False):
+    """Send an already finished span (wall-clock seconds) to the OTLP exporter, if there is one."""
+    if tracer is None:
+        return
+    span = tracer.start_span(name, start_time=int(started * 1e9), attributes=attributes)
+    if error:
+        from opentelemetry.trace import Status, StatusCode
+
+        span.set_status(Status(StatusCode.ERROR))
+    span.end(end_time=int(ended * 1e9))
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Time a block into mindtype_stage_duration_seconds{stage} and, if enabled, an OTel span."""
+    started_wall = time.time()
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, outcome=outcome)
+        _export_span(stage, started_wall, started_wall + elapsed, attributes, outcome == "error")
+
+
+def record_tokens(source: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, source=source, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, source=source, kind="completion")
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback that times every chat model call and counts its tokens."""
+
+    run_inline = True
+
+    def __init__(self, source: str):
+        self.source = source
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, invocation_params=None, **kwargs):
+        params = invocation_params or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("name", "")
+        self._started[run_id] = (time.time(), time.perf_counter(), model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, "ok")
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        if not usage:
+            # Streaming calls and some providers only report usage on the message
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt += metadata.get("input_tokens", 0)
+                    completion += metadata.get("output_tokens", 0)
+        record_tokens(self.source, prompt, completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+    def _finish(self, run_id, outcome: str):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        started_wall, started_perf, model = started
+        elapsed = time.perf_counter() - started_perf
+        LLM_SECONDS.observe(elapsed, source=self.source, model=model, outcome=outcome)
+        _export_span(f"llm {self.source}", started_wall, started_wall + elapsed, {"llm.model": model},
+                     outcome == "error")
+
+
+_crewai_instrumented = False
+
+
+def instrument_crewai():
+    """Time crew tasks and agent LLM calls from CrewAI's event bus. Safe to call more than once."""
+    global _crewai_instrumented
+    if _crewai_instrumented:
+        return
+    _crewai_instrumented = True
+    from crewai.events import (crewai_event_bus, TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent,
+                               LLMCallStartedEvent, LLMCallCompletedEvent, LLMCallFailedEvent)
+
+    lock = threading.Lock()
+    task_started, llm_started = {}, {}
+
+    def finish_task(event, outcome):
+        with lock:
+            started = task_started.pop(id(event.task), None)
+        if started is not None:
+            ended = event.timestamp.timestamp()
+            CREW_TASK_SECONDS.observe(ended - started, task=event.task.name, outcome=outcome)
+            _export_span(f"crew task {event.task.name}", started, ended, {"crew.task": event.task.name},
+                         outcome == "error")
+
+    def finish_llm(event, outcome):
+        # An agent makes one call at a time per model (a hedged call may run two models at once)
+        with lock:
+            started = llm_started.pop((event.agent_id, event.model), None)
+        if started is not None:
+            ended = event.timestamp.timestamp()
+            LLM_SECONDS.observe(ended - started, source="crewai", model=event.model or "", outcome=outcome)
+            _export_span("llm crewai", started, ended, {"llm.model": event.model or "",
+                                                        "crew.task": event.task_name or ""}, outcome == "error")
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source, event):
+        with lock:
+            task_started[id(event.task)] = event.timestamp.timestamp()
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source, event):
+        finish_task(event, "ok")
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def on_task_failed(source, event):
+        finish_task(event, "error")
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def on_llm_started(source, event):
+        with lock:
+            llm_started[(event.agent_id, event.model)] = event.timestamp.timestamp()
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_llm_completed(source, event):
+        finish_llm(event, "ok")
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def on_llm_failed(source, event):
+        finish_llm(event, "error")
+
+
+def _flatten(prefix: str, value, out: dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}_{key}" if prefix else str(key), item, out)
+    elif isinstance(value, (int, float)):
+        out[prefix] = float(value)
+
+
+def render(component_stats: dict = None) -> str:
+    """All series in the Prometheus text format, plus numeric `component_stats` as gauges.
+
+    `component_stats` maps a component name (e.g. "semantic_cache") to its stats() dict;
+    components that report a hit_ratio, or hits and misses, also get a hit-ratio gauge.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    if component_stats:
+        stat_lines, ratio_lines = [], []
+        for component, stats in component_stats.items():
+            flat = {}
+            _flatten("", stats or {}, flat)
+            for stat, value in sorted(flat.items()):
+                stat_lines.append(f"mindtype_component_stat{_labels(('component', 'stat'), (component, stat))} {value}")
+            # A component's own hit_ratio knows which of its counters overlap (exact_hits are also hits)
+            if "hit_ratio" in flat:
+                ratio = flat["hit_ratio"]
+            elif "hits" in flat and "misses" in flat and flat["hits"] + flat["misses"] > 0:
+                ratio = flat["hits"] / (flat["hits"] + flat["misses"])
+            else:
+                continue
+            ratio_lines.append(f"mindtype_cache_hit_ratio{_labels(('cache',), (component,))} {ratio:.4f}")
+        lines += ["# HELP mindtype_component_stat Counters and sizes reported by each component",
+                  "# TYPE mindtype_component_stat gauge"] + stat_lines
+        lines += ["# HELP mindtype_cache_hit_ratio Share of lookups answered from cache",
+                  "# TYPE mindtype_cache_hit_ratio gauge"] + ratio_lines
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,196 @@
+"""Recover a BlogOutput from whatever the summarizing agent actually returned.
+
+Models wrap JSON in prose or code fences, leave trailing commas, put raw newlines inside
+strings, rename fields or get cut off mid-object. Each repair below is tried in turn, and the
+result is validated against BlogOutput before it is accepted.
+"""
+from collections import Counter
+from pydantic import ValidationError
+from .chat_models import BlogOutput
+from .db_handler import logger
+import threading
+import json
+import ast
+import re
+
+FENCE = re.compile(r"```[a-zA-Z]*\s*(.*?)```", re.S)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+# Field names models tend to use instead of BlogOutput's
+ALIASES = {
+    "headline": "title", "blog_title": "title",
+    "content": "blog_post", "body": "blog_post", "post": "blog_post", "blog": "blog_post", "article": "blog_post",
+    "meta": "meta_description", "description": "meta_description", "seo_description": "meta_description",
+    "preview": "blog_preview", "summary": "blog_preview", "excerpt": "blog_preview", "teaser": "blog_preview",
+}
+
+_lock = threading.Lock()
+repair_stats = Counter({"clean": 0, "repaired": 0, "reprompts": 0, "reprompt_recovered": 0, "failed": 0})
+
+
+def count(outcome: str):
+    with _lock:
+        repair_stats[outcome] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        counters = dict(repair_stats)
+    # A rerun is what the user would have done after an error response
+    counters["reruns_avoided"] = counters["repaired"] + counters["reprompt_recovered"]
+    attempts = counters["repaired"] + counters["failed"] + counters["reprompt_recovered"]
+    counters["recovery_rate"] = round(counters["reruns_avoided"] / attempts, 4) if attempts else 0.0
+    return counters
+
+
+def _outermost_object(text: str) -> str:
+    """From the first '{' to its matching '}', or to the end if the object was cut off."""
+    start = text.find("{")
+    if start < 0:
+        return text
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _escape_controls(text: str) -> str:
+    """Escape raw newlines and tabs that appear inside string literals."""
+    out, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char in "\n\r\t":
+                char = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char]
+        elif char == '"':
+            in_string = True
+        out.append(char)
+    return "".join(out)
+
+
+def _close_truncated(text: str) -> str:
+    """Close an unterminated string and any open objects or arrays."""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = re.sub(r"[,:]\s*$", "", text.rstrip())
+    return text + "".join(reversed(stack))
+
+
+def _candidates(raw: str, allow_truncated: bool):
+    text = raw.strip()
+    fenced = FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    text = _outermost_object(text)
+    yield text
+    text = _escape_controls(text)
+    yield text
+    text = TRAILING_COMMA.sub(r"\1", text)
+    yield text
+    if not allow_truncated:
+        return
+    yield _close_truncated(text)
+    yield TRAILING_COMMA.sub(r"\1", _close_truncated(text.translate(SMART_QUOTES)))
+
+
+def extract_json(raw: str, allow_truncated: bool = False):
+    """Best-effort parse of the JSON object in `raw`; None if nothing parses.
+
+    With `allow_truncated`, an object that was cut off is closed and accepted as far as it goes.
+    """
+    for candidate in _candidates(raw or "", allow_truncated):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    try:
+        # Single-quoted, Python-style dicts
+        value = ast.literal_eval(_outermost_object((raw or "").strip()))
+        return value if isinstance(value, dict) else None
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def coerce_blog(data) -> BlogOutput:
+    """Map a parsed object onto BlogOutput, filling derivable fields. None if it can't be made valid."""
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+    if isinstance(data, dict) and len(data) == 1 and isinstance(next(iter(data.values())), dict):
+        data = next(iter(data.values()))  # e.g. {"blog": {...}}
+    if not isinstance(data, dict):
+        return None
+    fields = {}
+    for key, value in data.items():
+        name = re.sub(r"[^a-z]+", "_", str(key).lower()).strip("_")
+        name = ALIASES.get(name, name)
+        if name in BlogOutput.model_fields and name not in fields and value is not None:
+            fields[name] = value if isinstance(value, str) else json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    post = fields.get("blog_post", "").strip()
+    if post:
+        flat = " ".join(post.split())
+        fields.setdefault("meta_description", flat[:157].rsplit(" ", 1)[0] + "..." if len(flat) > 160 else flat)
+        fields.setdefault("blog_preview", " ".join(re.split(r"(?<=[.!?])\s+", flat)[:2]))
+    try:
+        blog = BlogOutput(**fields)
+    except ValidationError:
+        return None
+    return blog if blog.title.strip() and blog.blog_post.strip() else None
+
+
+def strict_parse(raw: str):
+    """What the pipeline accepted before repairs: the whole output, minus a leading code fence, is JSON."""
+    text = (raw or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("\n", 1)[0].strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def recover_blog(raw: str, allow_truncated: bool = False):
+    """Return (BlogOutput or None, how): how is "clean", "repaired" or "failed". Does not count."""
+    blog = coerce_blog(strict_parse(raw))
+    if blog is not None:
+        return blog, "clean"
+    blog = coerce_blog(extract_json(raw, allow_truncated))
+    if blog is not None:
+        logger.info("Recovered the blog from malformed summarizer output")
+        return blog, "repaired"
+    return None, "failed"
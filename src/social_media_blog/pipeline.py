@@ -0,0 +1,75 @@
+from .chat_models import BlogOutput, BlogResponse
+from .db_handler import logger
+from .metrics import record_tokens, span
+from .output_repair import recover_blog, count as count_repair
+
+
+def error_blog_response(content: str = "Blog generation failed due to an unexpected error. Please try again later.",
+                        meta_description: str = "Error in processing the request.") -> BlogResponse:
+    return BlogResponse(
+        status="error",
+        title="Blog Generation Failed",
+        content=content,
+        meta_description=meta_description,
+        blog_preview=""
+    )
+
+
+def blog_response(blog: BlogOutput) -> BlogResponse:
+    return BlogResponse(
+        status="success",
+        title=blog.title,
+        content=blog.blog_post,
+        meta_description=blog.meta_description,
+        blog_preview=blog.blog_preview
+    )
+
+
+def resummarize(crew_instance, response, topic: str, tone):
+    """Redo only the summarizing step from the run's writing output; None if that fails too."""
+    writing = next((output.raw for output in response.tasks_output if output.name == "writing_task"), None)
+    if not writing or not hasattr(crew_instance, "resummarize"):
+        return None
+    count_repair("reprompts")
+    try:
+        with span("summary_reprompt"):
+            raw_output = crew_instance.resummarize(writing, {"topic": topic, "tone": tone})
+    except Exception:
+        logger.exception("Re-prompting the summarizer failed")
+        return None
+    return recover_blog(raw_output)[0]
+
+
+def run_blog_crew(crew_instance, topic: str, tone, **options) -> BlogResponse:
+    """Kick off the blog crew and parse its output. Blocking; run it off the event loop.
+
+    `crew_instance` is a Crew or a SocialMediaBlog, whose kickoff reuses memoized stages and
+    takes extra `options` such as research_mode.
+    """
+    try:
+        with span("crew_kickoff"):
+            response = crew_instance.kickoff(inputs={'topic': topic, "tone": tone}, **options)
+        logger.info("CREW Pipeline completed successfully")
+        usage = getattr(response, "token_usage", None)
+        if usage is not None:
+            record_tokens("crewai", usage.prompt_tokens, usage.completion_tokens)
+    except Exception:
+        logger.exception("Crew pipeline failed during execution.")
+        return error_blog_response("Blog generation failed. An internal CrewAI error occurred.",
+                                   "CrewAI execution error.")
+
+    blog, outcome = recover_blog(response.raw)
+    if blog is None:
+        # Research and writing are done; one more summarizer call beats rerunning the whole crew
+        logger.warning("Summarizer output is not a valid blog; re-prompting the summarizing step")
+        blog = resummarize(crew_instance, response, topic, tone)
+        outcome = "reprompt_recovered" if blog is not None else "failed"
+        if blog is None:
+            # Last resort: keep as much of a cut-off answer as parses
+            blog, outcome = recover_blog(response.raw, allow_truncated=True)
+    count_repair(outcome)
+    if blog is None:
+        logger.error(f"CrewAI output could not be turned into a blog: {repr(response.raw[:200])}...")
+        return error_blog_response("CrewAI output was not valid JSON. Check agent prompts.",
+                                   "Invalid JSON structure.")
+    return blog_response(blog)
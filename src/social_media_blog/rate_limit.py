@@ -0,0 +1,143 @@
+from fastapi import HTTPException, Request
+from dotenv import load_dotenv
+from .db_handler import logger
+import threading
+import asyncio
+import sqlite3
+import math
+import time
+import os
+
+load_dotenv()
+
+RATE_LIMIT_CAPACITY = float(os.getenv("RATE_LIMIT_CAPACITY", "10"))
+RATE_LIMIT_REFILL_PER_MINUTE = float(os.getenv("RATE_LIMIT_REFILL_PER_MINUTE", "10"))
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH", ".cache/rate_limit.sqlite")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+
+# Tokens each kind of request takes from the caller's bucket
+ROUTE_COSTS = {
+    "langchain": float(os.getenv("RATE_LIMIT_COST_LANGCHAIN", "1")),
+    "crewai": float(os.getenv("RATE_LIMIT_COST_CREWAI", "5")),
+    "poll": float(os.getenv("RATE_LIMIT_COST_POLL", "0.1")),
+    "admin": float(os.getenv("RATE_LIMIT_COST_ADMIN", "1")),
+}
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, so every worker process on the host shares them."""
+
+    def __init__(self, path: str = RATE_LIMIT_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._takes = 0
+        # Autocommit mode; take() opens its own IMMEDIATE transaction to lock out other processes
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def take(self, key: str, cost: float, capacity: float, rate: float, now: float):
+        """Refill the bucket, then take `cost` tokens if it has them. Returns (allowed, tokens left)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                self._db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (key, tokens, now))
+                self._takes += 1
+                if self._takes % 1000 == 0:
+                    # A bucket idle long enough to have refilled is the same as no row at all
+                    self._db.execute("DELETE FROM buckets WHERE updated < ?", (now - capacity / rate,))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return allowed, tokens
+
+
+class RedisBucketStore:
+    """Token buckets in Redis (or anything speaking its protocol), for limits shared across hosts."""
+
+    SCRIPT = """
+    local capacity, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "mindtype:ratelimit:"):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, cost: float, capacity: float, rate: float, now: float):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, cost, now])
+        return bool(allowed), float(tokens)
+
+
+class RateLimiter:
+    """Per-client token bucket where each request costs according to its route.
+
+    A bucket holds up to `capacity` tokens and refills at `refill_per_minute`. A blog
+    generation takes far more tokens than a chat reply. State lives in SQLite by default,
+    or in Redis when RATE_LIMIT_REDIS_URL is set. If the backend fails, requests are let
+    through rather than rejected.
+    """
+
+    def __init__(self, store=None, capacity: float = RATE_LIMIT_CAPACITY,
+                 refill_per_minute: float = RATE_LIMIT_REFILL_PER_MINUTE, costs: dict = None):
+        if store is None:
+            store = RedisBucketStore() if RATE_LIMIT_REDIS_URL else SQLiteBucketStore()
+        self.store = store
+        self.capacity = capacity
+        self.rate = refill_per_minute / 60.0
+        self.costs = costs or ROUTE_COSTS
+        self.counters = {"allowed": 0, "limited": 0, "backend_errors": 0}
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        return request.client.host if request.client else "unknown"
+
+    def cost(self, route: str) -> float:
+        return self.costs.get(route, self.costs["langchain"])
+
+    async def check(self, request: Request, route: str, paid_for: str = None):
+        """Charge the caller for a `route` request. Raises HTTP 429 with Retry-After when over the limit.
+
+        With `paid_for`, the caller was already charged for that route and only the difference is taken.
+        """
+        cost = self.cost(route) - (self.cost(paid_for) if paid_for else 0.0)
+        if cost <= 0:
+            return
+        try:
+            allowed, tokens = await asyncio.to_thread(
+                self.store.take, self.client_key(request), cost, self.capacity, self.rate, time.time())
+        except Exception:
+            self.counters["backend_errors"] += 1
+            logger.exception("Rate limit backend failed; letting the request through")
+            return
+        if allowed:
+            self.counters["allowed"] += 1
+            return
+        self.counters["limited"] += 1
+        retry_after = math.ceil((cost - tokens) / self.rate) if self.rate > 0 else 60
+        raise HTTPException(status_code=429, detail=f"Rate limit exceeded. Try again in {retry_after}s.",
+                            headers={"Retry-After": str(retry_after)})
+
+    def stats(self) -> dict:
+        return {**self.counters, "backend": type(self.store).__name__, "capacity": self.capacity,
+                "refill_per_minute": self.rate * 60, "costs": self.costs}
@@ -0,0 +1,202 @@
+from collections import Counter, OrderedDict
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from dotenv import load_dotenv
+from .db_handler import logger
+import threading
+import math
+import os
+import re
+
+load_dotenv()
+
+ROUTES = ("crewai", "langchain")
+ROUTER_CONFIDENCE = float(os.getenv("ROUTER_CONFIDENCE", "0.12"))
+ROUTER_CACHE_SIZE = int(os.getenv("ROUTER_CACHE_SIZE", "2048"))
+
+# Tier 1: phrasings that leave no doubt about the route. Checked in order: a bare greeting, then
+# requests to write (anchored at the start, so "write a blog about mindtype" is still a blog),
+# then anything else that is about the product.
+RULES = [
+    ("langchain", re.compile(r"^(hi|hey|hello|good (morning|afternoon|evening)|thanks|thank you|ok|okay|bye)\b[\s!.?]*$")),
+    # Only a request to write something: an imperative, optionally behind a polite lead-in
+    ("crewai", re.compile(r"^(please |(can|could|would|will) you (please )?|i (need|want) you to |help me )?"
+                          r"(write|generate|create|draft|compose|produce|craft)\b( me)?.{0,60}\b(blog|post|article|write-?up|piece)\b")),
+    ("crewai", re.compile(r"^(i (need|want|would like|'d like) )?(a |an )?(blog|article|post)\b.{0,20}\b(about|on|for|regarding)\b")),
+    ("langchain", re.compile(r"\b(mindtype|your (company|team|service|platform)|who (founded|built|made) you|what (do|can) you do)\b")),
+]
+
+# Questions about the product ("how do I create a post?") share words with requests to write one.
+# They never match a crewai rule, and the classifier may only send them to chat; a question it
+# would send to the crew is left to the LLM.
+QUESTION = re.compile(r"^(how|where|why|when|which|who|what( is| are| does| do|'s)?|(can|could|should|do) i|is (it|there)|are there)\b")
+
+# Topic words alone ("AI in healthcare") pull the classifier towards the crew, but an unclear input is
+# chat. The classifier may only pick the crew when the text also asks for content.
+GENERATION_CUE = re.compile(r"\b(write|generate|create|draft|compose|produce|craft|make|blog|post|article|"
+                            r"piece|content|write-?up|something)\b")
+
+# Tier 2: labelled examples for the TF-IDF centroid classifier.
+EXAMPLES = {
+    "crewai": [
+        "write a blog about artificial intelligence in healthcare",
+        "generate a post on climate change policy",
+        "create an article about the latest movies",
+        "I need a blog post on personal finance tips",
+        "can you write something about the election results",
+        "draft a piece on music streaming trends",
+        "blog on remote work productivity",
+        "compose an informative article on cryptocurrency",
+        "produce content about the premier league season",
+        "write me a casual post about travel in kenya",
+        "make a blog about healthy eating",
+        "an engaging article on electric cars",
+    ],
+    "langchain": [
+        "what does mindtype do",
+        "who founded the company",
+        "what kind of content do you publish",
+        "how do I create an account",
+        "how can I contact support",
+        "hello how are you",
+        "what can you help me with",
+        "tell me about your team",
+        "where can I find my posts",
+        "is the service free",
+        "how does blog generation work",
+        "thanks for the help",
+    ],
+}
+
+router_prompt = ChatPromptTemplate.from_template(
+    """
+    You are a routing expert. Decide whether to route the user query to
+    'crewai' (for content generation) or 'langchain' (for general chat).
+    Beforemaking the decision, thoroughly analyze the user's input. If they directly mention to generate a blog, in whatever way, then you know definitely the route is crewai. If the user's input is unclear, ask it is definitely langchain. General queries for example, what mindtype does and what type of content they generate, that is a langchain query. Intelligently analyze the user's request to determine clearly and without a doubt, what route is to be taken.
+    Respond with one word only: crewai or langchain.
+
+    User: "{query}"
+    Response:
+    """
+)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def _features(text: str) -> Counter:
+    words = normalize_query(text).split()
+    return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def _unit(vector: dict) -> dict:
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {t: w / norm for t, w in vector.items()} if norm else {}
+
+
+class TfidfRouteClassifier:
+    """Nearest-centroid classifier over TF-IDF unigrams and bigrams."""
+
+    def __init__(self, examples: dict = EXAMPLES):
+        docs = [(label, _features(text)) for label, texts in examples.items() for text in texts]
+        doc_freq = Counter(term for _, feats in docs for term in feats)
+        self.idf = {t: math.log((1 + len(docs)) / (1 + df)) + 1 for t, df in doc_freq.items()}
+        centroids = {label: Counter() for label in examples}
+        for label, feats in docs:
+            centroids[label].update(self._vector(feats))
+        self.centroids = {label: _unit(c) for label, c in centroids.items()}
+
+    def _vector(self, feats: Counter) -> dict:
+        return _unit({t: (1 + math.log(n)) * self.idf[t] for t, n in feats.items() if t in self.idf})
+
+    def predict(self, text: str):
+        """Return (label, margin) where margin is the cosine gap to the runner-up."""
+        vec = self._vector(_features(text))
+        if not vec:
+            return None, 0.0
+        scores = sorted(
+            ((sum(w * centroid.get(t, 0.0) for t, w in vec.items()), label)
+             for label, centroid in self.centroids.items()),
+            reverse=True
+        )
+        return scores[0][1], scores[0][0] - scores[1][0]
+
+
+class QueryRouter:
+    """Decide between 'crewai' and 'langchain', calling the LLM only when local tiers are unsure."""
+
+    def __init__(self, get_llm, confidence: float = ROUTER_CONFIDENCE, cache_size: int = ROUTER_CACHE_SIZE):
+        # The LLM is only needed once the local tiers give up, so build it on first use
+        self._get_llm = get_llm
+        self._chain = None
+        self.classifier = TfidfRouteClassifier()
+        self.confidence = confidence
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = Counter({"requests": 0, "cache": 0, "rules": 0, "classifier": 0, "llm": 0, "llm_errors": 0})
+
+    @property
+    def chain(self):
+        if self._chain is None:
+            self._chain = router_prompt | self._get_llm() | StrOutputParser()
+        return self._chain
+
+    def classify_locally(self, query: str):
+        """Run the rule and classifier tiers. Returns (route, tier) or (None, None) if unsure."""
+        text = normalize_query(query)
+        question = QUESTION.match(text) is not None
+        for route, pattern in RULES:
+            if pattern.search(text) and not (question and route == "crewai"):
+                return route, "rules"
+        label, margin = self.classifier.predict(text)
+        if label == "crewai" and (question or not GENERATION_CUE.search(text)):
+            return None, None
+        if label is not None and margin >= self.confidence:
+            return label, "classifier"
+        return None, None
+
+    async def route(self, query: str) -> str:
+        key = normalize_query(query)
+        with self._lock:
+            self.counters["requests"] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.counters["cache"] += 1
+                return self._cache[key]
+
+        route, tier = self.classify_locally(query)
+        if route is None:
+            tier = "llm"
+            route = await self._ask_llm(query)
+        with self._lock:
+            self.counters[tier] += 1
+            if route is not None:
+                self._cache[key] = route
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        logger.info(f"Router picked '{route}' via {tier}")
+        return route or "langchain"
+
+    async def _ask_llm(self, query: str):
+        try:
+            decision = (await self.chain.ainvoke({"query": query})).strip().lower()
+        except Exception:
+            logger.exception("Router LLM failed. Proceeding with langchain")
+            with self._lock:
+                self.counters["llm_errors"] += 1
+            return None
+        for route in ROUTES:
+            if route in decision:
+                return route
+        logger.warning(f"Router LLM returned an unexpected decision: {decision!r}")
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            counters["cache_size"] = len(self._cache)
+        decided = counters["requests"] - counters["cache"]
+        counters["llm_ratio"] = round(counters["llm"] / decided, 4) if decided else 0.0
+        return counters
@@ -0,0 +1,203 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .db_handler import logger
+from .router import normalize_query
+import numpy as np
+import threading
+import sqlite3
+import time
+import os
+
+load_dotenv()
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "")
+
+
+class SemanticCache:
+    """Answer cache for the general-support assistant, matched by query embedding.
+
+    Entries live in a fixed-size float32 matrix of unit vectors, so a lookup is a single
+    matrix-vector product. Eviction is LRU with a TTL. When a path is given, entries are
+    also written to SQLite by a background thread and reloaded on start-up, keeping only
+    rows embedded by the same model at the same dimension.
+    """
+
+    def __init__(self, get_embeddings, model: str = "", threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_SIZE, ttl: float = SEMANTIC_CACHE_TTL,
+                 path: str = SEMANTIC_CACHE_PATH):
+        # Zero-argument factory, so the embedding client is only created on the first lookup
+        self._get_embeddings = get_embeddings
+        self.model = model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized query -> (slot, answer, created_at)
+        self._slots = [None] * max_entries  # slot -> normalized query
+        self._matrix = None
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self._db = None
+        self._writer = None
+        if path:
+            self._open_db(path)
+
+    async def embed(self, query: str):
+        """Embed a query as a unit vector, or None if embeddings are unavailable."""
+        embeddings = self._get_embeddings()
+        if embeddings is None:
+            return None
+        try:
+            vector = np.asarray(await embeddings.aembed_query(query), dtype=np.float32)
+        except Exception:
+            logger.exception("Semantic cache could not embed the query")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get_exact(self, query: str):
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.exact_hits += 1
+            return entry[1]
+
+    def get(self, query: str, vector):
+        """Return the cached answer for the closest stored query above the threshold."""
+        key = normalize_query(query)
+        with self._lock:
+            if vector is not None and self._matrix is not None and self._entries \
+                    and vector.shape[0] == self._matrix.shape[1]:
+                scores = self._matrix @ vector
+                for slot in np.argsort(scores)[::-1]:
+                    if scores[slot] < self.threshold:
+                        break
+                    match = self._slots[slot]
+                    entry = self._live_entry(match) if match is not None else None
+                    if entry is not None:
+                        self._entries.move_to_end(match)
+                        self.hits += 1
+                        logger.info(f"Semantic cache hit ({scores[slot]:.3f}) for {key!r} via {match!r}")
+                        return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, vector, answer: str, created_at: float = None, persist: bool = True):
+        if vector is None or not answer:
+            return
+        key = normalize_query(query)
+        created_at = created_at or time.time()
+        with self._lock:
+            if self._matrix is not None and vector.shape[0] != self._matrix.shape[1]:
+                # The embedding model changed under us; nothing stored can be compared with it any more
+                logger.warning(f"Semantic cache dropped {len(self._entries)} entries of dimension "
+                               f"{self._matrix.shape[1]} for a {vector.shape[0]}-dimension vector")
+                self._entries.clear()
+                self._slots = [None] * self.max_entries
+                self._matrix = None
+                if self._writer is not None:
+                    self._writer.submit(self._write, "DELETE FROM semantic_cache WHERE dimension != ?",
+                                        (vector.shape[0],))
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if key in self._entries:
+                slot = self._entries.pop(key)[0]
+            elif len(self._entries) >= self.max_entries:
+                evicted, (slot, _, _) = self._entries.popitem(last=False)
+                self._delete_row(evicted)
+            else:
+                slot = self._slots.index(None)
+            self._matrix[slot] = vector
+            self._slots[slot] = key
+            self._entries[key] = (slot, answer, created_at)
+            if persist and self._writer is not None:
+                self._writer.submit(
+                    self._write,
+                    "INSERT OR REPLACE INTO semantic_cache (query, answer, vector, created_at, model, dimension) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, answer, vector.astype(np.float32).tobytes(), created_at, self.model, vector.shape[0])
+                )
+
+    def flush(self):
+        """Wait until every write handed to the store so far is committed."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _live_entry(self, key: str):
+        # Caller holds the lock. Expired entries are dropped on sight.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[2] > self.ttl:
+            del self._entries[key]
+            self._slots[entry[0]] = None
+            self._matrix[entry[0]] = 0.0
+            self._delete_row(key)
+            return None
+        return entry
+
+    def _delete_row(self, key: str):
+        # Caller holds the lock; the delete is queued behind earlier writes so it can't be overtaken
+        if self._writer is not None:
+            self._writer.submit(self._write, "DELETE FROM semantic_cache WHERE query = ?", (key,))
+
+    def _write(self, sql: str, params: tuple):
+        # Runs on the writer thread, the only one touching the connection after start-up
+        try:
+            self._db.execute(sql, params)
+            self._db.commit()
+        except Exception:
+            logger.exception("Failed to persist a semantic cache entry")
+
+    def _open_db(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            columns = {row[1] for row in db.execute("PRAGMA table_info(semantic_cache)")}
+            if columns and not {"model", "dimension"} <= columns:
+                # Written before vectors were tagged with their model; there is no telling what made them
+                db.execute("DROP TABLE semantic_cache")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache "
+                "(query TEXT PRIMARY KEY, answer TEXT, vector BLOB, created_at REAL, model TEXT, dimension INTEGER)"
+            )
+            db.execute("DELETE FROM semantic_cache WHERE created_at < ? OR model != ?",
+                       (time.time() - self.ttl, self.model))
+            # A model can change dimension between versions; keep whatever was written last
+            latest = db.execute("SELECT dimension FROM semantic_cache ORDER BY created_at DESC LIMIT 1").fetchone()
+            if latest is not None:
+                db.execute("DELETE FROM semantic_cache WHERE dimension != ? OR length(vector) != 4 * dimension",
+                           (latest[0],))
+            db.commit()
+            rows = db.execute(
+                "SELECT query, answer, vector, created_at FROM semantic_cache ORDER BY created_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            for query, answer, blob, created_at in reversed(rows):
+                self.put(query, np.frombuffer(blob, dtype=np.float32), answer, created_at, persist=False)
+            self._db = db
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-cache")
+            logger.info(f"Semantic cache warmed with {len(rows)} entries from {path}")
+        except Exception:
+            logger.exception("Failed to open the semantic cache store; continuing in memory only")
+            self._db = None
@@ -0,0 +1,96 @@
+from collections import Counter
+from dotenv import load_dotenv
+from .metrics import SPECULATION_SECONDS
+import threading
+import asyncio
+import time
+import os
+
+load_dotenv()
+
+SPECULATIVE_ROUTING = os.getenv("SPECULATIVE_ROUTING", "true").lower() == "true"
+SPECULATIVE_CACHE_LOOKUP = os.getenv("SPECULATIVE_CACHE_LOOKUP", "true").lower() == "true"
+
+
+class Speculation:
+    """Work started while the route is still being decided.
+
+    Each named piece runs as its own task. ``take`` hands over its result, crediting the time
+    it ran before the route was known as saved; ``cancel`` and ``close`` drop it, counting the
+    time it had run as wasted.
+    """
+
+    def __init__(self, speculator, work: dict):
+        self._speculator = speculator
+        self._started = time.perf_counter()
+        self._decided = None
+        self._finished = {}
+        self._tasks = {}
+        for name, make in work.items():
+            task = asyncio.ensure_future(make())
+            task.add_done_callback(lambda _, name=name: self._finished.setdefault(name, time.perf_counter()))
+            self._tasks[name] = task
+
+    def decided(self, keep: bool):
+        """Mark the route as known; unless the route uses the work, cancel all of it."""
+        self._decided = time.perf_counter()
+        if not keep:
+            self.close()
+
+    async def take(self, name: str, make):
+        """Result of the speculative `name`, or of `make()` if nothing was started under that name."""
+        task = self._tasks.pop(name, None)
+        if task is None:
+            return await make()
+        result = await task
+        decided = self._decided or time.perf_counter()
+        saved = min(self._finished.get(name, decided), decided) - self._started
+        self._speculator.record(name, "saved", saved)
+        return result
+
+    def cancel(self, name: str):
+        task = self._tasks.pop(name, None)
+        if task is None:
+            return
+        if task.done():
+            if not task.cancelled():
+                task.exception()  # retrieved, so asyncio doesn't log it as unhandled
+        else:
+            task.cancel()
+        ran = self._finished.get(name, time.perf_counter()) - self._started
+        self._speculator.record(name, "wasted", ran)
+
+    def close(self):
+        """Cancel whatever was never taken."""
+        for name in list(self._tasks):
+            self.cancel(name)
+
+
+class Speculator:
+    """Starts speculative work and keeps totals of the latency it saved and the work it wasted."""
+
+    def __init__(self, enabled: bool = SPECULATIVE_ROUTING):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counters = Counter({"started": 0})
+        self.seconds = Counter()
+
+    def start(self, **work) -> Speculation:
+        """Run each zero-argument coroutine factory in `work` now; nothing is started when disabled."""
+        if not self.enabled:
+            return Speculation(self, {})
+        with self._lock:
+            self.counters["started"] += 1
+        return Speculation(self, work)
+
+    def record(self, name: str, outcome: str, seconds: float):
+        seconds = max(0.0, seconds)
+        SPECULATION_SECONDS.observe(seconds, work=name, outcome=outcome)
+        with self._lock:
+            self.counters[f"{name}_{outcome}"] += 1
+            self.seconds[f"{name}_{outcome}"] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, **self.counters,
+                    "seconds": {name: round(value, 3) for name, value in self.seconds.items()}}
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .db_handler import logger
+from .router import normalize_query
+import threading
+import hashlib
+import json
+import time
+import os
+
+load_dotenv()
+
+STAGE_CACHE_TTL = float(os.getenv("STAGE_CACHE_TTL", "21600"))
+STAGE_CACHE_SIZE = int(os.getenv("STAGE_CACHE_SIZE", "256"))
+
+
+def config_fingerprint(*configs) -> str:
+    """Short hash of task/agent configs, so editing a prompt retires the outputs it produced."""
+    return hashlib.sha1(json.dumps(configs, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+
+
+class StageCache:
+    """Memoized raw outputs of individual crew tasks.
+
+    An entry is keyed by task name, the task's config fingerprint and only the inputs
+    that task depends on, so e.g. one research report serves every tone of a topic.
+    Entries expire after `ttl` seconds; the least recently used go past `max_entries`.
+    """
+
+    def __init__(self, ttl: float = STAGE_CACHE_TTL, max_entries: int = STAGE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (task, fingerprint, inputs) -> (raw, created_at)
+        self.counters = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    @staticmethod
+    def _inputs_key(inputs: dict) -> str:
+        return json.dumps({name: normalize_query(str(getattr(value, "value", value)))
+                           for name, value in inputs.items()}, sort_keys=True)
+
+    def get(self, task_name: str, fingerprint: str, **inputs):
+        key = (task_name, fingerprint, self._inputs_key(inputs))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] > self.ttl:
+                self._entries.pop(key, None)
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def put(self, task_name: str, fingerprint: str, raw: str, **inputs):
+        if self.ttl <= 0 or not raw or not raw.strip():
+            return
+        key = (task_name, fingerprint, self._inputs_key(inputs))
+        with self._lock:
+            self._entries[key] = (raw, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, task_name: str = None, **inputs) -> int:
+        """Drop memoized outputs, optionally only for one task and/or matching inputs."""
+        wanted = json.loads(self._inputs_key(inputs))
+        with self._lock:
+            doomed = [key for key in self._entries
+                      if (task_name is None or key[0] == task_name)
+                      and wanted.items() <= json.loads(key[2]).items()]
+            for key in doomed:
+                del self._entries[key]
+            self.counters["invalidated"] += len(doomed)
+        logger.info(f"Stage cache invalidated {len(doomed)} entries")
+        return len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries)}
+
+
+stage_cache = StageCache()
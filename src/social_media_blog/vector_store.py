@@ -0,0 +1,250 @@
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+from .db_handler import logger
+import numpy as np
+import threading
+import json
+import uuid
+import os
+
+load_dotenv()
+
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", str(Path(__file__).resolve().parent.parent.parent / "db" / "local_index"))
+# Switch to the approximate (IVF) search once the corpus has at least this many vectors. 0 disables it.
+LOCAL_INDEX_ANN_MIN = int(os.getenv("LOCAL_INDEX_ANN_MIN", "100000"))
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class IVFIndex:
+    """Coarse k-means partitioning of the vectors; queries only scan the closest clusters."""
+
+    def __init__(self, vectors: np.ndarray, nprobe: int = LOCAL_INDEX_NPROBE, iterations: int = 10, seed: int = 0):
+        n = vectors.shape[0]
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.nprobe = min(nprobe, nlist)
+        self.lists = [np.flatnonzero(assignment == c) for c in range(nlist)]
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        closest = _top_k(self.centroids @ query, self.nprobe)
+        return np.concatenate([self.lists[c] for c in closest])
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store: unit vectors in a float32 matrix, brute-force or IVF top-k.
+
+    Saved as vectors.npy (memory-mapped on load) plus records.json holding ids, texts and
+    metadata. The IVF index is rebuilt by a background thread after writes; searches scan
+    every vector until it is ready. Implements the LangChain VectorStore interface, so as_retriever() works the
+    same as with Pinecone.
+    """
+
+    def __init__(self, embedding: Embeddings, directory: str = LOCAL_INDEX_DIR,
+                 ann_min: int = LOCAL_INDEX_ANN_MIN, nprobe: int = LOCAL_INDEX_NPROBE):
+        self._embedding = embedding
+        self.directory = directory
+        self.ann_min = ann_min
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._ann = None
+        self._version = 0  # bumped by every write, so a rebuild can tell it fell behind
+        self._indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-index")
+        self._rebuild = None
+        self._building = False
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _load(self):
+        vectors_path = os.path.join(self.directory, "vectors.npy")
+        records_path = os.path.join(self.directory, "records.json")
+        if not (os.path.exists(vectors_path) and os.path.exists(records_path)):
+            logger.info(f"No local vector index at {self.directory}; starting empty")
+            return
+        with open(records_path) as f:
+            records = json.load(f)
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._ids, self._texts, self._metadatas = records["ids"], records["texts"], records["metadatas"]
+        with self._lock:
+            self._schedule_ann()
+        logger.info(f"Loaded local vector index with {len(self._ids)} vectors from {self.directory}")
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            vectors, records = np.asarray(self._vectors), {
+                "ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}
+            tmp_vectors = os.path.join(self.directory, "vectors.tmp.npy")
+            tmp_records = os.path.join(self.directory, "records.tmp.json")
+            np.save(tmp_vectors, vectors)
+            with open(tmp_records, "w") as f:
+                json.dump(records, f)
+            os.replace(tmp_vectors, os.path.join(self.directory, "vectors.npy"))
+            os.replace(tmp_records, os.path.join(self.directory, "records.json"))
+
+    def _schedule_ann(self):
+        """Drop the IVF index and queue a rebuild. Caller holds the lock."""
+        self._ann = None
+        self._version += 1
+        if self.ann_min and len(self._ids) >= self.ann_min and not self._building:
+            self._building = True
+            self._rebuild = self._indexer.submit(self._build_ann)
+
+    def _build_ann(self):
+        # Clustering happens outside the lock; a write that lands meanwhile means building again
+        while True:
+            with self._lock:
+                version, vectors = self._version, self._vectors
+                if not (self.ann_min and len(self._ids) >= self.ann_min):
+                    self._building = False
+                    return
+            try:
+                ann = IVFIndex(np.asarray(vectors), nprobe=self.nprobe)
+            except Exception:
+                logger.exception("Failed to build the IVF index; searches stay brute-force")
+                with self._lock:
+                    self._building = False
+                return
+            with self._lock:
+                if version == self._version:
+                    self._ann = ann
+                    self._building = False
+                    logger.info(f"Built IVF index with {len(ann.lists)} lists")
+                    return
+
+    def wait_for_index(self):
+        """Block until any queued IVF rebuild has finished."""
+        while True:
+            with self._lock:
+                rebuild = self._rebuild if self._building else None
+            if rebuild is None:
+                return
+            rebuild.result()
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        vectors = np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def add_vectors(self, vectors: np.ndarray, texts: List[str], metadatas: List[dict], ids: List[str]) -> List[str]:
+        """Upsert precomputed vectors; rows with an existing id are replaced."""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            self._delete_locked(ids)
+            current = np.asarray(self._vectors)
+            if current.size == 0:
+                current = current.reshape(0, vectors.shape[1])
+            self._vectors = np.vstack([current, vectors])
+            self._ids = self._ids + list(ids)
+            self._texts = self._texts + list(texts)
+            self._metadatas = self._metadatas + list(metadatas)
+            # Batches that land while a rebuild runs are folded into a single follow-up build
+            self._schedule_ann()
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            return self._delete_locked(ids)
+
+    def _delete_locked(self, ids) -> bool:
+        drop = set(ids)
+        keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in drop]
+        if len(keep) == len(self._ids):
+            return False
+        self._vectors = np.asarray(self._vectors)[keep]
+        self._ids = [self._ids[i] for i in keep]
+        self._texts = [self._texts[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+        self._schedule_ann()
+        return True
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        # Take one consistent snapshot; writers swap whole lists rather than mutating them
+        with self._lock:
+            vectors, ids, texts, metadatas, ann = self._vectors, self._ids, self._texts, self._metadatas, self._ann
+        if not ids:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        if ann is not None:
+            rows = ann.candidates(query)
+            scores = np.asarray(vectors[rows]) @ query
+            best = _top_k(scores, k)
+            top, scores = rows[best], scores[best]
+        else:
+            scores = np.asarray(vectors) @ query
+            top = _top_k(scores, k)
+            scores = scores[top]
+        return [
+            (Document(id=ids[row], page_content=texts[row], metadata=metadatas[row]), float(score))
+            for row, score in zip(top, scores)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        vector = await self._embedding.aembed_query(query)
+        return self.similarity_search_by_vector(vector, k)
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, directory: str = LOCAL_INDEX_DIR, **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding, directory=directory, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        store.save()
+        return store
@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from .db_handler import logger
+import threading
+import sqlite3
+import json
+import time
+import os
+import re
+
+load_dotenv()
+
+WEB_CACHE_PATH = os.getenv("WEB_CACHE_PATH", ".cache/web_cache.sqlite")
+WEB_CACHE_SEARCH_TTL = float(os.getenv("WEB_CACHE_SEARCH_TTL", "3600"))
+WEB_CACHE_ARTICLE_TTL = float(os.getenv("WEB_CACHE_ARTICLE_TTL", "86400"))
+# How long past its TTL an entry may still be served while it is refreshed in the background
+WEB_CACHE_STALE_GRACE = float(os.getenv("WEB_CACHE_STALE_GRACE", "604800"))
+WEB_CACHE_MAX_BYTES = int(os.getenv("WEB_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+STOPWORDS = {"a", "an", "the", "of", "in", "on", "for", "to", "and", "about", "with", "latest", "current"}
+
+
+def normalize_search_query(query: str) -> str:
+    """Order- and filler-insensitive key, so near-identical queries share a cache entry."""
+    words = set(re.findall(r"[a-z0-9]+", query.lower())) - STOPWORDS
+    return " ".join(sorted(words))
+
+
+class WebCache:
+    """SQLite cache for search results and extracted article text.
+
+    Each kind has its own TTL. Expired entries inside the stale grace period are returned
+    immediately and refreshed in the background; articles are revalidated with the stored
+    ETag / Last-Modified. The file is trimmed least-recently-used first past max_bytes.
+    """
+
+    TTL = {"search": WEB_CACHE_SEARCH_TTL, "article": WEB_CACHE_ARTICLE_TTL}
+
+    def __init__(self, path: str = WEB_CACHE_PATH, max_bytes: int = WEB_CACHE_MAX_BYTES,
+                 stale_grace: float = WEB_CACHE_STALE_GRACE):
+        self.max_bytes = max_bytes
+        self.stale_grace = stale_grace
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="web-cache-refresh")
+        self._writes = 0
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "revalidated": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (kind TEXT, key TEXT, value TEXT, etag TEXT, "
+            "last_modified TEXT, fetched_at REAL, accessed_at REAL, size INTEGER, PRIMARY KEY (kind, key))"
+        )
+        self._db.commit()
+
+    def _get(self, kind: str, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, etag, last_modified, fetched_at FROM entries WHERE kind = ? AND key = ?",
+                (kind, key)
+            ).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?",
+                                 (time.time(), kind, key))
+                self._db.commit()
+        return row
+
+    def _put(self, kind: str, key: str, value: str, etag=None, last_modified=None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, value, etag, last_modified, now, now, len(value.encode("utf-8")))
+            )
+            self._db.commit()
+            self._writes += 1
+            if self._writes % 50 == 0:
+                self._evict()
+
+    def _touch(self, kind: str, key: str):
+        with self._lock:
+            self._db.execute("UPDATE entries SET fetched_at = ? WHERE kind = ? AND key = ?", (time.time(), kind, key))
+            self._db.commit()
+
+    def _evict(self):
+        # Caller holds the lock
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for kind, key, size in self._db.execute("SELECT kind, key, size FROM entries ORDER BY accessed_at"):
+            doomed.append((kind, key))
+            freed += size
+            if freed >= target:
+                break
+        self._db.executemany("DELETE FROM entries WHERE kind = ? AND key = ?", doomed)
+        self._db.commit()
+        logger.info(f"Web cache evicted {len(doomed)} entries ({freed} bytes)")
+
+    def _lookup(self, kind: str, key: str, refresh):
+        """Return the cached value, scheduling `refresh` if it is stale. None on a miss."""
+        row = self._get(kind, key)
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        value, _, _, fetched_at = row
+        age = time.time() - fetched_at
+        if age <= self.TTL[kind]:
+            self.counters["hits"] += 1
+            return value
+        if age <= self.TTL[kind] + self.stale_grace:
+            self.counters["stale_hits"] += 1
+            self._refresh_in_background(kind, key, refresh)
+            return value
+        self.counters["misses"] += 1
+        return None
+
+    def _refresh_in_background(self, kind: str, key: str, refresh):
+        with self._lock:
+            if (kind, key) in self._refreshing:
+                return
+            self._refreshing.add((kind, key))
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh of {kind} '{key}' failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard((kind, key))
+
+        self._refresh_executor.submit(run)
+
+    def search(self, query: str, search_fn, max_results: int):
+        """Cached search results for a query. search_fn(query, max_results) returns a list of dicts."""
+        key = f"{max_results}:{normalize_search_query(query)}"
+
+        def refresh():
+            results = search_fn(query, max_results)
+            if results:
+                self._put("search", key, json.dumps(results))
+            return results
+
+        cached = self._lookup("search", key, refresh)
+        if cached is not None:
+            return json.loads(cached)
+        return refresh()
+
+    def article(self, url: str, fetch_fn):
+        """Cached article text for a URL.
+
+        fetch_fn(etag, last_modified) returns (text, etag, last_modified), with text None when
+        the server answered 304 Not Modified.
+        """
+        def refresh():
+            row = self._get("article", url)
+            etag, last_modified = (row[1], row[2]) if row is not None else (None, None)
+            text, new_etag, new_last_modified = fetch_fn(etag, last_modified)
+            if text is None and row is not None:
+                self.counters["revalidated"] += 1
+                self._touch("article", url)
+                return row[0]
+            self._put("article", url, text or "", new_etag, new_last_modified)
+            return text or ""
+
+        cached = self._lookup("article", url, refresh)
+        if cached is not None:
+            return cached
+        return refresh()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        hits = self.counters["hits"] + self.counters["stale_hits"]
+        lookups = hits + self.counters["misses"]
+        return {**self.counters, "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": entries, "bytes": size}
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from .db_handler import logger
+from .web_cache import WebCache, WEB_CACHE_PATH
+from .extract import extract_from_response
+from .metrics import span
+import threading
+import requests
+import time
+import os
+
+load_dotenv()
+
+WEB_FETCH_WORKERS = int(os.getenv("WEB_FETCH_WORKERS", "16"))
+WEB_FETCH_PER_HOST = int(os.getenv("WEB_FETCH_PER_HOST", "2"))
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "6"))
+# Wall-clock budget for all page fetches of one web_search_tool call
+WEB_SEARCH_DEADLINE = float(os.getenv("WEB_SEARCH_DEADLINE", "10"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; MindtypeResearchBot/1.0)"
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=WEB_FETCH_WORKERS, pool_maxsize=WEB_FETCH_WORKERS)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+_session.headers.update({"User-Agent": USER_AGENT})
+
+fetch_executor = ThreadPoolExecutor(max_workers=WEB_FETCH_WORKERS, thread_name_prefix="web-fetch")
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+web_cache = None
+if WEB_CACHE_PATH:
+    try:
+        web_cache = WebCache()
+    except Exception:
+        logger.exception("Failed to open the web cache; searching and fetching uncached")
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(WEB_FETCH_PER_HOST)
+        return _host_limits[host]
+
+
+def search_web(query: str, max_results: int = 5):
+    from ddgs import DDGS
+
+    with span("web_search"), DDGS() as ddgs:
+        return [r for r in ddgs.text(query=query, max_results=max_results)]
+
+
+def cached_search(query: str, max_results: int = 5):
+    if web_cache is None:
+        return search_web(query, max_results)
+    return web_cache.search(query, search_web, max_results)
+
+
+def download_article(url: str, deadline: float, etag=None, last_modified=None):
+    """Fetch and extract one page, respecting the per-host limit and the deadline.
+
+    Returns (text, etag, last_modified); text is None if the server answered 304.
+    """
+    remaining = deadline - time.monotonic()
+    semaphore = _host_semaphore(url)
+    if remaining <= 0 or not semaphore.acquire(timeout=remaining):
+        raise TimeoutError("deadline reached before the request could start")
+    try:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        timeout = max(0.5, min(WEB_FETCH_TIMEOUT, deadline - time.monotonic()))
+        with span("page_fetch", url=url), \
+                _session.get(url, timeout=timeout, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                return None, etag, last_modified
+            response.raise_for_status()
+            text = extract_from_response(response)
+            return text, response.headers.get("ETag"), response.headers.get("Last-Modified")
+    finally:
+        semaphore.release()
+
+
+def fetch_article(url: str, deadline: float) -> str:
+    if web_cache is None:
+        return download_article(url, deadline)[0]
+
+    def fetch(etag, last_modified):
+        # Background refreshes start after the caller's deadline, so give them their own. A page
+        # that misses the caller's deadline still lands in the cache for the next search.
+        fetch_deadline = max(deadline, time.monotonic() + WEB_FETCH_TIMEOUT)
+        return download_article(url, fetch_deadline, etag, last_modified)
+
+    return web_cache.article(url, fetch)
+
+
+def fetch_articles(results, deadline_seconds: float = WEB_SEARCH_DEADLINE):
+    """Fetch search results concurrently and return the articles that finished in time.
+
+    Each article is a dict with title, link and text, in search-ranking order. Pages still
+    loading when the deadline passes are left to finish in the background and dropped.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    futures = []
+    for i, result in enumerate(results, 1):
+        title = result.get("title", "No title")
+        link = result.get("href", None)
+        if not link:
+            continue
+        logger.info(f"Fetching article {i}: {title} ({link})")
+        futures.append((title, link, fetch_executor.submit(fetch_article, link, deadline)))
+
+    wait([future for _, _, future in futures], timeout=max(0.0, deadline - time.monotonic()))
+
+    articles = []
+    for title, link, future in futures:
+        if not future.done():
+            future.cancel()
+            logger.warning(f"Skipping {link}: not fetched within {deadline_seconds}s")
+            continue
+        try:
+            article_text = future.result()
+        except Exception as e:
+            logger.warning(f"Skipping {link}: {e}")
+            continue
+        articles.append({"title": title, "link": link, "text": article_text})
+    return articles
@@ -0,0 +1,16 @@
+from benchmarks.fakes import install_fakes
+import pytest
+import os
+
+# Some tests build CrewAI objects before install_fakes runs; keep its telemetry off from the start
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+# Modules imported while tests are collected must not open a web cache in the working tree
+os.environ.setdefault("WEB_CACHE_PATH", "")
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    """The FastAPI app module with every external client replaced by a fast fake."""
+    return install_fakes(chat_latency=0, token_latency=0, embed_latency=0, retriever_latency=0, crew_latency=0.05,
+                         crew_tokens=50, search_latency=0, page_latency=0, page_words=80)
@@ -0,0 +1,107 @@
+from src.social_media_blog.blog_cache import BlogResultCache
+from src.social_media_blog.bulkhead import Bulkhead
+from src.social_media_blog.chat_models import BlogRequest, BlogResponse
+from types import SimpleNamespace
+import threading
+import asyncio
+import pytest
+import httpx
+import json
+
+
+class BlockingPool:
+    """Crew pool stand-in: reports the research stage, then waits for `release` before returning."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def run(self, topic, tone, stage_listener=None, wait_forever=False, research_mode=None):
+        stage_listener(SimpleNamespace(name="research_task"), ["research_task", "writing_task"])
+        self.release.wait(2)
+        self.finished.set()
+        return BlogResponse(title=topic, content="Body", meta_description="Meta", blog_preview="Preview")
+
+
+@pytest.fixture
+def crew_app(app_module, monkeypatch):
+    bulkhead = Bulkhead("crewai", limit=1, max_queue=1, queue_timeout=1)
+    cache = BlogResultCache()
+    monkeypatch.setitem(app_module.bulkheads, "crewai", bulkhead)
+    monkeypatch.setattr(app_module, "blog_cache", cache)
+    pool = BlockingPool()
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(crew_pool=pool)))
+    return app_module, request, pool, bulkhead, cache
+
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def post_stream(app_module, monkeypatch, topic):
+    monkeypatch.setattr(app_module.app.state, "rate_limiter", app_module.RateLimiter(), raising=False)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/chat/stream", json={"topic": topic})
+
+    return asyncio.run(scenario())
+
+
+def test_a_disconnected_stream_keeps_its_slot_until_the_crew_finishes(crew_app):
+    app_module, request, pool, bulkhead, cache = crew_app
+
+    async def scenario():
+        events = app_module.stream_crew_events(request, BlogRequest(topic="Solar power"))
+        first = await events.__anext__()
+        # Starlette cancels the response task when the client goes away
+        reader = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        await events.aclose()
+        during = (bulkhead.active, cache.stats()["in_flight"])
+        pool.release.set()
+        await asyncio.to_thread(pool.finished.wait, 2)
+        for _ in range(100):
+            if bulkhead.active == 0:
+                break
+            await asyncio.sleep(0.01)
+        return first, during
+
+    first, during = asyncio.run(scenario())
+    assert first.startswith("event: stage")
+    assert during == (1, 1)
+    assert bulkhead.active == 0
+    assert cache.stats()["in_flight"] == 0
+    assert cache.stats()["entries"] == 1
+
+
+def test_chat_stream_sends_tokens_for_chat_questions(app_module, monkeypatch):
+    response = post_stream(app_module, monkeypatch, "What does Mindtype do?")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert events[:2] == [("start", {"status": "routing"}), ("route", {"route": "langchain"})]
+    assert events[-1] == ("done", {})
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert tokens and all(tokens)
+
+
+def test_chat_stream_sends_crew_stages_then_the_blog(crew_app, monkeypatch):
+    app_module, request, pool, bulkhead, cache = crew_app
+    pool.release.set()
+    monkeypatch.setattr(app_module.app.state, "crew_pool", pool, raising=False)
+    response = post_stream(app_module, monkeypatch, "Write a blog post about solar power")
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["start", "route", "stage", "result", "done"]
+    assert events[1][1] == {"route": "crewai"}
+    assert events[2][1] == {"task": "research_task", "status": "done"}
+    assert events[3][1]["content"] == "Body"
+    assert bulkhead.active == 0
@@ -0,0 +1,89 @@
+from src.social_media_blog import batch
+from src.social_media_blog.chat_models import BlogResponse
+import threading
+import json
+import pytest
+
+
+class FakePool:
+    """Crew pool stand-in that fails topics listed in `failing`."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.topics = []
+        self._lock = threading.Lock()
+
+    def __call__(self, size):
+        return self
+
+    def start(self):
+        return self
+
+    def run(self, topic, tone, wait_forever=False, research_mode=None):
+        with self._lock:
+            self.topics.append(topic)
+        status = "error" if topic in self.failing else "success"
+        return BlogResponse(status=status, title=topic.title(), content=f"All about {topic}",
+                            meta_description="Meta", blog_preview="Preview")
+
+
+def write_lines(path, records):
+    path.write_text("".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records))
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.fixture
+def files(tmp_path):
+    source = tmp_path / "topics.jsonl"
+    write_lines(source, [{"topic": "solar power", "id": "a"}, {"topic": "wind power", "tone": "casual"},
+                         {"topic": "Wind  Power!", "tone": "casual"}, "not json", {"tone": "casual"}])
+    return source, tmp_path / "blogs.jsonl"
+
+
+def test_each_item_is_written_as_a_blog_output(files, monkeypatch):
+    source, output = files
+    pool = FakePool()
+    monkeypatch.setattr(batch, "CrewPool", pool)
+    summary = batch.run_batch(str(source), str(output), workers=2)
+    assert summary["items"] == 2 and summary["succeeded"] == 2 and summary["failed"] == 0
+    records = {record["topic"]: record for record in read_lines(output)}
+    assert records["solar power"]["id"] == "a"
+    assert records["solar power"]["blog"] == {"title": "Solar Power", "blog_post": "All about solar power",
+                                              "meta_description": "Meta", "blog_preview": "Preview"}
+
+
+def test_a_rerun_only_retries_what_did_not_succeed(files, monkeypatch):
+    source, output = files
+    monkeypatch.setattr(batch, "CrewPool", FakePool(failing={"wind power"}))
+    summary = batch.run_batch(str(source), str(output), workers=1, retries=1)
+    assert (summary["succeeded"], summary["failed"], summary["retried"]) == (1, 1, 1)
+    assert read_lines(output)[-1]["error"] == "All about wind power"
+
+    with open(output, "a") as f:
+        f.write('{"status": "success"}\n[1, 2]\n{"id": "cut sh')
+    pool = FakePool()
+    monkeypatch.setattr(batch, "CrewPool", pool)
+    summary = batch.run_batch(str(source), str(output), workers=1)
+    assert summary["skipped"] == 1 and summary["succeeded"] == 1
+    assert pool.topics == ["wind power"]
+
+
+def test_an_interrupt_cancels_the_items_that_have_not_started(tmp_path, monkeypatch):
+    source, output = tmp_path / "topics.jsonl", tmp_path / "blogs.jsonl"
+    write_lines(source, [{"topic": f"topic {i}"} for i in range(6)])
+    pool = FakePool()
+    monkeypatch.setattr(batch, "CrewPool", pool)
+
+    def interrupted(futures):
+        yield next(batch_as_completed(futures))
+        raise KeyboardInterrupt
+
+    batch_as_completed = batch.as_completed
+    monkeypatch.setattr(batch, "as_completed", interrupted)
+    summary = batch.run_batch(str(source), str(output), workers=1)
+    assert summary["interrupted"]
+    assert summary["cancelled"] >= 3
+    assert len(pool.topics) == len(read_lines(output)) <= 3
@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from src.social_media_blog.blog_cache import BlogResultCache
+from src.social_media_blog.chat_models import BlogResponse
+import threading
+import asyncio
+import pytest
+
+
+def blog(status="success"):
+    return BlogResponse(status=status, title="Title", content="Body", meta_description="Meta", blog_preview="Preview")
+
+
+def test_followers_share_the_leaders_blog_and_it_is_cached():
+    cache = BlogResultCache()
+
+    async def scenario():
+        release = asyncio.Event()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await release.wait()
+            return blog()
+
+        leader = asyncio.ensure_future(cache.arun("AI trends", "casual", generate))
+        follower = asyncio.ensure_future(cache.arun("ai  trends", "casual", generate))
+        await asyncio.sleep(0)
+        release.set()
+        return await leader, await follower, calls
+
+    first, second, calls = asyncio.run(scenario())
+    assert first is second
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 1
+    assert cache.run("AI trends", "casual", lambda: pytest.fail("should be cached")) is first
+
+
+def test_cancelled_leader_does_not_strand_followers():
+    cache = BlogResultCache()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return blog()
+
+        leader = asyncio.ensure_future(cache.arun("topic", "casual", generate))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.arun("topic", "casual", generate))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return leader, await asyncio.wait_for(follower, 1)
+
+    leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result.status == "success"
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_abandoned_leader_fails_followers_and_frees_the_key():
+    cache = BlogResultCache()
+
+    async def scenario():
+        key, future, leader = cache.join("topic", "casual")
+        assert leader
+        follower = asyncio.ensure_future(cache.arun("topic", "casual", pytest.fail))
+        await asyncio.sleep(0)
+        cache.abandon(key, future)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(follower, 1)
+
+    asyncio.run(scenario())
+    assert cache.stats()["in_flight"] == 0
+    assert cache.join("topic", "casual")[2]
+
+
+def test_leader_failure_reaches_followers_and_is_not_cached():
+    cache = BlogResultCache()
+    started, release = threading.Event(), threading.Event()
+
+    def generate():
+        started.set()
+        release.wait(1)
+        raise ValueError("crew crashed")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(cache.run, "topic", "casual", generate)
+        started.wait(1)
+        follower = pool.submit(cache.run, "topic", "casual", generate)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result(timeout=1)
+    assert cache.stats()["in_flight"] == 0
+    assert cache.run("topic", "casual", lambda: blog()).status == "success"
+
+
+def test_interrupted_sync_leader_settles_before_propagating():
+    cache = BlogResultCache()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        cache.run("topic", "casual", interrupted)
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_failed_blogs_are_not_cached():
+    cache = BlogResultCache()
+    assert cache.run("topic", "casual", lambda: blog("error")).status == "error"
+    assert cache.run("topic", "casual", lambda: blog()).status == "success"
+    assert cache.stats()["misses"] == 2
+
+
+def test_research_modes_are_cached_separately():
+    cache = BlogResultCache()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return blog()
+
+    cache.run("AI trends", "casual", generate, "fanout")
+    cache.run("ai trends", "casual", generate, "fanout")
+    cache.run("AI trends", "casual", generate, "single")
+    assert len(calls) == 2
@@ -0,0 +1,92 @@
+from src.social_media_blog.bulkhead import Bulkhead, BulkheadFull
+import asyncio
+import pytest
+
+
+async def hold(bulkhead, release):
+    async with bulkhead.slot():
+        await release.wait()
+
+
+def test_full_queue_sheds_and_slow_queue_times_out():
+    bulkhead = Bulkhead("test", limit=1, max_queue=1, queue_timeout=0.05)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(bulkhead, release))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(hold(bulkhead, release))
+        await asyncio.sleep(0.01)
+        assert (bulkhead.active, bulkhead.queued) == (1, 1)
+        with pytest.raises(BulkheadFull) as shed:
+            bulkhead.reject_if_full()
+        assert shed.value.retry_after >= 1
+        with pytest.raises(BulkheadFull):
+            await waiter
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+    stats = bulkhead.stats()
+    assert (stats["admitted"], stats["rejected"], stats["timed_out"]) == (1, 1, 1)
+    assert (stats["active"], stats["queued"]) == (0, 0)
+
+
+def test_queue_wait_is_accounted_for_admitted_requests():
+    bulkhead = Bulkhead("test", limit=1, max_queue=4, queue_timeout=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(bulkhead, release))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(hold(bulkhead, asyncio.Event()))
+        await asyncio.sleep(0.05)
+        release.set()
+        await holder
+        await asyncio.sleep(0.01)
+        assert bulkhead.active == 1
+        waiter.cancel()
+
+    asyncio.run(scenario())
+    stats = bulkhead.stats()
+    assert stats["admitted"] == 2
+    assert stats["queue_seconds_max"] >= 0.04
+    assert stats["queue_seconds_avg"] == pytest.approx(stats["queue_seconds_total"] / 2, abs=1e-3)
+    assert (stats["active"], stats["queued"]) == (0, 0)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    bulkhead = Bulkhead("test", limit=1, max_queue=1, queue_timeout=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(bulkhead, release))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(hold(bulkhead, release))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        assert bulkhead.queued == 0
+        bulkhead.reject_if_full()
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+    assert bulkhead.stats()["timed_out"] == 0
+
+
+def test_cancel_as_the_slot_is_granted_releases_it():
+    bulkhead = Bulkhead("test", limit=1, max_queue=1, queue_timeout=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(bulkhead, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(task.cancelled() for task in tasks)
+        assert not bulkhead._semaphore.locked()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert (bulkhead.active, bulkhead.queued) == (0, 0)
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from src.social_media_blog import concurrency
+import threading
+import asyncio
+import pytest
+
+
+def test_shutdown_lets_running_kickoffs_finish_and_cancels_queued_ones(monkeypatch):
+    monkeypatch.setattr(concurrency, "crew_executor", ThreadPoolExecutor(max_workers=1))
+    started, release = threading.Event(), threading.Event()
+
+    def kickoff():
+        started.set()
+        release.wait(1)
+        return "blog"
+
+    async def scenario():
+        running = asyncio.ensure_future(concurrency.run_in_crew_executor(kickoff))
+        queued = asyncio.ensure_future(concurrency.run_in_crew_executor(kickoff))
+        await asyncio.to_thread(started.wait, 1)
+        threading.Timer(0.05, release.set).start()
+        await asyncio.to_thread(concurrency.shutdown_executors, 2)
+        assert running.done()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        return await running
+
+    assert asyncio.run(scenario()) == "blog"
+    assert not concurrency._in_flight
+
+
+def test_shutdown_gives_up_after_the_timeout(monkeypatch):
+    monkeypatch.setattr(concurrency, "crew_executor", ThreadPoolExecutor(max_workers=1))
+    release = threading.Event()
+
+    async def scenario():
+        stuck = asyncio.ensure_future(concurrency.run_in_crew_executor(release.wait, 2))
+        await asyncio.sleep(0.01)
+        await asyncio.to_thread(concurrency.shutdown_executors, 0.05)
+        assert not stuck.done()
+        release.set()
+        return await stuck
+
+    assert asyncio.run(scenario()) is True
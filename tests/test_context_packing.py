@@ -0,0 +1,25 @@
+from src.social_media_blog.context_packing import count_tokens, pack_context, split_passages
+
+
+def test_passages_are_merged_up_to_the_limit():
+    assert split_passages("one\ntwo\n\nthree", max_chars=8) == ["one\ntwo", "three"]
+
+
+def test_duplicates_are_dropped_and_the_most_relevant_passage_fits_the_budget():
+    article = "Solar panel prices fell sharply this year across europe and asia."
+    sources = [("A", article), ("B", article + " "), ("C", "Football results from the weekend league games.")]
+    packed = pack_context("solar panel prices", sources, token_budget=20)
+    assert packed == f"A\n\n{article}"
+    assert count_tokens(packed) <= 20
+
+
+def test_passages_come_back_in_reading_order_under_their_header():
+    text = "\n".join(f"Paragraph {i} discusses electric cars and batteries in detail, number {i}." for i in range(6))
+    packed = pack_context("electric cars batteries", [("Header", text)], token_budget=1000)
+    assert packed.startswith("Header\n\n")
+    positions = [packed.index(f"Paragraph {i} ") for i in range(6)]
+    assert positions == sorted(positions)
+
+
+def test_nothing_to_pack():
+    assert pack_context("anything", [("Header", "")], token_budget=100) == ""
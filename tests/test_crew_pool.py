@@ -0,0 +1,82 @@
+from src.social_media_blog import crew_pool
+from src.social_media_blog.crew_pool import CrewPool, CrewPoolTimeout
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import threading
+import pytest
+import time
+
+
+class FakeCrew:
+    """PooledCrew stand-in; `fail_reset` makes the next reset raise."""
+
+    built = 0
+
+    def __init__(self):
+        FakeCrew.built += 1
+        self.blog = SimpleNamespace(stage_listener=None)
+        self.task_names = ["research_task", "writing_task"]
+        self.research_branches = []
+        self.uses = 0
+        self.fail_reset = False
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+        self.blog.stage_listener = None
+        if self.fail_reset:
+            raise RuntimeError("reset failed")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(crew_pool, "PooledCrew", FakeCrew)
+    FakeCrew.built = 0
+    return CrewPool(size=2, acquire_timeout=0.05).start()
+
+
+def test_checkout_times_out_when_every_crew_is_busy(pool):
+    with pool.checkout(), pool.checkout():
+        with pytest.raises(CrewPoolTimeout):
+            with pool.checkout():
+                pass
+        assert pool.stats()["in_use"] == 2
+    stats = pool.stats()
+    assert (stats["idle"], stats["checkouts"], stats["timeouts"]) == (2, 2, 1)
+
+
+def test_a_crew_that_fails_to_reset_is_rebuilt(pool):
+    with pool.checkout() as member:
+        member.fail_reset = True
+    assert pool.stats()["rebuilds"] == 1
+    assert FakeCrew.built == 3
+    with pool.checkout() as fresh:
+        assert fresh is not member and not fresh.fail_reset
+
+
+def test_concurrent_kickoffs_never_share_a_crew(pool, monkeypatch):
+    busy, shared, lock = set(), [], threading.Lock()
+
+    def run_blog_crew(blog, topic, tone, research_mode=None):
+        with lock:
+            if id(blog) in busy:
+                shared.append(topic)
+            busy.add(id(blog))
+        blog.stage_listener(SimpleNamespace(name="research_task"))
+        time.sleep(0.01)
+        with lock:
+            busy.discard(id(blog))
+        return topic
+
+    monkeypatch.setattr(crew_pool, "run_blog_crew", run_blog_crew)
+    stages = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        topics = list(executor.map(
+            lambda i: pool.run(f"topic {i}", "casual", wait_forever=True,
+                               stage_listener=lambda output, names: stages.append((output.name, names))),
+            range(8)))
+    assert topics == [f"topic {i}" for i in range(8)]
+    assert shared == []
+    assert stages == [("research_task", ["research_task", "writing_task"])] * 8
+    assert pool.stats()["checkouts"] == 8
+    assert pool.stats()["idle"] == 2
@@ -0,0 +1,72 @@
+from src.social_media_blog.embedding_cache import CachedEmbeddings, DiskVectorStore
+from benchmarks.fakes import FakeEmbeddings
+import asyncio
+import os
+
+
+def vector(i, dim=4):
+    return [float(i)] * dim
+
+
+def test_appends_from_another_process_are_read_incrementally(tmp_path):
+    first, second = DiskVectorStore(str(tmp_path)), DiskVectorStore(str(tmp_path))
+    first.put_many([("a", vector(1)), ("b", vector(2))])
+    second.put_many([("c", vector(3))])
+    assert second.get("a") == vector(1)
+    assert second.get("c") == vector(3)
+    first.put_many([("d", vector(4))])
+    assert first.get("c") == vector(3)
+    assert first.rows == {"a": 0, "b": 1, "c": 2, "d": 3}
+    assert DiskVectorStore(str(tmp_path)).get("d") == vector(4)
+
+
+def test_keys_without_a_row_are_dropped_after_a_crash(tmp_path):
+    store = DiskVectorStore(str(tmp_path))
+    store.put_many([("a", vector(1))])
+    with open(os.path.join(tmp_path, "keys.txt"), "a") as f:
+        f.write("orphan\ntorn")
+    reopened = DiskVectorStore(str(tmp_path))
+    assert reopened.rows == {"a": 0}
+    reopened.put_many([("b", vector(2))])
+    with open(os.path.join(tmp_path, "keys.txt")) as f:
+        assert f.read() == "a\nb\n"
+    assert DiskVectorStore(str(tmp_path)).get("b") == vector(2)
+
+
+def test_compaction_keeps_the_newest_rows(tmp_path):
+    store = DiskVectorStore(str(tmp_path), max_rows=8)
+    other = DiskVectorStore(str(tmp_path), max_rows=8)
+    store.put_many([(f"k{i}", vector(i)) for i in range(9)])
+    assert store.count == 6
+    assert store.get("k2") is None
+    assert store.get("k8") == vector(8)
+    assert sorted(os.listdir(tmp_path)) == [".lock", "keys.1.txt", "meta.json", "vectors.1.f32"]
+    other.put_many([("k9", vector(9))])
+    assert other.get("k3") == vector(3)
+    assert other.get("k9") == vector(9)
+    assert DiskVectorStore(str(tmp_path)).rows == {f"k{i}": i - 3 for i in range(3, 10)}
+
+
+def test_readers_follow_a_compaction_made_elsewhere(tmp_path):
+    reader = DiskVectorStore(str(tmp_path), max_rows=8)
+    writer = DiskVectorStore(str(tmp_path), max_rows=8)
+    writer.put_many([(f"k{i}", vector(i)) for i in range(4)])
+    assert reader.get("k1") == vector(1)
+    old_map = reader._map
+    writer.put_many([(f"k{i}", vector(i)) for i in range(4, 9)])
+    assert writer.generation == 1
+    # The old files are gone, but a map taken before the compaction still reads them
+    assert not os.path.exists(os.path.join(tmp_path, "vectors.f32"))
+    assert old_map[1].tolist() == vector(1)
+    assert reader.get("k1") is None
+    assert reader.get("k8") == vector(8)
+    assert reader.generation == 1
+
+
+def test_cached_embeddings_persist_in_the_background(tmp_path):
+    embeddings = CachedEmbeddings(FakeEmbeddings(latency=0, dimension=8), "fake", cache_dir=str(tmp_path))
+    first = asyncio.run(embeddings.aembed_query("hello"))
+    embeddings.flush()
+    reopened = CachedEmbeddings(FakeEmbeddings(latency=0, dimension=8), "fake", cache_dir=str(tmp_path), memory_size=0)
+    assert reopened.embed_query("hello") == first
+    assert reopened.stats()["hits"] == 1
@@ -0,0 +1,34 @@
+from src.social_media_blog.extract import extract_from_chunks
+
+
+def extract(html, **kwargs):
+    raw = html.encode("utf-8")
+    return extract_from_chunks((raw[i:i + 7] for i in range(0, len(raw), 7)), **kwargs)
+
+
+def test_boilerplate_blocks_are_dropped():
+    html = ("<html><body class='has-sidebar'><nav><p>Home</p></nav>"
+            "<div class='cookie-banner'><p>We use cookies</p></div>"
+            "<article><p>First <b>real</b> paragraph.</p><div id='share_bar'><p>Share this</p></div>"
+            "<div class='ad-slot'><p>Buy now</p></div><p>Second paragraph.</p></article>"
+            "<footer><p>Footer</p></footer></body></html>")
+    assert extract(html) == "First real paragraph.\nSecond paragraph."
+
+
+def test_class_names_only_match_whole_words():
+    html = ("<div class='shareholders'><p>Shareholders met today.</p></div>"
+            "<section id='commentary'><p>Analysts weighed in.</p></section>"
+            "<div class='header-menu-item' ><p>Menu</p></div>"
+            "<div class='related-posts'><p>More stories</p></div>")
+    assert extract(html) == "Shareholders met today.\nAnalysts weighed in."
+
+
+def test_extraction_stops_at_the_text_budget():
+    html = "".join(f"<p>Paragraph number {i} of the article.</p>" for i in range(100))
+    text = extract(html, text_budget=50)
+    assert len(text) <= 50
+    assert text.startswith("Paragraph number 0")
+
+
+def test_multibyte_characters_split_across_chunks_survive():
+    assert extract("<p>Café naïve — résumé</p>") == "Café naïve — résumé"
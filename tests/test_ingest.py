@@ -0,0 +1,60 @@
+from src.social_media_blog import ingest
+from src.social_media_blog.vector_store import LocalVectorStore
+from benchmarks.fakes import FakeEmbeddings
+import numpy as np
+import pytest
+
+
+def parse_text_file(path, chunk_size, chunk_overlap):
+    """Stand-in for parse_pdf: one chunk per line of a plain-text "PDF"."""
+    with open(path) as f:
+        return 1, [(line.strip(), 0) for line in f if line.strip()]
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    embeddings = FakeEmbeddings(latency=0, dimension=8)
+    index = str(tmp_path / "index")
+    local_sink = ingest.LocalSink
+    monkeypatch.setattr(ingest, "MANIFEST_PATH", tmp_path / "manifest.json")
+    monkeypatch.setattr(ingest, "parse_pdf", parse_text_file)
+    monkeypatch.setattr(ingest, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(ingest, "LocalSink", lambda e: local_sink(e, directory=index))
+    directory = tmp_path / "content"
+    directory.mkdir()
+    return directory, lambda: LocalVectorStore(embeddings, directory=index, ann_min=0)
+
+
+def run(content, **kwargs):
+    return ingest.ingest(content, backend="local", workers=1, batch_size=2, **kwargs)
+
+
+def test_only_new_chunks_are_embedded_and_stale_ones_deleted(corpus):
+    content, open_store = corpus
+    (content / "a.pdf").write_text("alpha\nbeta\nbeta\ngamma\n")
+    (content / "b.pdf").write_text("delta\n")
+    stats = run(content)
+    assert stats["chunks"] == 4 and stats["embedded_chunks"] == 4
+    assert sorted(open_store()._texts) == ["alpha", "beta", "delta", "gamma"]
+
+    assert run(content)["embedded_chunks"] == 0
+
+    (content / "a.pdf").write_text("alpha\nepsilon\n")
+    (content / "b.pdf").unlink()
+    stats = run(content)
+    assert stats["embedded_chunks"] == 1
+    assert stats["deleted_chunks"] == 3
+    assert sorted(open_store()._texts) == ["alpha", "epsilon"]
+
+
+def test_local_sink_writes_all_batches_in_one_upsert(tmp_path, monkeypatch):
+    sink = ingest.LocalSink(FakeEmbeddings(latency=0, dimension=4), directory=str(tmp_path))
+    calls = []
+    add_vectors = sink.store.add_vectors
+    monkeypatch.setattr(sink.store, "add_vectors", lambda *args: calls.append(args) or add_vectors(*args))
+    for n in range(3):
+        sink.upsert([f"id{n}"], np.full((1, 4), n + 1, dtype=np.float32), [f"text{n}"], [{"n": n}])
+    sink.delete(["id1"])
+    sink.close()
+    assert len(calls) == 1
+    assert sink.store._ids == ["id0", "id2"]
@@ -0,0 +1,113 @@
+from src.social_media_blog.chat_models import BlogResponse, JobStateEnum, ToneEnum
+from src.social_media_blog.jobs import BlogJobManager
+from types import SimpleNamespace
+import threading
+import pytest
+import queue
+import time
+
+
+class FakePool:
+    """Crew pool stand-in: reports `finished_tasks` to the stage listener, then waits for `release`."""
+
+    task_names = ["research_task", "writing_task", "summarizing_task"]
+    research_branches = ["research_task_1", "research_task_2", "research_task_3"]
+
+    def __init__(self, finished_tasks=(), on_stage=lambda: None):
+        self.release = threading.Event()
+        self.calls = 0
+        self.finished_tasks = finished_tasks
+        self.on_stage = on_stage
+
+    def run(self, topic, tone, stage_listener=None, wait_forever=False, research_mode=None):
+        self.calls += 1
+        for name in self.finished_tasks:
+            stage_listener(SimpleNamespace(name=name), self.task_names)
+            self.on_stage()
+        if not self.release.wait(2):
+            raise TimeoutError
+        return BlogResponse(title=topic, content="Body", meta_description="Meta", blog_preview="Preview")
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_stop_fails_queued_and_unfinished_jobs():
+    pool = FakePool()
+    manager = BlogJobManager(pool, workers=1)
+    manager.start()
+    running = manager.submit("running topic", ToneEnum.casual)
+    queued = manager.submit("queued topic", ToneEnum.casual)
+    assert wait_for(lambda: running.state == JobStateEnum.running)
+    manager.stop(timeout=0.05)
+    assert queued.state == JobStateEnum.failed
+    assert running.state == JobStateEnum.failed
+    assert "shut down" in running.result.content
+    assert pool.calls == 1
+    pool.release.set()
+
+
+def test_stop_waits_for_running_jobs_within_the_timeout():
+    pool = FakePool()
+    manager = BlogJobManager(pool, workers=1)
+    manager.start()
+    job = manager.submit("topic", ToneEnum.casual)
+    assert wait_for(lambda: job.state == JobStateEnum.running)
+    threading.Timer(0.05, pool.release.set).start()
+    manager.stop(timeout=2)
+    assert job.state == JobStateEnum.completed
+    assert job.result.title == "topic"
+
+
+def test_fanout_research_is_one_stage_until_every_branch_is_done():
+    stages = []
+    pool = FakePool(["research_task_2", "research_task_1", "research_task_3", "writing_task"],
+                    on_stage=lambda: stages.append(job.stage))
+    pool.release.set()
+    manager = BlogJobManager(pool, workers=1)
+    job = manager.submit("topic", ToneEnum.casual)
+    manager.start()
+    assert wait_for(lambda: job.state == JobStateEnum.completed)
+    manager.stop()
+    assert stages == ["research_task", "research_task", "writing_task", "summarizing_task"]
+
+
+def test_submitted_job_runs_to_completion_and_is_found_by_id():
+    pool = FakePool()
+    pool.release.set()
+    manager = BlogJobManager(pool, workers=1)
+    manager.start()
+    job = manager.submit("topic", ToneEnum.casual)
+    assert manager.get(job.job_id) is job
+    assert wait_for(lambda: job.state == JobStateEnum.completed)
+    manager.stop()
+    status = job.status()
+    assert status.status == JobStateEnum.completed and status.stage is None
+    assert status.result.content == "Body"
+    assert manager.get("missing") is None
+
+
+def test_full_queue_rejects_submissions_without_keeping_the_job():
+    manager = BlogJobManager(FakePool(), workers=1, queue_size=1)
+    manager.submit("first", ToneEnum.casual)
+    with pytest.raises(queue.Full):
+        manager.submit("second", ToneEnum.casual)
+    assert len(manager._jobs) == 1
+
+
+def test_finished_jobs_are_evicted_by_ttl_and_count():
+    pool = FakePool()
+    pool.release.set()
+    manager = BlogJobManager(pool, workers=1, ttl=0.2, max_finished=2)
+    jobs = [manager.submit(f"topic {i}", ToneEnum.casual) for i in range(3)]
+    manager.start()
+    assert wait_for(lambda: all(job.state == JobStateEnum.completed for job in jobs))
+    manager.stop()
+    assert manager.get(jobs[0].job_id) is None
+    assert manager.get(jobs[2].job_id) is jobs[2]
+    time.sleep(0.25)
+    assert manager.get(jobs[2].job_id) is None
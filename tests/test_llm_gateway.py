@@ -0,0 +1,103 @@
+from src.social_media_blog.llm_gateway import Hedger, HedgedChatModel, Provider, hedged_crew_llm
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessageChunk
+import asyncio
+import pytest
+
+
+def make_hedger(name, latencies, default_delay):
+    providers = [Provider(model, model) for model in latencies]
+
+    async def invoke(provider):
+        await asyncio.sleep(latencies[provider.name])
+        return provider.name
+
+    return Hedger(name, providers, deadline=5, default_delay=default_delay), invoke
+
+
+def test_slow_primary_is_hedged_after_the_default_delay():
+    hedger, invoke = make_hedger("test-hedged", {"primary": 0.3, "alternate": 0.01}, default_delay=0.05)
+    assert asyncio.run(hedger.acall(invoke)) == "alternate"
+    assert hedger.counters["hedged"] == 1
+    assert hedger.counters["alternate_wins"] == 1
+
+
+def test_no_hedge_without_samples_when_there_is_no_default_delay():
+    hedger, invoke = make_hedger("test-unhedged", {"primary": 0.1, "alternate": 0.01}, default_delay=None)
+    assert asyncio.run(hedger.acall(invoke)) == "primary"
+    assert hedger.counters["hedged"] == 0
+    assert hedger.providers[1].counters["calls"] == 0
+
+
+def test_cancelled_losers_are_not_latency_samples():
+    hedger, invoke = make_hedger("test-samples", {"primary": 0.3, "alternate": 0.01}, default_delay=0.05)
+    asyncio.run(hedger.acall(invoke))
+    primary, alternate = hedger.providers
+    assert list(primary._latencies["call"]) == []
+    assert primary.counters["calls"] == 0
+    assert len(alternate._latencies["call"]) == 1
+
+
+def test_blocking_calls_share_one_event_loop(monkeypatch):
+    monkeypatch.setattr(asyncio, "run", lambda coroutine: pytest.fail("Hedger.call must not start a new loop"))
+    hedger = Hedger("test-blocking", [Provider("primary", "primary")], deadline=5)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda i: hedger.call(lambda provider: f"{provider.name}-{i}"), range(8)))
+    assert results == [f"primary-{i}" for i in range(8)]
+
+
+class StopRecordingModel:
+    """Stand-in for a CrewAI LLM that remembers the stop words each call saw."""
+
+    def __init__(self, seen):
+        self.stop = []
+        self.seen = seen
+
+    def call(self, messages, *args):
+        self.seen.append(list(self.stop))
+        return "answer"
+
+
+def test_crew_llm_passes_stop_words_without_touching_the_shared_model():
+    llm = hedged_crew_llm("test-crew", ["gemini/gemini-2.5-flash"], temperature=0.5)
+    seen = []
+    shared = StopRecordingModel(seen)
+    llm.hedger.providers[0].model = shared
+    llm.stop = ["\nObservation:"]
+    assert llm.call("hello") == "answer"
+    llm.stop = []
+    llm.call("hello")
+    assert seen == [["\nObservation:"], []]
+    assert shared.stop == []
+
+
+class ClosingStreamModel:
+    """Chat model stand-in whose streams record whether they were closed."""
+
+    def __init__(self, first_token_delay):
+        self.first_token_delay = first_token_delay
+        self.closed = []
+
+    async def astream(self, messages, stop=None, **kwargs):
+        try:
+            await asyncio.sleep(self.first_token_delay)
+            for token in ("a", "b", "c"):
+                yield AIMessageChunk(content=token)
+        finally:
+            self.closed.append(True)
+
+
+def test_streams_that_lose_or_are_abandoned_are_closed():
+    slow, fast = ClosingStreamModel(0.3), ClosingStreamModel(0.01)
+    model = HedgedChatModel(hedger=Hedger("test-stream", [Provider("slow", slow), Provider("fast", fast)],
+                                          deadline=5, default_delay=0.05))
+
+    async def scenario():
+        stream = model.astream("hi")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first.content, list(fast.closed)
+
+    assert asyncio.run(scenario()) == ("a", [True])
+    assert slow.closed == [True]
+    assert fast.closed == [True]
@@ -0,0 +1,17 @@
+from src.social_media_blog.metrics import render
+
+
+def hit_ratio(text, cache):
+    prefix = f'mindtype_cache_hit_ratio{{cache="{cache}"}} '
+    return next(float(line[len(prefix):]) for line in text.splitlines() if line.startswith(prefix))
+
+
+def test_overlapping_hit_counters_are_not_double_counted():
+    text = render({"semantic_cache": {"hits": 2, "exact_hits": 2, "misses": 2, "hit_ratio": 0.5}})
+    assert hit_ratio(text, "semantic_cache") == 0.5
+
+
+def test_hit_ratio_falls_back_to_hits_and_misses():
+    text = render({"stage_cache": {"hits": 3, "misses": 1, "invalidated": 7}, "router": {"requests": 4}})
+    assert hit_ratio(text, "stage_cache") == 0.75
+    assert 'mindtype_cache_hit_ratio{cache="router"}' not in text
@@ -0,0 +1,64 @@
+from src.social_media_blog.output_repair import extract_json, recover_blog
+import json
+import pytest
+
+BLOG = {"title": "Rust in 2026", "blog_post": "Rust keeps growing. Teams adopt it for safety.",
+        "meta_description": "Why teams pick Rust", "blog_preview": "Rust keeps growing."}
+CLEAN = json.dumps(BLOG)
+
+
+def test_clean_json_is_accepted_as_is():
+    blog, how = recover_blog(CLEAN)
+    assert how == "clean"
+    assert blog.model_dump() == BLOG
+
+
+@pytest.mark.parametrize("raw", [
+    f"Here is your blog:\n```json\n{CLEAN}\n```\nLet me know if you want changes!",
+    f"Sure! {CLEAN} Hope this helps.",
+    CLEAN[:-1] + ",}",
+    CLEAN.replace("Rust keeps growing. Teams", "Rust keeps growing.\nTeams"),
+    repr(BLOG),
+], ids=["fence-and-prose", "prose", "trailing-comma", "raw-newline", "python-dict"])
+def test_malformed_output_is_repaired(raw):
+    blog, how = recover_blog(raw)
+    assert how == "repaired"
+    assert blog.title == BLOG["title"]
+    assert blog.blog_post.startswith("Rust keeps growing.")
+
+
+def test_wrapped_object_is_unwrapped():
+    blog, _ = recover_blog(json.dumps({"blog": BLOG}))
+    assert blog.model_dump() == BLOG
+
+
+def test_aliased_fields_are_mapped_and_missing_ones_derived():
+    blog, _ = recover_blog(json.dumps({"Headline": "Rust in 2026", "content": "Rust keeps growing. Teams adopt it."}))
+    assert blog.title == "Rust in 2026"
+    assert blog.meta_description == "Rust keeps growing. Teams adopt it."
+    assert blog.blog_preview == "Rust keeps growing. Teams adopt it."
+
+
+@pytest.mark.parametrize("raw", [
+    "I could not write this blog, sorry.",
+    "",
+    None,
+    json.dumps({"blog_post": "A post with no title."}),
+    json.dumps({"title": "", "blog_post": "Blank title"}),
+], ids=["prose", "empty", "none", "no-title", "blank-title"])
+def test_unrecoverable_output_fails(raw):
+    assert recover_blog(raw) == (None, "failed")
+
+
+def test_truncated_output_only_counts_when_allowed():
+    truncated = CLEAN[:CLEAN.index("Teams adopt")]
+    assert extract_json(truncated) is None
+    assert recover_blog(truncated) == (None, "failed")
+    blog, how = recover_blog(truncated, allow_truncated=True)
+    assert how == "repaired"
+    assert blog.blog_post.strip() == "Rust keeps growing."
+
+
+def test_extract_json_finds_the_outermost_object():
+    assert extract_json('noise {"a": {"b": "}"}} trailing {"c": 1}') == {"a": {"b": "}"}}
+    assert extract_json("no json here") is None
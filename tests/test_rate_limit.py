@@ -0,0 +1,55 @@
+from src.social_media_blog.rate_limit import RateLimiter, SQLiteBucketStore
+from fastapi import HTTPException
+from types import SimpleNamespace
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteBucketStore(str(tmp_path / "buckets.sqlite"))
+
+
+def test_take_charges_only_when_the_bucket_can_pay(store):
+    assert store.take("client", 4, capacity=10, rate=1, now=0) == (True, 6)
+    assert store.take("client", 7, capacity=10, rate=1, now=0) == (False, 6)
+    assert store.take("client", 6, capacity=10, rate=1, now=0) == (True, 0)
+    assert store.take("other", 10, capacity=10, rate=1, now=0) == (True, 0)
+
+
+def test_take_refills_with_time_up_to_capacity(store):
+    store.take("client", 10, capacity=10, rate=2, now=100)
+    assert store.take("client", 5, capacity=10, rate=2, now=102) == (False, 4)
+    assert store.take("client", 5, capacity=10, rate=2, now=102.5) == (True, 0)
+    assert store.take("client", 0, capacity=10, rate=2, now=1000) == (True, 10)
+
+
+def request(host="10.0.0.1"):
+    return SimpleNamespace(client=SimpleNamespace(host=host))
+
+
+def test_check_charges_route_costs_and_tops_up(store):
+    limiter = RateLimiter(store, capacity=5, refill_per_minute=0.0001, costs={"langchain": 1, "crewai": 5})
+
+    async def scenario():
+        await limiter.check(request(), "langchain")
+        await limiter.check(request(), "crewai", paid_for="langchain")
+        with pytest.raises(HTTPException) as limited:
+            await limiter.check(request(), "langchain")
+        return limited.value
+
+    limited = asyncio.run(scenario())
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) > 0
+    assert limiter.stats()["allowed"] == 2
+    assert limiter.stats()["limited"] == 1
+
+
+def test_check_fails_open_when_the_backend_breaks():
+    class Broken:
+        def take(self, *args):
+            raise OSError("disk gone")
+
+    limiter = RateLimiter(Broken(), capacity=1, refill_per_minute=1)
+    asyncio.run(limiter.check(request(), "crewai"))
+    assert limiter.stats()["backend_errors"] == 1
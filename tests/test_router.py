@@ -0,0 +1,45 @@
+from src.social_media_blog.router import QueryRouter, EXAMPLES
+import pytest
+
+router = QueryRouter(get_llm=lambda: pytest.fail("the LLM tier should not be built"))
+
+
+@pytest.mark.parametrize("query", [
+    "Write a blog about AI in healthcare",
+    "Can you write a blog post about the election?",
+    "please draft an article on rust",
+    "a blog about cats",
+    "Write a blog post about Mindtype and its founders",
+    "write a blog about your company",
+])
+def test_requests_to_write_go_to_the_crew(query):
+    assert router.classify_locally(query) == ("crewai", "rules")
+
+
+@pytest.mark.parametrize("query", [
+    "How do I create a post on Mindtype?",
+    "How do I make a post?",
+    "Can you give me an article recommendation?",
+    "what is a blog post",
+])
+def test_questions_about_posts_never_reach_the_crew_locally(query):
+    assert router.classify_locally(query)[0] != "crewai"
+
+
+def test_chat_rules_win_over_generation_words():
+    assert router.classify_locally("what can you do, write a blog?") == ("langchain", "rules")
+
+
+def test_training_examples_route_to_their_label():
+    for label, texts in EXAMPLES.items():
+        for text in texts:
+            assert router.classify_locally(text)[0] == label, text
+
+
+@pytest.mark.parametrize("query", ["AI in healthcare", "climate change", "the latest movies"])
+def test_bare_topics_are_left_to_the_llm(query):
+    assert router.classify_locally(query) == (None, None)
+
+
+def test_product_mentions_without_a_request_stay_in_chat():
+    assert router.classify_locally("tell me about mindtype's platform") == ("langchain", "rules")
@@ -0,0 +1,73 @@
+from src.social_media_blog.semantic_cache import SemanticCache
+import numpy as np
+import sqlite3
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def make_cache(path="", model="embed-v3", **kwargs):
+    return SemanticCache(lambda: None, model=model, path=path, **kwargs)
+
+
+def test_close_queries_share_an_answer():
+    cache = make_cache(threshold=0.9)
+    cache.put("What does Mindtype do?", unit(1, 0, 0), "We write blogs.")
+    assert cache.get("what is mindtype about", unit(1, 0.1, 0)) == "We write blogs."
+    assert cache.get("how do I sign up", unit(0, 1, 0)) is None
+    assert cache.get_exact("what does mindtype do") == "We write blogs."
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.put("a", unit(1, 0, 0), "A")
+    cache.put("b", unit(0, 1, 0), "B")
+    cache.get_exact("a")
+    cache.put("c", unit(0, 0, 1), "C")
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == "A"
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "semantic.sqlite")
+    cache = make_cache(path)
+    cache.put("what does mindtype do", unit(1, 0, 0), "We write blogs.")
+    cache.flush()
+    assert make_cache(path).get("what does mindtype do", unit(1, 0, 0)) == "We write blogs."
+
+
+def test_rows_from_another_model_are_dropped_on_start_up(tmp_path):
+    path = str(tmp_path / "semantic.sqlite")
+    old_model = make_cache(path, model="embed-v2")
+    old_model.put("old model", unit(1, 0, 0), "stale")
+    old_model.flush()
+    assert make_cache(path).get_exact("old model") is None
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT COUNT(*) FROM semantic_cache").fetchone() == (0,)
+
+
+def test_rows_of_an_old_dimension_are_dropped_on_start_up(tmp_path):
+    path = str(tmp_path / "semantic.sqlite")
+    cache = make_cache(path)
+    cache.put("three dims", unit(1, 0, 0), "old")
+    cache.flush()
+    with sqlite3.connect(path) as db:
+        db.execute("INSERT INTO semantic_cache VALUES ('four dims', 'new', ?, strftime('%s', 'now') + 1, "
+                   "'embed-v3', 4)", (unit(1, 0, 0, 0).tobytes(),))
+    reloaded = make_cache(path)
+    assert reloaded.get_exact("four dims") == "new"
+    assert reloaded.get_exact("three dims") is None
+
+
+def test_a_new_dimension_replaces_the_old_entries(tmp_path):
+    path = str(tmp_path / "semantic.sqlite")
+    cache = make_cache(path)
+    cache.put("a", unit(1, 0, 0), "A")
+    assert cache.get("a", unit(1, 0, 0, 0)) is None
+    cache.put("b", unit(1, 0, 0, 0), "B")
+    cache.flush()
+    assert cache.get_exact("a") is None
+    assert cache.get("b", unit(1, 0, 0, 0)) == "B"
+    assert make_cache(path).stats()["entries"] == 1
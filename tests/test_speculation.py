@@ -0,0 +1,83 @@
+from src.social_media_blog.speculation import Speculator
+import asyncio
+
+
+def test_taken_work_is_reused_and_credited_as_saved():
+    speculator = Speculator(enabled=True)
+    calls = []
+
+    async def retrieve():
+        calls.append("retrieve")
+        await asyncio.sleep(0.02)
+        return "docs"
+
+    async def scenario():
+        speculation = speculator.start(retrieve=retrieve)
+        await asyncio.sleep(0.05)
+        speculation.decided(keep=True)
+        return await speculation.take("retrieve", retrieve)
+
+    assert asyncio.run(scenario()) == "docs"
+    assert calls == ["retrieve"]
+    stats = speculator.stats()
+    assert stats["started"] == 1 and stats["retrieve_saved"] == 1
+    assert stats["seconds"]["retrieve_saved"] >= 0.02
+
+
+def test_work_for_another_route_is_cancelled_and_counted_as_wasted():
+    speculator = Speculator(enabled=True)
+    cancelled = []
+
+    async def retrieve():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        speculation = speculator.start(retrieve=retrieve)
+        await asyncio.sleep(0.01)
+        speculation.decided(keep=False)
+        await asyncio.sleep(0)
+        speculation.close()
+
+    asyncio.run(scenario())
+    assert cancelled == [True]
+    assert speculator.stats()["retrieve_wasted"] == 1
+
+
+def test_failed_work_that_is_dropped_does_not_leak_its_exception():
+    speculator = Speculator(enabled=True)
+
+    async def broken():
+        raise RuntimeError("retriever down")
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        speculation = speculator.start(retrieve=broken)
+        await asyncio.sleep(0.01)
+        speculation.close()
+        del speculation
+        await asyncio.sleep(0)
+        return errors
+
+    assert asyncio.run(scenario()) == []
+    assert speculator.stats()["retrieve_wasted"] == 1
+
+
+def test_disabled_speculation_runs_the_work_on_demand():
+    speculator = Speculator(enabled=False)
+
+    async def retrieve():
+        return "docs"
+
+    async def scenario():
+        speculation = speculator.start(retrieve=retrieve)
+        speculation.decided(keep=True)
+        return await speculation.take("retrieve", retrieve)
+
+    assert asyncio.run(scenario()) == "docs"
+    assert speculator.stats()["started"] == 0
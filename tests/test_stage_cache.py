@@ -0,0 +1,62 @@
+from src.social_media_blog.stage_cache import StageCache, config_fingerprint
+import asyncio
+import httpx
+import time
+
+
+def test_entries_are_keyed_by_task_fingerprint_and_inputs():
+    cache = StageCache()
+    cache.put("research_task", "f1", "report", topic="Solar Power")
+    assert cache.get("research_task", "f1", topic="solar power!") == "report"
+    assert cache.get("research_task", "f2", topic="solar power") is None
+    assert cache.get("writing_task", "f1", topic="solar power") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "invalidated": 0, "entries": 1}
+
+
+def test_entries_expire_and_the_oldest_are_evicted(monkeypatch):
+    cache = StageCache(ttl=10, max_entries=2)
+    for topic in ("a", "b", "c"):
+        cache.put("research_task", "f", "report", topic=topic)
+    assert cache.get("research_task", "f", topic="a") is None
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("research_task", "f", topic="c") is None
+
+
+def test_invalidate_matches_task_and_inputs():
+    cache = StageCache()
+    cache.put("research_task", "f", "r1", topic="a")
+    cache.put("research_task", "f", "r2", topic="b")
+    cache.put("writing_task", "f", "w1", topic="a", tone="casual")
+    assert cache.invalidate("research_task", topic="a") == 1
+    assert cache.invalidate(topic="a") == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_fingerprint_changes_with_the_config():
+    assert config_fingerprint({"description": "a"}) != config_fingerprint({"description": "b"})
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.calls = []
+
+    async def check(self, request, route, paid_for=None):
+        self.calls.append(route)
+
+
+def test_invalidation_authenticates_before_charging(app_module, monkeypatch):
+    limiter = CountingLimiter()
+    monkeypatch.setattr(app_module.app.state, "rate_limiter", limiter, raising=False)
+    monkeypatch.setattr(app_module, "ADMIN_API_KEY", "secret")
+
+    async def delete(headers):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.delete("/stages/research", params={"topic": "solar"}, headers=headers)
+
+    assert asyncio.run(delete({"X-Admin-Key": "wrong"})).status_code == 401
+    assert limiter.calls == []
+    response = asyncio.run(delete({"Authorization": "Bearer secret"}))
+    assert response.status_code == 200 and response.json() == {"invalidated": 0}
+    assert limiter.calls == ["admin"]
@@ -0,0 +1,60 @@
+from src.social_media_blog.vector_store import LocalVectorStore
+from benchmarks.fakes import FakeEmbeddings
+import numpy as np
+
+
+def make_store(tmp_path, **kwargs):
+    return LocalVectorStore(FakeEmbeddings(latency=0, dimension=16), directory=str(tmp_path), **kwargs)
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def add(store, vectors, prefix="doc"):
+    ids = [f"{prefix}{i}" for i in range(len(vectors))]
+    store.add_vectors(vectors, [f"text {i}" for i in ids], [{"n": i} for i in range(len(vectors))], ids)
+
+
+def test_brute_force_search_returns_the_nearest_vector(tmp_path):
+    store = make_store(tmp_path, ann_min=0)
+    vectors = random_vectors(50)
+    add(store, vectors)
+    results = store.similarity_search_by_vector_with_score(vectors[7].tolist(), k=3)
+    assert results[0][0].id == "doc7"
+    assert abs(results[0][1] - 1.0) < 1e-5
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_upserts_replace_rows_with_the_same_id(tmp_path):
+    store = make_store(tmp_path, ann_min=0)
+    add(store, random_vectors(5))
+    add(store, random_vectors(2, seed=1))
+    assert len(store) == 5
+    assert store.delete(["doc0", "missing"])
+    assert len(store) == 4
+
+
+def test_the_ivf_index_is_built_off_the_query_path(tmp_path):
+    store = make_store(tmp_path, ann_min=100)
+    vectors = random_vectors(400)
+    add(store, vectors)
+    # Until the rebuild lands, searches fall back to scanning every vector
+    assert store.similarity_search_by_vector_with_score(vectors[3].tolist(), k=1)[0][0].id == "doc3"
+    store.wait_for_index()
+    assert store._ann is not None
+    assert store.similarity_search_by_vector_with_score(vectors[3].tolist(), k=1)[0][0].id == "doc3"
+    store.delete(["doc3"])
+    assert store._ann is None
+    store.wait_for_index()
+    assert store._ann is not None and sum(len(rows) for rows in store._ann.lists) == 399
+
+
+def test_saved_index_reloads(tmp_path):
+    store = make_store(tmp_path, ann_min=0)
+    vectors = random_vectors(10)
+    add(store, vectors)
+    store.save()
+    reloaded = make_store(tmp_path, ann_min=0)
+    assert len(reloaded) == 10
+    assert reloaded.similarity_search_by_vector(vectors[4].tolist(), k=1)[0].metadata == {"n": 4}
@@ -0,0 +1,78 @@
+from src.social_media_blog.web_cache import WebCache, normalize_search_query
+import threading
+import time
+
+
+class Search:
+    def __init__(self):
+        self.queries = []
+        self.called = threading.Event()
+
+    def __call__(self, query, max_results):
+        self.queries.append(query)
+        self.called.set()
+        return [{"title": f"{query} #{len(self.queries)}", "href": "https://example.com"}]
+
+
+def test_queries_differing_only_in_order_and_filler_share_a_key():
+    assert normalize_search_query("Latest news about AI") == normalize_search_query("AI news")
+    assert normalize_search_query("AI news") != normalize_search_query("AI policy")
+
+
+def test_search_results_are_served_from_the_cache(tmp_path):
+    cache = WebCache(str(tmp_path / "web.sqlite"))
+    search = Search()
+    first = cache.search("latest AI news", search, 5)
+    assert cache.search("news about AI", search, 5) == first
+    assert search.queries == ["latest AI news"]
+    cache.search("AI news", search, 3)
+    assert len(search.queries) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_results_are_served_while_refreshed_in_the_background(tmp_path):
+    cache = WebCache(str(tmp_path / "web.sqlite"), stale_grace=60)
+    cache.TTL = {"search": 0.05, "article": 0.05}
+    search = Search()
+    first = cache.search("solar power", search, 5)
+    time.sleep(0.1)
+    search.called.clear()
+    assert cache.search("solar power", search, 5) == first
+    assert search.called.wait(2)
+    for _ in range(100):
+        if cache.search("solar power", search, 5) != first:
+            break
+        time.sleep(0.01)
+    assert cache.search("solar power", search, 5)[0]["title"] == "solar power #2"
+    assert cache.stats()["stale_hits"] >= 1
+
+
+def test_expired_articles_are_revalidated_with_their_validators(tmp_path):
+    cache = WebCache(str(tmp_path / "web.sqlite"), stale_grace=0)
+    cache.TTL = {"search": 0.05, "article": 0.05}
+    seen = []
+
+    def fetch(etag, last_modified):
+        seen.append((etag, last_modified))
+        if etag is None:
+            return "Article text", '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT"
+        return None, etag, last_modified
+
+    assert cache.article("https://example.com/a", fetch) == "Article text"
+    time.sleep(0.1)
+    assert cache.article("https://example.com/a", fetch) == "Article text"
+    assert seen == [(None, None), ('"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")]
+    assert cache.stats()["revalidated"] == 1
+    assert cache.article("https://example.com/a", fetch) == "Article text"
+    assert len(seen) == 2
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path):
+    cache = WebCache(str(tmp_path / "web.sqlite"), max_bytes=1000)
+    cache.article("https://example.com/keep", lambda etag, last_modified: ("k" * 100, None, None))
+    for i in range(49):
+        cache.article("https://example.com/keep", lambda etag, last_modified: ("", None, None))
+        cache.article(f"https://example.com/{i}", lambda etag, last_modified: ("x" * 100, None, None))
+    stats = cache.stats()
+    assert stats["bytes"] <= 900 and stats["entries"] < 50
+    assert cache.article("https://example.com/keep", lambda etag, last_modified: ("", None, None)) == "k" * 100
@@ -0,0 +1,76 @@
+from src.social_media_blog import web_fetch
+from src.social_media_blog.web_fetch import download_article, fetch_articles
+import threading
+import pytest
+import time
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def get(self, url, timeout, headers, stream):
+        self.requests.append((url, headers))
+        return self.response
+
+
+def test_slow_and_failing_pages_are_dropped_at_the_deadline(monkeypatch):
+    release = threading.Event()
+
+    def fetch_article(url, deadline):
+        if url.endswith("slow"):
+            release.wait(2)
+        if url.endswith("broken"):
+            raise ValueError("bad page")
+        return f"text of {url}"
+
+    monkeypatch.setattr(web_fetch, "fetch_article", fetch_article)
+    results = [{"title": "A", "href": "https://a.example/1"}, {"title": "Slow", "href": "https://b.example/slow"},
+               {"title": "No link"}, {"title": "Broken", "href": "https://c.example/broken"},
+               {"title": "D", "href": "https://d.example/2"}]
+    started = time.monotonic()
+    articles = fetch_articles(results, deadline_seconds=0.2)
+    release.set()
+    assert time.monotonic() - started < 1
+    assert [article["title"] for article in articles] == ["A", "D"]
+    assert articles[1] == {"title": "D", "link": "https://d.example/2", "text": "text of https://d.example/2"}
+
+
+def test_conditional_requests_return_none_when_not_modified(monkeypatch):
+    session = FakeSession(FakeResponse(304))
+    monkeypatch.setattr(web_fetch, "_session", session)
+    text, etag, last_modified = download_article("https://example.com/a", time.monotonic() + 5, '"v1"', "yesterday")
+    assert (text, etag, last_modified) == (None, '"v1"', "yesterday")
+    assert session.requests == [("https://example.com/a", {"If-None-Match": '"v1"', "If-Modified-Since": "yesterday"})]
+
+
+def test_a_busy_host_times_out_at_the_deadline(monkeypatch):
+    session = FakeSession(FakeResponse(304))
+    monkeypatch.setattr(web_fetch, "_session", session)
+    semaphore = web_fetch._host_semaphore("https://busy.example/a")
+    for _ in range(web_fetch.WEB_FETCH_PER_HOST):
+        semaphore.acquire()
+    try:
+        with pytest.raises(TimeoutError):
+            download_article("https://busy.example/b", time.monotonic() + 0.05)
+        download_article("https://idle.example/b", time.monotonic() + 0.05)
+    finally:
+        for _ in range(web_fetch.WEB_FETCH_PER_HOST):
+            semaphore.release()
+    assert [url for url, _ in session.requests] == ["https://idle.example/b"]